@@ -0,0 +1,164 @@
+"""
+Comprobaciones de salud de la API.
+
+- Liveness (`/health/live`): el proceso está vivo y el event loop responde. No
+  mira nada más: si fallara por falta de disco o de ffmpeg, el orquestador
+  reiniciaría el contenedor sin arreglar nada.
+- Readiness (`/health/ready`): la réplica puede aceptar trabajos nuevos ahora.
+  Comprueba el apagado, los slots y la cola, el espacio en disco, ffmpeg y
+  yt-dlp, y la tasa de fallos reciente, con umbrales en `Config.READY_*`. Si
+  algo falla el balanceador deja de enviarle peticiones hasta que se recupere.
+"""
+import importlib.util
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+from core.ffmpeg import get_ffmpeg_paths
+
+
+# Motivos de fallo que dependen del video pedido y no del estado de la réplica
+CLIENT_ERRORS = frozenset({'unavailable', 'age_restricted', 'unsupported_url', 'format_unavailable'})
+
+# Resultados recientes como máximo en memoria
+MAX_RECENT_JOBS = 10000
+
+
+class RecentFailures:
+    """
+    Resultados de los trabajos terminados en los últimos `window` segundos.
+    
+    Args:
+        window: Segundos que cuenta cada resultado.
+    """
+    
+    def __init__(self, window: float):
+        self.window = window
+        # (instante, fallido)
+        self._events: deque = deque(maxlen=MAX_RECENT_JOBS)
+        self._lock = threading.Lock()
+    
+    def _prune(self, now: float):
+        while self._events and now - self._events[0][0] > self.window:
+            self._events.popleft()
+    
+    def record(self, failed: bool):
+        """Anota el resultado de un trabajo terminado."""
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            self._events.append((now, failed))
+    
+    def counts(self) -> Tuple[int, int]:
+        """Trabajos terminados y fallidos dentro de la ventana."""
+        with self._lock:
+            self._prune(time.monotonic())
+            return len(self._events), sum(1 for _, failed in self._events if failed)
+
+
+class ReadinessChecker:
+    """
+    Comprueba si una réplica puede aceptar trabajos.
+    
+    La comprobación de ffmpeg y yt-dlp se reutiliza durante `READY_TOOLS_TTL`
+    segundos: los balanceadores preguntan cada pocos segundos y resolver ffmpeg
+    puede llegar a descargarlo (`static-ffmpeg`).
+    
+    Args:
+        manager: Gestor de tareas cuyo estado se comprueba.
+    """
+    
+    def __init__(self, manager):
+        self.manager = manager
+        self.config = manager.downloader.config
+        self._tools: Optional[Dict[str, Dict[str, Any]]] = None
+        self._tools_checked = 0.0
+        self._tools_lock = threading.Lock()
+    
+    def check(self) -> Tuple[bool, Dict[str, Dict[str, Any]]]:
+        """
+        Ejecuta todas las comprobaciones (bloquea: llamar fuera del event loop).
+        
+        Returns:
+            Tupla con si la réplica está lista y el detalle de cada comprobación
+            (todas llevan `ok`).
+        """
+        checks = {
+            'draining': {'ok': not self.manager.draining},
+            'slots': self._slots(),
+            'disk': self._disk(),
+            **self._tools_status(),
+            'failures': self._failures(),
+        }
+        return all(check['ok'] for check in checks.values()), checks
+    
+    def _slots(self) -> Dict[str, Any]:
+        manager = self.manager
+        max_queue = self.config.READY_MAX_QUEUE
+        return {
+            'ok': manager.queued < max_queue,
+            'free': max(manager.max_slots - manager.active, 0),
+            'total': manager.max_slots,
+            'queue_depth': manager.queued,
+            'max_queue': max_queue
+        }
+    
+    def _disk(self) -> Dict[str, Any]:
+        """Espacio libre para trabajos nuevos, con los mismos descuentos que la admisión."""
+        mb = 1024 * 1024
+        downloads_dir = self.manager.downloads_dir
+        try:
+            downloads_dir.mkdir(exist_ok=True)
+            free = shutil.disk_usage(downloads_dir).free
+        except OSError as e:
+            return {'ok': False, 'error': str(e)}
+        available = free - self.manager.reserved_bytes - self.config.DISK_HEADROOM_MB * mb
+        return {
+            'ok': available >= self.config.READY_MIN_DISK_MB * mb,
+            'free_mb': free // mb,
+            'available_mb': max(available, 0) // mb,
+            'min_mb': self.config.READY_MIN_DISK_MB
+        }
+    
+    def _tools_status(self) -> Dict[str, Dict[str, Any]]:
+        with self._tools_lock:
+            now = time.monotonic()
+            if self._tools is None or now - self._tools_checked >= self.config.READY_TOOLS_TTL:
+                self._tools = {'ffmpeg': self._ffmpeg(), 'yt_dlp': self._yt_dlp()}
+                self._tools_checked = now
+            return self._tools
+    
+    def _ffmpeg(self) -> Dict[str, Any]:
+        try:
+            paths = get_ffmpeg_paths(self.config.CACHE_DIR)
+        except Exception as e:
+            return {'ok': False, 'error': str(e)}
+        # La ruta ya resuelta puede haber desaparecido (volumen desmontado, imagen rota)
+        missing = [path for path in paths if not os.access(path, os.X_OK)]
+        if missing:
+            return {'ok': False, 'error': f"No ejecutable: {', '.join(missing)}"}
+        return {'ok': True, 'path': paths[0]}
+    
+    @staticmethod
+    def _yt_dlp() -> Dict[str, Any]:
+        # Se ejecuta con `python -m yt_dlp`: basta con que el módulo se encuentre
+        if importlib.util.find_spec('yt_dlp') is None:
+            return {'ok': False, 'error': "El módulo yt_dlp no está instalado"}
+        return {'ok': True}
+    
+    def _failures(self) -> Dict[str, Any]:
+        """Tasa de fallos reciente (solo cuenta con un mínimo de trabajos)."""
+        config = self.config
+        jobs, failed = self.manager.recent_failures.counts()
+        rate = failed / jobs if jobs else 0.0
+        return {
+            'ok': jobs < config.READY_FAILURE_MIN_JOBS or rate <= config.READY_MAX_FAILURE_RATE,
+            'jobs': jobs,
+            'failed': failed,
+            'rate': round(rate, 3),
+            'max_rate': config.READY_MAX_FAILURE_RATE,
+            'window': config.READY_FAILURE_WINDOW
+        }
@@ -0,0 +1,206 @@
+"""
+Historial de descargas en SQLite.
+
+Cada tarea se guarda al admitirla y se actualiza al terminar. El historial se
+ordena por `(created_at, id)`: el id no sigue a `created_at`, porque la admisión
+(que extrae la información del video) puede tardar más en una tarea que en otra
+creada después. Las consultas usan paginación por cursor (`created_at` e id de
+la última fila devuelta) y siempre recorren un índice `(filtro, created_at)`
+hacia atrás desde el cursor, con las fechas como rango del mismo índice, así que
+el coste depende del tamaño de la página y no del número de filas de la tabla.
+"""
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import sqlite3
+
+
+# Filas por página por defecto y como máximo
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Longitud máxima del error que se guarda (el log completo está en /download/log)
+MAX_ERROR_LENGTH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    task_id TEXT NOT NULL UNIQUE,
+    client TEXT,
+    url TEXT NOT NULL,
+    format TEXT NOT NULL,
+    quality TEXT,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    completed_at REAL,
+    file_name TEXT,
+    file_size INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_format_created ON jobs (format, created_at);
+CREATE INDEX IF NOT EXISTS jobs_client_created ON jobs (client, created_at);
+CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at);
+"""
+
+_COLUMNS = 'id, task_id, client, url, format, quality, status, created_at, completed_at, file_name, file_size, error'
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    return value.timestamp() if value else None
+
+
+class HistoryStore:
+    """
+    Historial de tareas en una base de datos SQLite.
+    
+    La conexión se abre en el primer uso y se comparte entre hilos con un lock
+    (las escrituras son de una fila, así que no compiten por mucho tiempo).
+    
+    Args:
+        path: Archivo de la base de datos (':memory:' para no guardar nada en disco).
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional['sqlite3.Connection'] = None
+        self._lock = threading.Lock()
+    
+    def _connection(self) -> 'sqlite3.Connection':
+        """Abre la base de datos y crea las tablas (con el lock tomado)."""
+        if self._conn is None:
+            # sqlite3 carga su extensión C: solo al abrir el historial, no al importar la API
+            import sqlite3
+            
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+    
+    def add(self, task, client: Optional[str] = None):
+        """Guarda una tarea recién creada."""
+        with self._lock:
+            self._connection().execute(
+                'INSERT OR IGNORE INTO jobs (task_id, client, url, format, quality, status, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    task.task_id, client, task.url, task.format_type.value,
+                    task.quality.value if task.quality else None,
+                    task.status.value, _timestamp(task.created_at)
+                )
+            )
+    
+    def update(self, task):
+        """Guarda el estado final de una tarea."""
+        error = task.error[:MAX_ERROR_LENGTH] if task.error else None
+        with self._lock:
+            self._connection().execute(
+                'UPDATE jobs SET status = ?, completed_at = ?, file_name = ?, file_size = ?, error = ? '
+                'WHERE task_id = ?',
+                (
+                    task.status.value, _timestamp(task.completed_at),
+                    task.file_name, task.file_size, error, task.task_id
+                )
+            )
+    
+    @staticmethod
+    def _build_query(
+        limit: int,
+        cursor: Optional[Tuple[float, int]] = None,
+        status: Optional[str] = None,
+        format: Optional[str] = None,
+        client: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Tuple[str, List[Any]]:
+        """Consulta SQL y parámetros de una página del historial."""
+        conditions = []
+        params: List[Any] = []
+        for column, value in (('status', status), ('format', format), ('client', client)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        if cursor is not None:
+            conditions.append('(created_at, id) < (?, ?)')
+            params.extend(cursor)
+        if since is not None:
+            conditions.append('created_at >= ?')
+            params.append(since.timestamp())
+        if until is not None:
+            conditions.append('created_at < ?')
+            params.append(until.timestamp())
+        
+        sql = f'SELECT {_COLUMNS} FROM jobs'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+        params.append(limit)
+        return sql, params
+    
+    def query(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None, **filters) -> Dict[str, Any]:
+        """
+        Devuelve una página del historial, de la tarea más reciente a la más antigua.
+        
+        Args:
+            limit: Filas por página (como máximo MAX_PAGE_SIZE).
+            cursor: `next_cursor` de la página anterior (None para la primera).
+            **filters: status, format, client, since y until (opcionales).
+        
+        Returns:
+            Diccionario con `items` (resúmenes) y `next_cursor` (None si no hay más).
+        
+        Raises:
+            ValueError: Si el cursor no es válido.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        try:
+            if cursor is not None:
+                created_at, row_id = cursor.split(':')
+                position = (float(created_at), int(row_id))
+            else:
+                position = None
+        except ValueError:
+            raise ValueError(f"Cursor no válido: {cursor}")
+        
+        # Una fila de más indica si hay otra página
+        sql, params = self._build_query(limit + 1, position, **filters)
+        with self._lock:
+            rows = self._connection().execute(sql, params).fetchall()
+        
+        items = [self._summary(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            # `created_at:id` de la última fila (repr de float para no perder precisión)
+            last = rows[limit - 1]
+            next_cursor = f'{last[7]!r}:{last[0]}'
+        return {'items': items, 'next_cursor': next_cursor}
+    
+    @staticmethod
+    def _summary(row: tuple) -> Dict[str, Any]:
+        """Resumen de una fila (sin progreso, mensajes ni rutas)."""
+        (_, task_id, client, url, format_type, quality, status,
+         created_at, completed_at, file_name, file_size, error) = row
+        return {
+            'task_id': task_id,
+            'client': client,
+            'url': url,
+            'format': format_type,
+            'quality': quality,
+            'status': status,
+            'created_at': datetime.fromtimestamp(created_at),
+            'completed_at': datetime.fromtimestamp(completed_at) if completed_at else None,
+            'file_name': file_name,
+            'file_size': file_size,
+            'error': error,
+        }
+    
+    def close(self):
+        """Cierra la conexión (se vuelve a abrir si se usa otra vez)."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,297 @@
+"""
+Límites por cliente de la API: frecuencia de peticiones y cuotas diarias.
+
+- Frecuencia: un token bucket por cliente y grupo de endpoints (descargas e
+  información). Solo vive en memoria: si el proceso se reinicia los buckets
+  vuelven a estar llenos, que es lo mismo que pasa tras un rato sin peticiones.
+- Cuotas: trabajos y bytes por cliente y día (UTC). Se guardan en memoria y se
+  vuelcan a un JSON como mucho cada `QUOTA_PERSIST_INTERVAL` segundos (y al
+  apagar la API), así que un reinicio no las pone a cero.
+
+El cliente es la API key (cabecera `X-API-Key`, guardada como hash) si es una
+de `Config.API_KEYS` o, si no, la IP de la conexión. Una key desconocida no
+crea un cliente nuevo: si lo hiciera, cambiar de key en cada petición daría un
+bucket lleno y una cuota nueva cada vez.
+"""
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Collection, Dict, Optional, Tuple
+
+from core.config import Config
+from core.metrics import REJECTIONS
+
+
+# Buckets como máximo en memoria; al pasar se descartan los que ya están llenos
+MAX_BUCKETS = 10000
+
+
+class LimitExceeded(Exception):
+    """
+    El cliente ha superado su límite de peticiones o su cuota.
+    
+    Attributes:
+        retry_after: Segundos hasta que puede volver a intentarlo.
+    """
+    
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def client_id(api_key: Optional[str], host: Optional[str], api_keys: Collection[str] = ()) -> str:
+    """
+    Identificador del cliente (la API key no se guarda en claro).
+    
+    Args:
+        api_key: Valor de la cabecera `X-API-Key` (opcional)
+        host: IP de la conexión
+        api_keys: API keys reconocidas; las demás se ignoran
+    """
+    if api_key and api_key in api_keys:
+        return 'key:' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+    return 'ip:' + (host or 'unknown')
+
+
+class TokenBucket:
+    """
+    Bucket de `capacity` tokens que se rellena a `rate` tokens por segundo.
+    
+    Usa `__slots__` porque hay uno por cliente activo.
+    """
+    
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated')
+    
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def take(self, cost: float, now: float) -> float:
+        """
+        Consume `cost` tokens si los hay.
+        
+        Una petición que cuesta más que la capacidad (p. ej. un lote de URLs) se
+        admite con el bucket lleno y se cobra entera: el bucket queda en negativo
+        y el cliente espera a que se rellene, así que el ritmo medio se respeta.
+        
+        Returns:
+            0 si se consumieron, o los segundos que faltan para tenerlos.
+        """
+        self._refill(now)
+        required = min(cost, self.capacity)
+        if self.tokens >= required:
+            self.tokens -= cost
+            return 0.0
+        return (required - self.tokens) / self.rate
+    
+    def is_full(self, now: float) -> bool:
+        """True si el bucket se ha rellenado del todo (el cliente está inactivo)."""
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class RateLimiter:
+    """
+    Token buckets por cliente para un grupo de endpoints.
+    
+    Args:
+        per_minute: Peticiones por minuto sostenidas (0 = sin límite).
+        burst: Peticiones seguidas que se admiten con el bucket lleno.
+    """
+    
+    def __init__(self, per_minute: float, burst: int):
+        self.rate = per_minute / 60
+        self.capacity = max(burst, 1)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+    
+    def check(self, client: str, cost: float = 1):
+        """
+        Consume `cost` tokens del bucket del cliente.
+        
+        Raises:
+            LimitExceeded: Si no quedan tokens suficientes.
+        """
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                if len(self._buckets) >= MAX_BUCKETS:
+                    self._prune(now)
+                bucket = self._buckets[client] = TokenBucket(self.capacity, self.rate, now)
+            wait = bucket.take(cost, now)
+        if wait:
+            REJECTIONS.inc(reason='rate_limit')
+            raise LimitExceeded("Demasiadas peticiones: espera antes de volver a intentarlo", wait)
+    
+    def _prune(self, now: float):
+        """Descarta los buckets llenos: recrearlos da el mismo resultado."""
+        for client in [c for c, bucket in self._buckets.items() if bucket.is_full(now)]:
+            del self._buckets[client]
+
+
+def _seconds_to_midnight(now: datetime) -> float:
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - now).total_seconds()
+
+
+class QuotaTracker:
+    """
+    Trabajos y bytes de cada cliente en el día (UTC) en curso.
+    
+    Args:
+        max_jobs: Trabajos por día (0 = sin límite).
+        max_bytes: Bytes de archivos generados por día (0 = sin límite).
+        path: JSON donde se guardan las cuotas (None = solo en memoria).
+        persist_interval: Segundos mínimos entre escrituras del JSON.
+    """
+    
+    def __init__(self, max_jobs: int, max_bytes: int, path: Optional[str] = None, persist_interval: float = 30):
+        self.max_jobs = max_jobs
+        self.max_bytes = max_bytes
+        self.path = path
+        self.persist_interval = persist_interval
+        self.day = self._today()
+        # cliente -> [trabajos, bytes]
+        self._usage: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._load()
+    
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    
+    def _load(self):
+        """Recupera las cuotas del día guardadas (las de días anteriores se ignoran)."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('day') == self.day:
+            self._usage = {client: [int(jobs), int(size)] for client, (jobs, size) in data.get('usage', {}).items()}
+    
+    def _entry(self, client: str) -> list:
+        """Uso del cliente hoy; al cambiar de día se empieza de cero (con el lock tomado)."""
+        today = self._today()
+        if today != self.day:
+            self.day = today
+            self._usage.clear()
+        return self._usage.setdefault(client, [0, 0])
+    
+    def usage(self, client: str) -> Tuple[int, int]:
+        """Trabajos y bytes usados hoy por el cliente."""
+        with self._lock:
+            jobs, size = self._usage.get(client, (0, 0)) if self.day == self._today() else (0, 0)
+        return jobs, size
+    
+    def start_job(self, client: str):
+        """
+        Cuenta un trabajo nuevo si el cliente no ha agotado sus cuotas.
+        
+        Raises:
+            LimitExceeded: Si ya ha llegado al máximo de trabajos o de bytes del día.
+        """
+        with self._lock:
+            entry = self._entry(client)
+            if self.max_jobs and entry[0] >= self.max_jobs:
+                reason = f"Cuota diaria agotada: máximo {self.max_jobs} descargas"
+            elif self.max_bytes and entry[1] >= self.max_bytes:
+                reason = f"Cuota diaria agotada: máximo {self.max_bytes / 1024 ** 2:.0f} MB"
+            else:
+                entry[0] += 1
+                self._dirty = True
+                reason = None
+        if reason:
+            REJECTIONS.inc(reason='quota')
+            raise LimitExceeded(reason, _seconds_to_midnight(datetime.now(timezone.utc)))
+        self._maybe_save()
+    
+    def cancel_job(self, client: str):
+        """Devuelve un trabajo que no llegó a empezar (p. ej. rechazado en la admisión)."""
+        with self._lock:
+            entry = self._entry(client)
+            entry[0] = max(entry[0] - 1, 0)
+            self._dirty = True
+    
+    def add_bytes(self, client: str, size: int):
+        """Suma los bytes de un archivo generado por el cliente."""
+        with self._lock:
+            self._entry(client)[1] += size
+            self._dirty = True
+        self._maybe_save()
+    
+    def _maybe_save(self):
+        if self._dirty and time.monotonic() - self._saved_at >= self.persist_interval:
+            self.save()
+    
+    def save(self):
+        """Escribe las cuotas en el JSON (de forma atómica)."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'day': self.day, 'usage': {client: list(entry) for client, entry in self._usage.items()}}
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        tmp_path = self.path + '.tmp'
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+
+
+class ClientLimits:
+    """Límites de frecuencia y cuotas de la API, configurados con `Config`."""
+    
+    def __init__(self, config: Config):
+        self.api_keys = frozenset(config.API_KEYS)
+        self.downloads = RateLimiter(config.RATE_LIMIT_DOWNLOADS, config.RATE_LIMIT_BURST)
+        self.info = RateLimiter(config.RATE_LIMIT_INFO, config.RATE_LIMIT_BURST)
+        self.quotas = QuotaTracker(
+            config.QUOTA_JOBS_PER_DAY,
+            config.QUOTA_MB_PER_DAY * 1024 * 1024,
+            config.QUOTAS_PATH,
+            config.QUOTA_PERSIST_INTERVAL
+        )
+    
+    def close(self):
+        """Guarda las cuotas pendientes (al apagar la API)."""
+        self.quotas.save()
+
+
+# Instancia global de los límites: se crea en el primer uso (las cuotas se leen de disco)
+_client_limits: Optional[ClientLimits] = None
+_client_limits_lock = threading.Lock()
+
+
+def get_client_limits() -> ClientLimits:
+    """Devuelve los límites por cliente del proceso (dependencia de FastAPI)."""
+    global _client_limits
+    if _client_limits is None:
+        with _client_limits_lock:
+            if _client_limits is None:
+                _client_limits = ClientLimits(Config.get_default())
+    return _client_limits
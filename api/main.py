@@ -2,12 +2,79 @@
 API REST para el descargador de YouTube.
 
 Ejecutar con: uvicorn api.main:app --reload
+
+Importar este módulo solo define la aplicación: el gestor de tareas y los
+límites por cliente se crean al arrancar (lifespan) y llegan a las rutas como
+dependencias, así que las herramientas que solo importan `app` (tests, OpenAPI)
+no pagan su construcción.
+
+Al apagar, el gestor de tareas se drena (ver api/task_manager.py). Con SIGTERM
+el drenaje empieza en cuanto llega la señal y la API sigue respondiendo
+mientras tanto: POST /download devuelve 503 y /health informa del drenaje, así
+que el balanceador retira la réplica sin cortar los trabajos en curso.
 """
-from fastapi import FastAPI
+import signal
+import threading
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from api.routes.downloads import router as downloads_router
+from api.routes.history import router as history_router
+from api.limits import get_client_limits
+from api.task_manager import TaskManager, get_task_manager
+from core.metrics import metrics
+
+
+def _drain_on_sigterm(manager: TaskManager):
+    """
+    Drena el gestor al recibir SIGTERM antes de dejar que uvicorn se apague.
+    
+    uvicorn deja de aceptar conexiones en cuanto recibe la señal, así que su
+    manejador solo se llama cuando el drenaje termina. Una segunda señal se le
+    pasa directamente (apagado inmediato). Solo se puede instalar desde el hilo
+    principal; si no, el drenaje se hace en el apagado del lifespan.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    uvicorn_handler = signal.getsignal(signal.SIGTERM)
+    if not callable(uvicorn_handler):
+        return
+    received = []
+    
+    def handler(signum, frame):
+        received.append(signum)
+        if len(received) > 1:
+            uvicorn_handler(signum, frame)
+            return
+        
+        def drain():
+            manager.drain()
+            uvicorn_handler(signum, frame)
+        
+        threading.Thread(target=drain, name='drain', daemon=True).start()
+    
+    signal.signal(signal.SIGTERM, handler)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Crea los servicios y reanuda las tareas interrumpidas al arrancar; drena y guarda su estado al apagar."""
+    manager = get_task_manager()
+    limits = get_client_limits()
+    resumed = await run_in_threadpool(manager.resume)
+    if resumed:
+        print(f"Reanudadas {resumed} tareas interrumpidas por el último apagado")
+    _drain_on_sigterm(manager)
+    yield
+    # No hace nada si el drenaje ya se hizo al recibir SIGTERM
+    await run_in_threadpool(manager.drain)
+    limits.close()
+    manager.close()
+
 
 # Crear aplicación FastAPI
 app = FastAPI(
@@ -15,7 +82,8 @@ app = FastAPI(
     description="API REST para descargar audio y video desde YouTube",
     version="0.3.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -29,6 +97,7 @@ app.add_middleware(
 
 # Registrar routers
 app.include_router(downloads_router)
+app.include_router(history_router)
 
 
 @app.get("/", tags=["root"])
@@ -40,17 +109,55 @@ async def root():
         "docs": "/docs",
         "endpoints": {
             "download": "POST /download",
-            "status": "GET /download/status/{task_id}"
+            "status": "GET /download/status/{task_id}",
+            "history": "GET /history",
+            "ready": "GET /health/ready"
         }
     }
 
 
 @app.get("/health", tags=["health"])
-async def health_check():
-    """Health check endpoint."""
+async def health_check(manager: TaskManager = Depends(get_task_manager)):
+    """Health check endpoint (503 con el estado del drenaje mientras la API se apaga)."""
+    if manager.draining:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "draining", "drain": manager.drain_status()}
+        )
     return {"status": "healthy"}
 
 
+@app.get("/health/live", tags=["health"])
+async def liveness():
+    """Liveness: el proceso responde (no depende de disco, ffmpeg ni de la cola)."""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready", tags=["health"])
+async def readiness(manager: TaskManager = Depends(get_task_manager)):
+    """Readiness: 200 si la réplica puede aceptar trabajos; 503 con las comprobaciones que fallan si no."""
+    ready, checks = await run_in_threadpool(manager.readiness.check)
+    if ready:
+        return {"status": "ready", "checks": checks}
+    return JSONResponse(
+        status_code=503,
+        content={
+            "status": "not_ready",
+            "failing": [name for name, check in checks.items() if not check['ok']],
+            "checks": checks
+        }
+    )
+
+
+@app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+async def get_metrics():
+    """Métricas en formato de exposición de Prometheus."""
+    return PlainTextResponse(
+        content=metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -4,6 +4,11 @@ API models package.
 from .schemas import (
     DownloadRequest,
     DownloadResponse,
+    FormatType,
+    HistoryItem,
+    HistoryPage,
+    InfoBatchRequest,
+    InfoFields,
     TaskStatus,
     TaskStatusResponse,
     ErrorResponse
@@ -12,6 +17,11 @@ from .schemas import (
 __all__ = [
     'DownloadRequest',
     'DownloadResponse',
+    'FormatType',
+    'HistoryItem',
+    'HistoryPage',
+    'InfoBatchRequest',
+    'InfoFields',
     'TaskStatus',
     'TaskStatusResponse',
     'ErrorResponse'
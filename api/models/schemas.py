@@ -1,16 +1,23 @@
 """
 Esquemas Pydantic para la API.
 """
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl, field_validator, model_validator
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
+from core.config import Config
+from core.sections import format_section, parse_timestamp
+from core.subtitles import parse_languages
+from core.urls import normalize_url
+
 
 class FormatType(str, Enum):
     """Tipos de formato de descarga."""
     MP3 = "mp3"
     MP4 = "mp4"
+    SRT = "srt"
+    VTT = "vtt"
 
 
 class VideoQualityChoice(str, Enum):
@@ -34,8 +41,72 @@ class TaskStatus(str, Enum):
 class DownloadRequest(BaseModel):
     """Request para iniciar una descarga."""
     url: str = Field(..., description="URL del video de YouTube")
-    format: FormatType = Field(default=FormatType.MP3, description="Formato de descarga (mp3 o mp4)")
+    format: FormatType = Field(
+        default=FormatType.MP3,
+        description="Formato de descarga: mp3, mp4, o srt/vtt para descargar solo los subtítulos"
+    )
     quality: Optional[VideoQualityChoice] = Field(default=None, description="Calidad del video (solo para MP4)")
+    keep_log: bool = Field(default=False, description="Guardar el log completo de yt-dlp en disco")
+    start: Optional[float] = Field(
+        default=None,
+        description="Inicio del fragmento a descargar, en segundos o como [HH:]MM:SS"
+    )
+    end: Optional[float] = Field(
+        default=None,
+        description="Fin del fragmento a descargar, en segundos o como [HH:]MM:SS"
+    )
+    normalize: bool = Field(default=False, description="Normalizar el volumen (EBU R128, solo para MP3)")
+    embed_metadata: bool = Field(
+        default=False,
+        description="Incrustar etiquetas (título, artista, álbum...) y, en MP3, la portada"
+    )
+    subtitles: Optional[List[str]] = Field(
+        default=None,
+        description="Idiomas de subtítulos ('es', 'en'...): se descargan con srt/vtt o se incrustan en el MP4"
+    )
+    auto_subtitles: bool = Field(default=False, description="Usar los subtítulos automáticos si no hay manuales")
+    max_size_mb: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Tamaño máximo del archivo (MB). En MP4 se elige la mejor calidad que cabe"
+    )
+    max_seconds: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Tiempo máximo estimado de la descarga (s). En MP4 se elige la mejor calidad que cabe"
+    )
+    
+    @field_validator('url')
+    @classmethod
+    def validate_url(cls, value: str) -> str:
+        """Valida la URL sin lanzar yt-dlp y la sustituye por su forma canónica."""
+        config = Config.get_default()
+        return normalize_url(value, config.NO_PLAYLIST, config.EXTRA_ALLOWED_HOSTS)
+    
+    @field_validator('start', 'end', mode='before')
+    @classmethod
+    def validate_timestamp(cls, value):
+        """Acepta segundos o instantes con formato [HH:]MM:SS."""
+        return None if value is None else parse_timestamp(value)
+    
+    @field_validator('subtitles', mode='before')
+    @classmethod
+    def validate_subtitles(cls, value):
+        """Acepta una lista de idiomas o un texto separado por comas."""
+        return None if value is None else parse_languages(value)
+    
+    @model_validator(mode='after')
+    def validate_options(self):
+        """Comprueba el fragmento y las opciones que dependen del formato."""
+        if self.start is not None or self.end is not None:
+            if self.format in (FormatType.SRT, FormatType.VTT):
+                raise ValueError("Los fragmentos no están disponibles para los subtítulos")
+            format_section(self.start, self.end)
+        if self.normalize and self.format != FormatType.MP3:
+            raise ValueError("La normalización de volumen solo está disponible para MP3")
+        if self.subtitles and self.format == FormatType.MP3:
+            raise ValueError("Los subtítulos solo se pueden incrustar en MP4")
+        return self
     
     model_config = {
         "json_schema_extra": {
@@ -48,6 +119,51 @@ class DownloadRequest(BaseModel):
                     "url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
                     "format": "mp4",
                     "quality": "720"
+                },
+                {
+                    "url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+                    "format": "mp3",
+                    "start": "0:30",
+                    "end": "1:00"
+                },
+                {
+                    "url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+                    "format": "srt",
+                    "subtitles": ["es", "en"]
+                },
+                {
+                    "url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+                    "format": "mp4",
+                    "max_size_mb": 50
+                }
+            ]
+        }
+    }
+
+
+class InfoFields(str, Enum):
+    """Nivel de detalle de la extracción de metadatos."""
+    BASIC = "basic"
+    FULL = "full"
+
+
+class InfoBatchRequest(BaseModel):
+    """Request para obtener la información de varios videos."""
+    urls: List[str] = Field(..., min_length=1, description="URLs de los videos de YouTube")
+    fields: InfoFields = Field(
+        default=InfoFields.BASIC,
+        description="basic usa una extracción ligera (título, duración, autor...); full la extracción completa"
+    )
+    
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "urls": [
+                        "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+                        "https://youtu.be/9bZkp7q19f0"
+                    ],
+                    "fields": "basic"
                 }
             ]
         }
@@ -105,6 +221,30 @@ class TaskStatusResponse(BaseModel):
     }
 
 
+class HistoryItem(BaseModel):
+    """Resumen de una tarea en el historial."""
+    task_id: str = Field(..., description="ID de la tarea")
+    client: Optional[str] = Field(default=None, description="Cliente que la creó ('key:<hash>' o 'ip:<dirección>')")
+    url: str = Field(..., description="URL del video")
+    format: str = Field(..., description="Formato de descarga")
+    quality: Optional[str] = Field(default=None, description="Calidad del video (solo MP4)")
+    status: TaskStatus = Field(..., description="Estado de la tarea")
+    created_at: datetime = Field(..., description="Fecha de creación")
+    completed_at: Optional[datetime] = Field(default=None, description="Fecha de finalización")
+    file_name: Optional[str] = Field(default=None, description="Nombre del archivo generado")
+    file_size: Optional[int] = Field(default=None, description="Tamaño del archivo en bytes")
+    error: Optional[str] = Field(default=None, description="Error si falló (recortado)")
+
+
+class HistoryPage(BaseModel):
+    """Página del historial de descargas."""
+    items: List[HistoryItem] = Field(..., description="Tareas, de la más reciente a la más antigua")
+    next_cursor: Optional[str] = Field(
+        default=None,
+        description="Cursor de la página siguiente (null si no hay más)"
+    )
+
+
 class ErrorResponse(BaseModel):
     """Response de error."""
     error: str = Field(..., description="Tipo de error")
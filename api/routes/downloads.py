@@ -1,25 +1,63 @@
 """
 Rutas para las operaciones de descarga.
 """
-from fastapi import APIRouter, HTTPException, status, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, PlainTextResponse, RedirectResponse, StreamingResponse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+import json
 import os
 
+from api.limits import ClientLimits, LimitExceeded, RateLimiter, client_id, get_client_limits
 from api.models import (
     DownloadRequest,
     DownloadResponse,
+    InfoBatchRequest,
+    InfoFields,
     TaskStatusResponse,
     ErrorResponse,
+    FormatType,
     TaskStatus
 )
-from api.task_manager import task_manager
-from core import DownloaderService
+from api.task_manager import AdmissionError, TaskManager, get_task_manager
+from core import DownloaderService, ExtractionError, InvalidURLError, VideoQuality
+from core.config import FormatType as CoreFormatType
+from core.formats import pick_estimate
 
 router = APIRouter(prefix="/download", tags=["downloads"])
 
-# Instancia del servicio para obtener info de videos
-_downloader = DownloaderService()
+# Segundos que se piden esperar (Retry-After) cuando la API se está apagando
+DRAINING_RETRY_AFTER = 30
+
+
+def _client(http_request: Request, limits: ClientLimits) -> str:
+    """Cliente de la petición: su API key si es conocida o, si no, su IP."""
+    host = http_request.client.host if http_request.client else None
+    return client_id(http_request.headers.get('x-api-key'), host, limits.api_keys)
+
+
+def _too_many(error: LimitExceeded) -> HTTPException:
+    """Respuesta 429 con el tiempo de espera en Retry-After."""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(error),
+        headers={'Retry-After': str(error.retry_after)}
+    )
+
+
+def _check_rate(limiter: RateLimiter, client: str, cost: float = 1):
+    """
+    Aplica el límite de peticiones al cliente.
+    
+    Raises:
+        HTTPException: 429 si ha superado el límite.
+    """
+    try:
+        limiter.check(client, cost)
+    except LimitExceeded as e:
+        raise _too_many(e)
 
 
 @router.get(
@@ -27,7 +65,12 @@ _downloader = DownloaderService()
     summary="Obtener información del video",
     description="Obtiene información de un video de YouTube sin descargarlo"
 )
-async def get_video_info(url: str = Query(..., description="URL del video de YouTube")):
+async def get_video_info(
+    http_request: Request,
+    url: str = Query(..., description="URL del video de YouTube"),
+    manager: TaskManager = Depends(get_task_manager),
+    limits: ClientLimits = Depends(get_client_limits)
+):
     """
     Obtiene información de un video de YouTube.
     
@@ -35,8 +78,18 @@ async def get_video_info(url: str = Query(..., description="URL del video de You
     
     Retorna información como título, duración, thumbnail, autor, vistas, etc.
     """
+    _check_rate(limits.info, _client(http_request, limits))
+    
+    # Mismo servicio que el gestor de tareas: la información que se extrae aquí
+    # (vista previa) queda en caché para la descarga posterior
+    downloader = manager.downloader
+    try:
+        url = downloader.parse_url(url).url
+    except InvalidURLError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
     try:
-        video_info = _downloader.get_video_info(url)
+        video_info = downloader.get_video_info(url)
         
         if not video_info:
             raise HTTPException(
@@ -54,6 +107,165 @@ async def get_video_info(url: str = Query(..., description="URL del video de You
 
 
 
+def _stream_info_batch(downloader: DownloaderService, urls: List[str], flat: bool) -> Iterator[str]:
+    """
+    Extrae la información de varias URLs en paralelo y la emite como NDJSON.
+    
+    Las URLs no válidas se rechazan al momento sin lanzar yt-dlp, y las que
+    apuntan al mismo video se extraen una sola vez. Las líneas salen en orden
+    de finalización; cada una lleva el índice de la URL en la petición. Los
+    fallos se emiten como líneas con `ok: false`.
+    """
+    # Agrupar los índices por URL canónica
+    pending: Dict[str, List[int]] = {}
+    for index, url in enumerate(urls):
+        try:
+            canonical = downloader.parse_url(url).url
+        except InvalidURLError as e:
+            yield json.dumps({'index': index, 'url': url, 'ok': False, 'error': str(e)}, ensure_ascii=False) + '\n'
+            continue
+        pending.setdefault(canonical, []).append(index)
+    
+    if not pending:
+        return
+    
+    workers = min(downloader.config.INFO_BATCH_WORKERS, len(pending))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {
+        executor.submit(downloader.extract_info, canonical, flat): indices
+        for canonical, indices in pending.items()
+    }
+    try:
+        for future in as_completed(futures):
+            try:
+                result = {'ok': True, 'info': future.result().to_dict(include_formats=not flat)}
+            except ExtractionError as e:
+                result = {'ok': False, 'error': str(e)}
+            except Exception as e:
+                result = {'ok': False, 'error': f"Error inesperado: {e}"}
+            for index in futures[future]:
+                item = {'index': index, 'url': urls[index], **result}
+                yield json.dumps(item, ensure_ascii=False) + '\n'
+    finally:
+        # Si el cliente se desconecta, no lanzar las extracciones pendientes
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+@router.post(
+    "/info/batch",
+    summary="Obtener información de varios videos",
+    description="Extrae en paralelo la información de varias URLs y la devuelve como NDJSON"
+)
+async def get_video_info_batch(
+    request: InfoBatchRequest,
+    http_request: Request,
+    manager: TaskManager = Depends(get_task_manager),
+    limits: ClientLimits = Depends(get_client_limits)
+):
+    """
+    Obtiene la información de varios videos de YouTube.
+    
+    - **urls**: Lista de URLs
+    - **fields**: `basic` (extracción ligera) o `full`
+    
+    Retorna una línea JSON por URL en orden de finalización, con `index`, `url`, `ok` y
+    `info` (o `error` si la extracción falló). Cada URL cuenta como una petición en el
+    límite de frecuencia.
+    """
+    # Un lote demasiado grande se rechaza sin gastar tokens
+    max_urls = manager.downloader.config.INFO_BATCH_MAX_URLS
+    if len(request.urls) > max_urls:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Demasiadas URLs: máximo {max_urls} por petición"
+        )
+    
+    _check_rate(limits.info, _client(http_request, limits), cost=len(request.urls))
+    
+    return StreamingResponse(
+        _stream_info_batch(manager.downloader, request.urls, flat=request.fields == InfoFields.BASIC),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.get(
+    "/estimate",
+    summary="Estimar tamaño y tiempo",
+    description="Estima el tamaño del archivo y el tiempo de descarga de cada calidad"
+)
+async def estimate_download(
+    http_request: Request,
+    url: str = Query(..., description="URL del video de YouTube"),
+    format: FormatType = Query(default=FormatType.MP4, description="Formato de descarga (mp3 o mp4)"),
+    manager: TaskManager = Depends(get_task_manager),
+    limits: ClientLimits = Depends(get_client_limits)
+):
+    """
+    Estima el tamaño y el tiempo de una descarga.
+    
+    - **url**: URL del video de YouTube
+    - **format**: mp3 o mp4
+    
+    Retorna una estimación por calidad (de mayor a menor), calculada con los formatos del
+    video y el rendimiento medido en las últimas descargas. Los tamaños van en bytes.
+    """
+    if format not in (FormatType.MP3, FormatType.MP4):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Las estimaciones solo están disponibles para MP3 y MP4"
+        )
+    
+    _check_rate(limits.info, _client(http_request, limits))
+    
+    downloader = manager.downloader
+    try:
+        estimates = await run_in_threadpool(downloader.estimate_download, url, CoreFormatType(format.value))
+    except ExtractionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return {
+        'url': url,
+        'throughput': round(downloader.throughput.rate),
+        'estimates': [item.to_dict() for item in estimates]
+    }
+
+
+def _apply_budget(downloader: DownloaderService, request: DownloadRequest, quality: Optional[str]) -> Optional[str]:
+    """
+    Comprueba el presupuesto de tamaño/tiempo de una petición.
+    
+    En MP4 devuelve la mejor calidad (sin pasar de la pedida) que cabe; en MP3
+    solo comprueba que quepa. Si no se conocen los tamaños del video, la
+    petición se admite tal cual.
+    
+    Raises:
+        HTTPException: Si no se pudo extraer la información o nada cabe.
+    """
+    format_type = CoreFormatType(request.format.value)
+    max_bytes = request.max_size_mb * 1024 * 1024 if request.max_size_mb else None
+    try:
+        estimates = downloader.estimate_download(request.url, format_type, request.start, request.end)
+    except ExtractionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not estimates:
+        return quality
+    
+    limit = VideoQuality(request.quality.value) if request.quality else VideoQuality.BEST
+    chosen = pick_estimate(estimates, max_bytes, request.max_seconds, limit)
+    if chosen is None:
+        smallest = estimates[-1]
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                "Ninguna calidad cabe en el presupuesto (la menor ocupa "
+                f"{smallest.output_bytes / 1024 / 1024:.1f} MB y tarda ~{smallest.seconds:.0f} s)"
+            )
+        )
+    return chosen.quality.value if chosen.quality else quality
+
+
 @router.post(
     "",
     response_model=DownloadResponse,
@@ -61,36 +273,99 @@ async def get_video_info(url: str = Query(..., description="URL del video de You
     summary="Iniciar descarga",
     description="Inicia una descarga de YouTube y retorna un task_id para seguimiento"
 )
-async def create_download(request: DownloadRequest):
+async def create_download(
+    request: DownloadRequest,
+    http_request: Request,
+    manager: TaskManager = Depends(get_task_manager),
+    limits: ClientLimits = Depends(get_client_limits)
+):
     """
     Inicia una nueva descarga de YouTube.
     
     - **url**: URL del video de YouTube
-    - **format**: mp3 (audio) o mp4 (video)
+    - **format**: mp3 (audio), mp4 (video), o srt/vtt (solo subtítulos)
     - **quality**: Calidad del video (solo para MP4): 360, 480, 720, 1080, best
+    - **start** / **end**: Fragmento a descargar (opcional), en segundos o como [HH:]MM:SS
+    - **normalize**: Normalizar el volumen (EBU R128, solo MP3)
+    - **embed_metadata**: Incrustar etiquetas (y portada en MP3)
+    - **subtitles**: Idiomas de subtítulos (se descargan con srt/vtt o se incrustan en el MP4)
+    - **auto_subtitles**: Usar los subtítulos automáticos si no hay manuales
+    - **max_size_mb** / **max_seconds**: Presupuesto de tamaño y tiempo; en MP4 se elige la
+      mejor calidad que cabe (sin pasar de `quality`)
+    
+    Las descargas de solo subtítulos no esperan a que haya un slot libre. Antes de admitir
+    una descarga se comprueban la duración máxima y el espacio libre en disco (507 si no cabe).
+    
+    Cada cliente (cabecera `X-API-Key` si es una key configurada, o IP) tiene un límite de peticiones por minuto y
+    cuotas diarias de descargas y MB; al superarlos se responde 429 con `Retry-After`.
     
     Retorna un task_id que puedes usar para consultar el estado de la descarga.
     """
+    client = _client(http_request, limits)
+    _check_rate(limits.downloads, client)
     try:
-        # Validar que si es MP4, se proporcione calidad
-        quality = None
-        if request.format.value == "mp4":
-            quality = request.quality.value if request.quality else "720"
-        
-        # Crear tarea
-        task_id = task_manager.create_task(
+        limits.quotas.start_job(client)
+    except LimitExceeded as e:
+        raise _too_many(e)
+    
+    try:
+        return await _start_download(manager, request, client)
+    except HTTPException:
+        # La descarga no llegó a empezar: no cuenta para la cuota
+        limits.quotas.cancel_job(client)
+        raise
+
+
+async def _start_download(manager: TaskManager, request: DownloadRequest, client: str) -> DownloadResponse:
+    """Aplica el presupuesto y crea la tarea de una petición ya admitida por los límites."""
+    # Validar que si es MP4, se proporcione calidad
+    quality = None
+    if request.format.value == "mp4":
+        quality = request.quality.value if request.quality else "720"
+    
+    budget = request.max_size_mb is not None or request.max_seconds is not None
+    if budget and request.format in (FormatType.MP3, FormatType.MP4):
+        quality = await run_in_threadpool(_apply_budget, manager.downloader, request, quality)
+    
+    try:
+        # Crear tarea (la admisión extrae la información del video: fuera del event loop)
+        task_id = await run_in_threadpool(
+            manager.create_task,
             url=request.url,
             format_type=request.format.value,
-            quality=quality
+            quality=quality,
+            keep_log=request.keep_log,
+            start=request.start,
+            end=request.end,
+            normalize=request.normalize,
+            embed_metadata=request.embed_metadata,
+            subtitles=request.subtitles,
+            auto_subtitles=request.auto_subtitles,
+            client_id=client
         )
         
+        message = f"Descarga de {request.format.upper()} iniciada"
+        if budget and quality:
+            message += f" (calidad {quality})"
+        
         return DownloadResponse(
             task_id=task_id,
             status=TaskStatus.PENDING,
-            message=f"Descarga de {request.format.upper()} iniciada",
+            message=message,
             created_at=datetime.now()
         )
     
+    except AdmissionError as e:
+        if e.reason == 'draining':
+            # Otra réplica (o esta misma tras reiniciar) la admitirá en unos segundos
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e),
+                headers={'Retry-After': str(DRAINING_RETRY_AFTER)}
+            )
+        code = status.HTTP_507_INSUFFICIENT_STORAGE if e.reason == 'disk_space' else status.HTTP_400_BAD_REQUEST
+        raise HTTPException(status_code=code, detail=str(e))
+    
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -104,7 +379,7 @@ async def create_download(request: DownloadRequest):
     summary="Consultar estado",
     description="Consulta el estado de una descarga por su task_id"
 )
-async def get_download_status(task_id: str):
+async def get_download_status(task_id: str, manager: TaskManager = Depends(get_task_manager)):
     """
     Consulta el estado de una descarga.
     
@@ -112,7 +387,7 @@ async def get_download_status(task_id: str):
     
     Retorna el estado actual, progreso y detalles de la descarga.
     """
-    task = task_manager.get_task(task_id)
+    task = manager.get_task(task_id)
     
     if not task:
         raise HTTPException(
@@ -126,17 +401,19 @@ async def get_download_status(task_id: str):
 @router.get(
     "/file/{task_id}",
     summary="Descargar archivo",
-    description="Descarga el archivo resultante de una tarea completada"
+    description="Descarga el archivo resultante de una tarea completada "
+                "(con almacenamiento S3 redirige a una URL prefirmada del bucket)"
 )
-async def download_file(task_id: str):
+async def download_file(task_id: str, manager: TaskManager = Depends(get_task_manager)):
     """
     Descarga el archivo de una tarea completada.
     
     - **task_id**: ID de la tarea completada
     
-    Retorna el archivo descargado para que el usuario lo pueda guardar.
+    Retorna el archivo descargado para que el usuario lo pueda guardar, o una
+    redirección 307 a una URL prefirmada si el archivo está en S3.
     """
-    task = task_manager.get_task(task_id)
+    task = manager.get_task(task_id)
     
     if not task:
         raise HTTPException(
@@ -150,31 +427,67 @@ async def download_file(task_id: str):
             detail=f"La tarea aún no ha sido completada. Estado actual: {task.status}"
         )
     
-    if not task.file_path:
+    if not task.storage_key:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Archivo no encontrado para esta tarea"
         )
     
-    file_path = task.file_path
-    
-    if not os.path.exists(file_path):
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"El archivo no existe en el servidor"
-        )
-    
     # Obtener el nombre del archivo sin el task_id
     # Formato: task_id_nombre_real.ext -> nombre_real.ext
-    filename = task.file_name or os.path.basename(file_path)
+    filename = task.file_name or task.storage_key
     
     # Remover el task_id del nombre para dar el archivo con su nombre original
     if filename.startswith(task_id):
         # Formato: {task_id}_título.ext -> título.ext
         filename = filename[len(task_id)+1:]  # +1 para el guion bajo
     
+    # Con almacenamiento de objetos el cliente descarga directamente del bucket
+    presigned_url = manager.storage.presigned_url(task.storage_key, filename)
+    if presigned_url:
+        return RedirectResponse(presigned_url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    
+    file_path = manager.storage.local_path(task.storage_key)
+    
+    if not file_path or not os.path.exists(file_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"El archivo no existe en el servidor"
+        )
+    
     return FileResponse(
         path=file_path,
         filename=filename,
         media_type='application/octet-stream'
     )
+
+
+@router.get(
+    "/log/{task_id}",
+    response_class=PlainTextResponse,
+    summary="Log de la descarga",
+    description="Devuelve el log completo de yt-dlp de una tarea creada con keep_log"
+)
+async def get_download_log(task_id: str, manager: TaskManager = Depends(get_task_manager)):
+    """
+    Devuelve el log completo de una tarea.
+    
+    - **task_id**: ID de la tarea
+    
+    Solo existe si la tarea se creó con `keep_log: true` (o si el servidor guarda todos los logs).
+    """
+    task = manager.get_task(task_id)
+    
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Tarea {task_id} no encontrada"
+        )
+    
+    if not task.log_path or not os.path.exists(task.log_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No hay log guardado para esta tarea"
+        )
+    
+    return FileResponse(path=task.log_path, media_type='text/plain; charset=utf-8')
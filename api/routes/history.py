@@ -0,0 +1,57 @@
+"""
+Rutas del historial de descargas.
+"""
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+
+from api.history import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from api.models import FormatType, HistoryPage, TaskStatus
+from api.task_manager import TaskManager, get_task_manager
+
+router = APIRouter(prefix="/history", tags=["history"])
+
+
+@router.get(
+    "",
+    response_model=HistoryPage,
+    summary="Historial de descargas",
+    description="Lista las descargas de la más reciente a la más antigua, con paginación por cursor"
+)
+async def get_history(
+    cursor: Optional[str] = Query(default=None, description="next_cursor de la página anterior"),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Tareas por página"),
+    status_filter: Optional[TaskStatus] = Query(default=None, alias="status", description="Estado de la tarea"),
+    format: Optional[FormatType] = Query(default=None, description="Formato de descarga"),
+    client: Optional[str] = Query(default=None, description="Cliente ('key:<hash>' o 'ip:<dirección>')"),
+    since: Optional[datetime] = Query(default=None, description="Solo tareas creadas desde esta fecha"),
+    until: Optional[datetime] = Query(default=None, description="Solo tareas creadas antes de esta fecha"),
+    manager: TaskManager = Depends(get_task_manager)
+):
+    """
+    Devuelve una página del historial de descargas.
+    
+    - **cursor**: `next_cursor` de la página anterior (vacío para la primera)
+    - **limit**: tareas por página
+    - **status** / **format** / **client**: filtros opcionales
+    - **since** / **until**: rango de fechas de creación (ISO 8601)
+    
+    Cada tarea se devuelve como un resumen (estado, formato, archivo, tamaño y error), sin
+    el progreso ni los mensajes de `GET /download/status/{task_id}`.
+    """
+    try:
+        page = await run_in_threadpool(
+            manager.history.query,
+            limit,
+            cursor,
+            status=status_filter.value if status_filter else None,
+            format=format.value if format else None,
+            client=client,
+            since=since,
+            until=until
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return page
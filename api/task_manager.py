@@ -1,40 +1,116 @@
 """
 Gestor de tareas de descarga en memoria.
+
+Al apagar la API el gestor se drena: deja de admitir tareas, espera a que
+terminen las que están en curso hasta `DRAIN_TIMEOUT` y, pasado ese plazo,
+interrumpe yt-dlp (que deja los `.part` en disco) y guarda las tareas sin
+terminar en `CHECKPOINT_PATH`. Al arrancar se reanudan con el mismo id, así que
+yt-dlp continúa los archivos parciales en lugar de empezar de cero.
 """
 import uuid
+import time
+import json
+import shutil
 from datetime import datetime
-from typing import Dict, Optional
-from threading import Thread
-import sys
+from typing import Any, Dict, List, Optional
+from threading import Thread, BoundedSemaphore, Condition, Lock
 import os
 import glob
 from pathlib import Path
 
-# Agregar el directorio raíz al path
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-
-from core import DownloaderService, VideoQuality
+from core import DownloaderService, ExtractionError, VideoQuality
 from core.config import FormatType as CoreFormatType
+from core.downloader import classify_error
+from core.metrics import (
+    JOB_DURATION, PHASE_DURATION, FAILURES,
+    QUEUE_DEPTH, ACTIVE_SLOTS, TOTAL_SLOTS, REJECTIONS, RESERVED_BYTES, quality_label
+)
+from core.storage import StorageError, create_storage
+from core.subtitles import base_name, bundle
+from api.health import CLIENT_ERRORS, ReadinessChecker, RecentFailures
+from api.history import HistoryStore
+from api.limits import get_client_limits
 from api.models.schemas import TaskStatus, TaskStatusResponse
 
 
+class AdmissionError(Exception):
+    """
+    La tarea no se admite antes de empezar.
+    
+    Attributes:
+        reason: 'disk_space', 'duration', 'extraction' o 'draining'.
+    """
+    
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+
 class Task:
-    """Representa una tarea de descarga."""
+    """
+    Representa una tarea de descarga.
+    
+    Usa `__slots__` y guarda formato y calidad como miembros de enum (compartidos
+    por todas las tareas) para que el historial en memoria ocupe poco.
+    """
     
-    def __init__(self, task_id: str, url: str, format_type: str, quality: Optional[str] = None):
+    __slots__ = (
+        'task_id', 'url', 'format_type', 'quality', 'start', 'end',
+        'normalize', 'embed_metadata', 'subtitles', 'auto_subtitles',
+        'keep_log', 'log_path',
+        'status', 'progress', 'message', 'created_at', 'completed_at',
+        'file_path', 'storage_key', 'file_size', 'error'
+    )
+    
+    def __init__(
+        self,
+        task_id: str,
+        url: str,
+        format_type: str,
+        quality: Optional[str] = None,
+        keep_log: bool = False,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        normalize: bool = False,
+        embed_metadata: bool = False,
+        subtitles: Optional[List[str]] = None,
+        auto_subtitles: bool = False
+    ):
         self.task_id = task_id
         self.url = url
-        self.format_type = format_type
-        self.quality = quality
+        self.format_type = CoreFormatType(format_type)
+        self.quality = VideoQuality(quality) if quality else None
+        self.start = start
+        self.end = end
+        self.normalize = normalize
+        self.embed_metadata = embed_metadata
+        self.subtitles = tuple(subtitles) if subtitles else None
+        self.auto_subtitles = auto_subtitles
+        self.keep_log = keep_log
+        self.log_path: Optional[str] = None
         self.status = TaskStatus.PENDING
         self.progress = 0.0
         self.message = "Tarea creada"
         self.created_at = datetime.now()
         self.completed_at: Optional[datetime] = None
         self.file_path: Optional[str] = None
-        self.file_name: Optional[str] = None
+        self.storage_key: Optional[str] = None
+        self.file_size: Optional[int] = None
         self.error: Optional[str] = None
     
+    @property
+    def file_name(self) -> Optional[str]:
+        """Nombre del archivo descargado (sin la ruta)."""
+        path = self.file_path or self.storage_key
+        return os.path.basename(path) if path else None
+    
+    def metric_labels(self) -> Dict[str, str]:
+        """Etiquetas de formato y calidad para las métricas."""
+        return {
+            'format': self.format_type.value,
+            'quality': quality_label(self.format_type.value, self.quality.value if self.quality else None)
+        }
+    
     def to_response(self) -> TaskStatusResponse:
         """Convierte la tarea a un TaskStatusResponse."""
         return TaskStatusResponse(
@@ -59,8 +135,70 @@ class TaskManager:
     def __init__(self):
         self.tasks: Dict[str, Task] = {}
         self.downloader = DownloaderService()
+        
+        # Los archivos se generan en DOWNLOADS_DIR y después pasan al almacenamiento
+        # configurado (con el backend local se quedan donde están)
+        self.downloads_dir = Path(self.downloader.config.DOWNLOADS_DIR)
+        self.storage = create_storage(self.downloader.config)
+        
+        # Historial persistente (self.tasks solo guarda las tareas de este proceso)
+        self.history = HistoryStore(self.downloader.config.HISTORY_PATH)
+        
+        # Espacio reservado por las tareas admitidas que aún no han terminado
+        self._reservations: Dict[str, int] = {}
+        self._reservations_lock = Lock()
+        
+        # Cliente de la API de cada tarea en curso (fuera de Task para no agrandarla)
+        self._clients: Dict[str, str] = {}
+        
+        # Slots de descarga: limitan cuántos yt-dlp/ffmpeg corren a la vez
+        self.max_slots = self.downloader.config.MAX_CONCURRENT_DOWNLOADS
+        self._slots = BoundedSemaphore(self.max_slots)
+        self._counters_lock = Lock()
+        self.queued = 0
+        self.active = 0
+        
+        QUEUE_DEPTH.set_function(lambda: self.queued)
+        ACTIVE_SLOTS.set_function(lambda: self.active)
+        TOTAL_SLOTS.set_function(lambda: self.max_slots)
+        RESERVED_BYTES.set_function(lambda: self.reserved_bytes)
+        
+        # Apagado ordenado: `draining` cierra la admisión y `_stopping` indica que
+        # se interrumpió yt-dlp (las tareas afectadas se guardan para reanudarlas)
+        self.draining = False
+        self._stopping = False
+        self._drain_lock = Lock()
+        self._drain_deadline: Optional[float] = None
+        self.checkpointed: Optional[int] = None
+        
+        # Tareas creadas cuyo hilo aún no ha terminado
+        self._inflight = 0
+        self._idle = Condition()
+        
+        # Resultados recientes y comprobaciones de /health/ready
+        self.recent_failures = RecentFailures(self.downloader.config.READY_FAILURE_WINDOW)
+        self.readiness = ReadinessChecker(self)
     
-    def create_task(self, url: str, format_type: str, quality: Optional[str] = None) -> str:
+    @property
+    def reserved_bytes(self) -> int:
+        """Bytes reservados por las tareas en curso o en cola."""
+        with self._reservations_lock:
+            return sum(self._reservations.values())
+    
+    def create_task(
+        self,
+        url: str,
+        format_type: str,
+        quality: Optional[str] = None,
+        keep_log: bool = False,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        normalize: bool = False,
+        embed_metadata: bool = False,
+        subtitles: Optional[List[str]] = None,
+        auto_subtitles: bool = False,
+        client_id: Optional[str] = None
+    ) -> str:
         """
         Crea una nueva tarea de descarga.
         
@@ -68,20 +206,120 @@ class TaskManager:
             url: URL del video
             format_type: Formato (mp3 o mp4)
             quality: Calidad del video (opcional)
+            keep_log: Guardar el log completo de yt-dlp en disco
+            start: Inicio del fragmento en segundos (opcional)
+            end: Fin del fragmento en segundos (opcional)
+            normalize: Normalizar el volumen (solo MP3)
+            embed_metadata: Incrustar etiquetas y portada
+            subtitles: Idiomas de subtítulos (solo subtítulos con srt/vtt; incrustados en MP4)
+            auto_subtitles: Usar los subtítulos automáticos si no hay manuales
+            client_id: Cliente de la API al que se cargan los bytes generados (opcional)
         
         Returns:
             ID de la tarea creada
+        
+        Raises:
+            AdmissionError: Si el video es demasiado largo, no cabe en el disco o
+                la API se está apagando.
         """
+        if self.draining:
+            self._reject('draining', "El servidor se está reiniciando: vuelve a intentarlo en unos segundos")
+        
         task_id = str(uuid.uuid4())
-        task = Task(task_id, url, format_type, quality)
-        self.tasks[task_id] = task
+        task = Task(
+            task_id, url, format_type, quality, keep_log,
+            start, end, normalize, embed_metadata, subtitles, auto_subtitles
+        )
+        self._admit(task)
+        self._launch(task, client_id)
+        return task_id
+    
+    def _launch(self, task: Task, client_id: Optional[str] = None):
+        """
+        Registra una tarea admitida y la ejecuta en un hilo separado.
+        
+        Raises:
+            AdmissionError: Si el apagado empezó mientras se admitía la tarea.
+        """
+        with self._idle:
+            # La admisión puede tardar (extrae la información del video): si el
+            # apagado empezó entretanto, la tarea ya no cuenta para el drenaje
+            if self.draining:
+                with self._reservations_lock:
+                    self._reservations.pop(task.task_id, None)
+                self._reject('draining', "El servidor se está reiniciando: vuelve a intentarlo en unos segundos")
+            self._inflight += 1
         
-        # Iniciar descarga en un hilo separado
-        thread = Thread(target=self._execute_download, args=(task_id,))
+        self.tasks[task.task_id] = task
+        if client_id:
+            self._clients[task.task_id] = client_id
+        self.history.add(task, client_id)
+        
+        # El hilo es daemon para que un yt-dlp colgado no impida salir; drain() es
+        # quien espera a las tareas antes de apagar
+        thread = Thread(target=self._execute_download, args=(task.task_id,))
         thread.daemon = True
         thread.start()
+    
+    def _admit(self, task: Task):
+        """
+        Comprueba la duración y el espacio en disco antes de programar una tarea.
         
-        return task_id
+        Reserva el espacio estimado (archivos descargados + archivo final, que
+        conviven durante el merge o la conversión) hasta que la tarea termina,
+        para que varias tareas admitidas a la vez no cuenten con el mismo hueco.
+        Los subtítulos ocupan unos pocos KB y no se comprueban.
+        
+        Raises:
+            AdmissionError: Si la tarea no se admite.
+        """
+        if task.format_type.is_subtitle:
+            return
+        
+        config = self.downloader.config
+        try:
+            info = self.downloader.extract_info(task.url, flat=True)
+            estimates = self.downloader.estimate_download(task.url, task.format_type, task.start, task.end)
+        except ExtractionError as e:
+            self._reject('extraction', f"No se pudo obtener la información del video: {e}")
+        
+        if config.MAX_DURATION:
+            if info.is_live:
+                self._reject('duration', "No se admiten emisiones en directo: su duración no se conoce")
+            section_end = min(task.end, info.duration) if task.end is not None else info.duration
+            duration = section_end - (task.start or 0)
+            if duration > config.MAX_DURATION:
+                self._reject(
+                    'duration',
+                    f"El video dura {duration / 60:.0f} min; el máximo es {config.MAX_DURATION / 60:.0f} min"
+                )
+        
+        if task.format_type == CoreFormatType.MP4:
+            quality = task.quality or VideoQuality.HD
+            estimate = next((item for item in estimates if item.quality == quality), None)
+        else:
+            estimate = estimates[0] if estimates else None
+        # Sin tamaños publicados no hay nada que reservar
+        required = estimate.download_bytes + estimate.output_bytes if estimate else 0
+        
+        with self._reservations_lock:
+            self.downloads_dir.mkdir(exist_ok=True)
+            free = shutil.disk_usage(self.downloads_dir).free
+            available = free - sum(self._reservations.values()) - config.DISK_HEADROOM_MB * 1024 * 1024
+            if required > available:
+                REJECTIONS.inc(reason='disk_space')
+                raise AdmissionError(
+                    f"No hay espacio en disco: se necesitan {required / 1024 ** 2:.0f} MB "
+                    f"y hay {max(available, 0) / 1024 ** 2:.0f} MB disponibles",
+                    'disk_space'
+                )
+            self._reservations[task.task_id] = required
+    
+    @staticmethod
+    def _reject(reason: str, message: str):
+        """Registra el rechazo y lanza AdmissionError."""
+        REJECTIONS.inc(reason=reason)
+        raise AdmissionError(message, reason)
     
     def get_task(self, task_id: str) -> Optional[Task]:
         """Obtiene una tarea por su ID."""
@@ -98,6 +336,75 @@ class TaskManager:
         if not task:
             return
         
+        try:
+            self._execute(task)
+        finally:
+            with self._idle:
+                self._inflight -= 1
+                self._idle.notify_all()
+    
+    def _execute(self, task: Task):
+        """Espera un slot (salvo los subtítulos), ejecuta la tarea y registra el resultado."""
+        task_id = task.task_id
+        start = time.perf_counter()
+        
+        # Los subtítulos son unos pocos KB: no ocupan slot ni esperan detrás de los videos
+        if task.format_type.is_subtitle:
+            try:
+                self._run_task(task)
+            finally:
+                self._record_job_metrics(task, time.perf_counter() - start)
+                self.history.update(task)
+            return
+        
+        with self._counters_lock:
+            self.queued += 1
+        self._slots.acquire()
+        with self._counters_lock:
+            self.queued -= 1
+            self.active += 1
+        
+        try:
+            # Si se está apagando, la tarea en cola no empieza: se guarda para reanudarla
+            if self._stopping:
+                self._mark_interrupted(task)
+            else:
+                self._run_task(task)
+        finally:
+            with self._counters_lock:
+                self.active -= 1
+            self._slots.release()
+            with self._reservations_lock:
+                self._reservations.pop(task_id, None)
+            self._record_job_metrics(task, time.perf_counter() - start)
+            self.history.update(task)
+    
+    def _record_job_metrics(self, task: Task, duration: float):
+        """Registra la duración y el motivo de fallo de una tarea terminada (y carga los bytes a la cuota del cliente)."""
+        labels = task.metric_labels()
+        JOB_DURATION.observe(duration, status=task.status.value, **labels)
+        
+        if task.status == TaskStatus.FAILED:
+            reason = classify_error(task.error or task.message)
+            FAILURES.inc(reason=reason, **labels)
+            # Los fallos del video pedido no dicen nada del estado de la réplica
+            if reason not in CLIENT_ERRORS:
+                self.recent_failures.record(True)
+        elif task.status == TaskStatus.COMPLETED:
+            self.recent_failures.record(False)
+        
+        client = self._clients.pop(task.task_id, None)
+        if client and task.file_size:
+            get_client_limits().quotas.add_bytes(client, task.file_size)
+    
+    def _run_task(self, task: Task):
+        """
+        Descarga el contenido de una tarea que ya tiene un slot asignado.
+        
+        Args:
+            task: Tarea a ejecutar
+        """
+        task_id = task.task_id
         try:
             # Actualizar estado a descargando
             task.status = TaskStatus.DOWNLOADING
@@ -105,28 +412,64 @@ class TaskManager:
             task.progress = 10.0
             
             # Crear directorio downloads si no existe
-            downloads_dir = Path("downloads")
+            downloads_dir = self.downloads_dir
             downloads_dir.mkdir(exist_ok=True)
             
             # Usar template de yt-dlp para incluir el título del video
             # Formato: {task_id}_%(title)s.ext
-            file_extension = "mp3" if task.format_type == "mp3" else "mp4"
-            output_template = str(downloads_dir / f"{task_id}_%(title)s.{file_extension}")
+            file_extension = task.format_type.value
+            if task.format_type.is_subtitle:
+                # yt-dlp añade `.<idioma>.<formato>` a cada archivo de subtítulos
+                output_template = str(downloads_dir / f"{task_id}_%(title)s.%(ext)s")
+            else:
+                output_template = str(downloads_dir / f"{task_id}_%(title)s.{file_extension}")
+            
+            # El log completo solo se guarda en disco si se pidió
+            config = self.downloader.config
+            if task.keep_log or config.KEEP_TASK_LOGS:
+                logs_dir = Path(config.LOGS_DIR)
+                logs_dir.mkdir(exist_ok=True)
+                task.log_path = os.path.abspath(logs_dir / f"{task_id}.log")
+            
+            def on_progress(percent: float):
+                # 10-90% reservado para la descarga; nunca retroceder (MP4 baja dos streams)
+                task.progress = max(task.progress, round(10.0 + percent * 0.8, 1))
             
             # Ejecutar descarga según el formato
-            if task.format_type == "mp3":
-                result = self.downloader.download_audio(task.url, output_path=output_template)
+            if task.format_type.is_subtitle:
+                result = self.downloader.download_subtitles(
+                    task.url,
+                    languages=list(task.subtitles) if task.subtitles else None,
+                    sub_format=task.format_type,
+                    auto_subtitles=task.auto_subtitles,
+                    output_path=output_template,
+                    log_path=task.log_path,
+                    progress_callback=on_progress
+                )
+            elif task.format_type == CoreFormatType.MP3:
+                result = self.downloader.download_audio(
+                    task.url,
+                    output_path=output_template,
+                    log_path=task.log_path,
+                    progress_callback=on_progress,
+                    start=task.start,
+                    end=task.end,
+                    normalize=task.normalize,
+                    embed_metadata=task.embed_metadata
+                )
             else:
-                # Convertir quality string a VideoQuality enum
-                quality_map = {
-                    "360": VideoQuality.LOW,
-                    "480": VideoQuality.MEDIUM,
-                    "720": VideoQuality.HD,
-                    "1080": VideoQuality.FULL_HD,
-                    "best": VideoQuality.BEST
-                }
-                quality_enum = quality_map.get(task.quality, VideoQuality.HD)
-                result = self.downloader.download_video(task.url, quality=quality_enum, output_path=output_template)
+                result = self.downloader.download_video(
+                    task.url,
+                    quality=task.quality or VideoQuality.HD,
+                    output_path=output_template,
+                    log_path=task.log_path,
+                    progress_callback=on_progress,
+                    start=task.start,
+                    end=task.end,
+                    embed_metadata=task.embed_metadata,
+                    subtitles=list(task.subtitles) if task.subtitles else None,
+                    auto_subtitles=task.auto_subtitles
+                )
             
             # Actualizar progreso
             task.progress = 90.0
@@ -135,36 +478,231 @@ class TaskManager:
             
             # Verificar resultado
             if result.success:
+                # Usar el archivo anunciado por yt-dlp; si no, buscar el que comienza con el task_id
+                with PHASE_DURATION.time(phase='file_discovery', **task.metric_labels()):
+                    files = [path for path in result.files if os.path.exists(path)]
+                    if not files:
+                        pattern = str(downloads_dir / f"{task_id}_*.{file_extension}")
+                        files = sorted(glob.glob(pattern))
+                
+                # Varios idiomas de subtítulos se entregan en un solo ZIP
+                if task.format_type.is_subtitle and len(files) > 1:
+                    zip_path = str(downloads_dir / f"{base_name(files[0])}.{file_extension}.zip")
+                    files = [bundle(files, zip_path)]
+                
+                # Debería haber solo un archivo (file_name se deriva de file_path o storage_key)
+                if files:
+                    self._store(task, files[0])
+                
+                # La tarea solo se completa cuando el archivo ya está en el almacenamiento
                 task.status = TaskStatus.COMPLETED
                 task.progress = 100.0
                 task.message = result.message
                 task.completed_at = datetime.now()
-                
-                # Buscar el archivo descargado que comienza con el task_id
-                pattern = str(downloads_dir / f"{task_id}_*.{file_extension}")
-                files = glob.glob(pattern)
-                
-                if files:
-                    # Debería haber solo un archivo
-                    file_path = files[0]
-                    task.file_path = os.path.abspath(file_path)
-                    # Extraer solo el nombre del archivo (sin la ruta)
-                    task.file_name = os.path.basename(file_path)
-                else:
-                    task.file_path = None
-                    task.file_name = None
+            elif self._stopping:
+                self._mark_interrupted(task)
             else:
                 task.status = TaskStatus.FAILED
                 task.message = result.message
                 task.error = result.error
                 task.completed_at = datetime.now()
         
+        except StorageError as e:
+            task.status = TaskStatus.FAILED
+            task.message = "No se pudo guardar el archivo"
+            task.error = str(e)
+            task.completed_at = datetime.now()
+        
         except Exception as e:
+            if self._stopping:
+                self._mark_interrupted(task)
+                return
             task.status = TaskStatus.FAILED
             task.message = "Error inesperado durante la descarga"
             task.error = str(e)
             task.completed_at = datetime.now()
+    
+    @staticmethod
+    def _mark_interrupted(task: Task):
+        """Deja la tarea pendiente de reanudar tras el reinicio."""
+        task.status = TaskStatus.PENDING
+        task.message = "Interrumpida por un reinicio del servidor: se reanudará al arrancar"
+    
+    def _store(self, task: Task, path: str):
+        """
+        Pasa el archivo generado al almacenamiento.
+        
+        Con S3 el archivo se sube en partes (memoria constante) y se borra del
+        disco local al terminar; si la subida falla también se borra.
+        
+        Raises:
+            StorageError: Si no se pudo guardar.
+        """
+        task.message = "Guardando archivo..."
+        key = os.path.basename(path)
+        try:
+            with PHASE_DURATION.time(phase='store', **task.metric_labels()):
+                task.file_size = self.storage.store_file(key, path)
+        except StorageError:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            raise
+        task.storage_key = key
+        local_path = self.storage.local_path(key)
+        task.file_path = os.path.abspath(local_path) if local_path else None
+    
+    def drain(self, timeout: Optional[float] = None, grace: Optional[float] = None) -> int:
+        """
+        Apaga el gestor de forma ordenada (bloquea hasta terminar).
+        
+        Deja de admitir tareas y espera hasta `timeout` segundos a que terminen las
+        que están en curso o en cola. Si no da tiempo, interrumpe yt-dlp, espera
+        hasta `grace` segundos a que los hilos lo registren y guarda las tareas sin
+        terminar en `CHECKPOINT_PATH`. Llamarlo otra vez no hace nada.
+        
+        Args:
+            timeout: Segundos de espera (por defecto `Config.DRAIN_TIMEOUT`).
+            grace: Segundos tras interrumpir (por defecto `Config.DRAIN_GRACE`).
+        
+        Returns:
+            Número de tareas guardadas para reanudar.
+        """
+        config = self.downloader.config
+        timeout = config.DRAIN_TIMEOUT if timeout is None else timeout
+        grace = config.DRAIN_GRACE if grace is None else grace
+        
+        with self._drain_lock:
+            if self.checkpointed is not None:
+                return self.checkpointed
+            with self._idle:
+                self.draining = True
+            self._drain_deadline = time.monotonic() + timeout
+            # Los clientes se leen ya: al terminar cada tarea se quita el suyo
+            clients = dict(self._clients)
+            
+            with self._idle:
+                finished = self._idle.wait_for(lambda: self._inflight <= 0, timeout)
+            if not finished:
+                self._stopping = True
+                self.downloader.interrupt()
+                with self._idle:
+                    self._idle.wait_for(lambda: self._inflight <= 0, grace)
+            
+            unfinished = [
+                task for task in list(self.tasks.values())
+                if task.status not in (TaskStatus.COMPLETED, TaskStatus.FAILED)
+            ]
+            self._save_checkpoint(unfinished, clients)
+            self.checkpointed = len(unfinished)
+            return self.checkpointed
+    
+    def drain_status(self) -> Dict[str, Any]:
+        """Estado del apagado para /health."""
+        with self._idle:
+            in_flight = max(self._inflight, 0)
+        remaining = max(self._drain_deadline - time.monotonic(), 0) if self._drain_deadline else None
+        return {
+            'draining': self.draining,
+            'in_flight': in_flight,
+            'deadline_in': round(remaining, 1) if remaining is not None else None,
+            'interrupted': self._stopping,
+            'checkpointed': self.checkpointed
+        }
+    
+    def _save_checkpoint(self, tasks: List[Task], clients: Dict[str, str]):
+        """Guarda las tareas sin terminar (de forma atómica; sin tareas borra el archivo)."""
+        path = self.downloader.config.CHECKPOINT_PATH
+        if not tasks:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        
+        data = {'tasks': [
+            {
+                'task_id': task.task_id,
+                'url': task.url,
+                'format': task.format_type.value,
+                'quality': task.quality.value if task.quality else None,
+                'keep_log': task.keep_log,
+                'start': task.start,
+                'end': task.end,
+                'normalize': task.normalize,
+                'embed_metadata': task.embed_metadata,
+                'subtitles': list(task.subtitles) if task.subtitles else None,
+                'auto_subtitles': task.auto_subtitles,
+                'created_at': task.created_at.isoformat(),
+                'client': clients.get(task.task_id)
+            }
+            for task in tasks
+        ]}
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    
+    def resume(self) -> int:
+        """
+        Reanuda las tareas guardadas por el último apagado (al arrancar la API).
+        
+        Cada tarea conserva su id, y con él la plantilla de salida, así que yt-dlp
+        continúa sus `.part`. Las que ya no pasan la admisión se marcan como fallidas.
+        
+        Returns:
+            Número de tareas reanudadas.
+        """
+        path = self.downloader.config.CHECKPOINT_PATH
+        try:
+            with open(path, encoding='utf-8') as f:
+                entries = json.load(f).get('tasks', [])
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            print(f"No se pudo leer el checkpoint {path}: {e}")
+            return 0
+        os.remove(path)
+        
+        resumed = 0
+        for entry in entries:
+            task = Task(
+                entry['task_id'], entry['url'], entry['format'], entry.get('quality'),
+                entry.get('keep_log', False), entry.get('start'), entry.get('end'),
+                entry.get('normalize', False), entry.get('embed_metadata', False),
+                entry.get('subtitles'), entry.get('auto_subtitles', False)
+            )
+            task.created_at = datetime.fromisoformat(entry['created_at'])
+            task.message = "Reanudando tras un reinicio del servidor"
+            try:
+                self._admit(task)
+            except AdmissionError as e:
+                task.status = TaskStatus.FAILED
+                task.message = "No se pudo reanudar tras el reinicio"
+                task.error = str(e)
+                task.completed_at = datetime.now()
+                self.tasks[task.task_id] = task
+                self.history.update(task)
+                continue
+            self._launch(task, entry.get('client'))
+            resumed += 1
+        return resumed
+    
+    def close(self):
+        """Libera los recursos persistentes (al apagar la API)."""
+        self.history.close()
+
+
+# Instancia global del gestor de tareas: se crea al arrancar la API (lifespan) o en
+# el primer uso, no al importar el módulo
+_task_manager: Optional[TaskManager] = None
+_task_manager_lock = Lock()
 
 
-# Instancia global del gestor de tareas
-task_manager = TaskManager()
+def get_task_manager() -> TaskManager:
+    """Devuelve el gestor de tareas del proceso (dependencia de FastAPI)."""
+    global _task_manager
+    if _task_manager is None:
+        with _task_manager_lock:
+            if _task_manager is None:
+                _task_manager = TaskManager()
+    return _task_manager
@@ -0,0 +1,3 @@
+"""
+Benchmarks - Medición de rendimiento con un servidor de medios local.
+"""
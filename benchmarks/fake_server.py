@@ -0,0 +1,215 @@
+"""
+Servidor HTTP local que imita una página de video para los benchmarks.
+
+Sirve medios sintéticos generados con el ffmpeg estático del proyecto y una
+página por video con metadatos JSON-LD (`VideoObject`), que el extractor
+genérico de yt-dlp entiende igual que una extracción real. Así se puede medir
+el pipeline completo sin depender de YouTube ni de la red.
+"""
+import json
+import os
+import re
+import subprocess
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+# Resoluciones sintéticas (alto -> ancho) disponibles en el servidor
+RESOLUTIONS: Dict[int, int] = {360: 640, 480: 854, 720: 1280, 1080: 1920}
+
+_RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+def generate_media(
+    ffmpeg_path: str,
+    output_dir: Path,
+    heights: Iterable[int] = (360, 720),
+    duration: int = 10
+) -> Dict[int, Path]:
+    """
+    Genera videos MP4 sintéticos (patrón de test + tono) con ffmpeg.
+    
+    Los archivos ya generados con la misma duración se reutilizan.
+    
+    Args:
+        ffmpeg_path: Ruta al ejecutable de ffmpeg.
+        output_dir: Carpeta donde guardar los medios.
+        heights: Altos de video a generar.
+        duration: Duración de cada video en segundos.
+    
+    Returns:
+        Diccionario alto -> ruta del archivo generado.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    media = {}
+    
+    for height in heights:
+        width = RESOLUTIONS.get(height, height * 16 // 9)
+        path = output_dir / f"video_{height}p_{duration}s.mp4"
+        if not path.exists():
+            command = [
+                ffmpeg_path, '-y', '-loglevel', 'error',
+                '-f', 'lavfi', '-i', f'testsrc2=duration={duration}:size={width}x{height}:rate=30',
+                '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+                '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+                '-c:a', 'aac', '-b:a', '128k',
+                '-shortest', str(path)
+            ]
+            subprocess.run(command, check=True)
+        media[height] = path
+    
+    return media
+
+
+class FakeMediaServer:
+    """
+    Servidor de medios sintéticos en un hilo de fondo.
+    
+    Rutas:
+        /watch/<height>  Página HTML con metadatos JSON-LD del video.
+        /media/<name>    Archivo de medios (admite peticiones Range).
+    """
+    
+    def __init__(self, media: Dict[int, Path], duration: int, host: str = '127.0.0.1', port: int = 0):
+        """
+        Inicializa el servidor.
+        
+        Args:
+            media: Diccionario alto -> ruta del archivo (ver `generate_media`).
+            duration: Duración de los medios en segundos.
+            host: Interfaz donde escuchar.
+            port: Puerto (0 elige uno libre).
+        """
+        self.media = media
+        self.duration = duration
+        self._files = {path.name: path for path in media.values()}
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def base_url(self) -> str:
+        """URL base del servidor."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def page_url(self, height: int) -> str:
+        """URL de la página del video con el alto indicado."""
+        return f"{self.base_url}/watch/{height}"
+    
+    def start(self):
+        """Arranca el servidor en segundo plano."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Detiene el servidor."""
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def _render_page(self, height: int) -> bytes:
+        """Genera la página HTML con el `VideoObject` JSON-LD de un video."""
+        path = self.media[height]
+        video_object = {
+            '@context': 'https://schema.org',
+            '@type': 'VideoObject',
+            'name': f'Benchmark {height}p',
+            'description': 'Video sintético para benchmarks',
+            'duration': f'PT{self.duration}S',
+            'contentUrl': f'{self.base_url}/media/{path.name}',
+            'encodingFormat': 'video/mp4',
+            'contentSize': str(path.stat().st_size),
+            'width': RESOLUTIONS.get(height, height * 16 // 9),
+            'height': height,
+            'uploadDate': '2025-12-15',
+            'author': {'@type': 'Person', 'name': 'Benchmark'},
+            'interactionCount': 0,
+        }
+        html = (
+            '<!DOCTYPE html><html><head>'
+            f'<title>Benchmark {height}p</title>'
+            f'<script type="application/ld+json">{json.dumps(video_object)}</script>'
+            '</head><body></body></html>'
+        )
+        return html.encode('utf-8')
+    
+    def _make_handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+            
+            def do_HEAD(self):
+                self._handle(send_body=False)
+            
+            def do_GET(self):
+                self._handle(send_body=True)
+            
+            def _handle(self, send_body: bool):
+                parts = self.path.split('?', 1)[0].strip('/').split('/')
+                if len(parts) == 2 and parts[0] == 'watch' and parts[1].isdigit() \
+                        and int(parts[1]) in server.media:
+                    body = server._render_page(int(parts[1]))
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/html; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    if send_body:
+                        self.wfile.write(body)
+                elif len(parts) == 2 and parts[0] == 'media' and parts[1] in server._files:
+                    self._send_file(server._files[parts[1]], send_body)
+                else:
+                    self.send_error(404)
+            
+            def _send_file(self, path: Path, send_body: bool):
+                size = path.stat().st_size
+                start, end = 0, size - 1
+                match = _RANGE_PATTERN.fullmatch(self.headers.get('Range', ''))
+                if match and (match.group(1) or match.group(2)):
+                    if match.group(1):
+                        start = int(match.group(1))
+                        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+                    else:
+                        start = max(size - int(match.group(2)), 0)
+                    if start > end:
+                        self.send_error(416)
+                        return
+                    self.send_response(206)
+                    self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+                else:
+                    self.send_response(200)
+                
+                length = end - start + 1
+                self.send_header('Content-Type', 'video/mp4')
+                self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('Content-Length', str(length))
+                self.end_headers()
+                if not send_body:
+                    return
+                
+                with open(path, 'rb') as f:
+                    f.seek(start)
+                    remaining = length
+                    while remaining > 0:
+                        chunk = f.read(min(64 * 1024, remaining))
+                        if not chunk:
+                            break
+                        self.wfile.write(chunk)
+                        remaining -= len(chunk)
+        
+        return Handler
+
+
+def default_media_dir() -> Path:
+    """Carpeta por defecto para los medios sintéticos."""
+    return Path(os.environ.get('BENCH_MEDIA_DIR', Path(__file__).parent / '.media'))
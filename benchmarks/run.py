@@ -0,0 +1,275 @@
+"""
+Benchmark de extremo a extremo de la API de descargas.
+
+Levanta un servidor de medios sintéticos y la API en el mismo proceso, lanza
+trabajos con la concurrencia indicada y reporta, por formato y calidad:
+trabajos/s, latencia p50/p99, segundos de CPU (proceso + hijos) y RSS pico.
+
+Ejemplos:
+    python -m benchmarks.run --jobs 20 --concurrency 4
+    python -m benchmarks.run --scenarios mp3,mp4:720 --output bench.json
+    python -m benchmarks.run --baseline bench.json --tolerance 0.15
+"""
+import argparse
+import json
+import math
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.fake_server import FakeMediaServer, generate_media, default_media_dir
+
+
+FINAL_STATES = ('completed', 'failed')
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano (0 si no hay valores)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def parse_scenario(text: str) -> Tuple[str, Optional[str]]:
+    """Convierte 'mp3' o 'mp4:720' en (formato, calidad)."""
+    format_type, _, quality = text.strip().partition(':')
+    if format_type not in ('mp3', 'mp4'):
+        raise argparse.ArgumentTypeError(f"Formato no soportado: {format_type}")
+    if format_type == 'mp4':
+        quality = quality or '720'
+    return format_type, quality or None
+
+
+def _usage() -> Tuple[float, int]:
+    """Segundos de CPU (usuario + sistema) del proceso y sus hijos, y RSS pico en KB."""
+    if resource is None:
+        return time.process_time(), 0
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+    return cpu, max(own.ru_maxrss, children.ru_maxrss)
+
+
+def _request(method: str, url: str, payload: Optional[dict] = None) -> dict:
+    """Hace una petición JSON a la API."""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(url, data=data, method=method)
+    request.add_header('Content-Type', 'application/json')
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def run_job(api_url: str, media_url: str, format_type: str, quality: Optional[str],
+            poll_interval: float) -> Tuple[float, str]:
+    """
+    Lanza un trabajo y espera a que termine.
+    
+    Returns:
+        Tupla (latencia en segundos, estado final).
+    """
+    start = time.perf_counter()
+    payload = {'url': media_url, 'format': format_type}
+    if quality:
+        payload['quality'] = quality
+    task = _request('POST', f"{api_url}/download", payload)
+    
+    while True:
+        status = _request('GET', f"{api_url}/download/status/{task['task_id']}")
+        if status['status'] in FINAL_STATES:
+            return time.perf_counter() - start, status['status']
+        time.sleep(poll_interval)
+
+
+def run_scenario(api_url: str, server: FakeMediaServer, format_type: str, quality: Optional[str],
+                 jobs: int, concurrency: int, poll_interval: float) -> Dict[str, float]:
+    """Ejecuta un escenario y devuelve sus métricas agregadas."""
+    if format_type == 'mp4' and quality != 'best':
+        height = int(quality)
+    else:
+        height = max(server.media)
+    media_url = server.page_url(height)
+    
+    cpu_before, _ = _usage()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(
+            lambda _: run_job(api_url, media_url, format_type, quality, poll_interval),
+            range(jobs)
+        ))
+    elapsed = time.perf_counter() - start
+    cpu_after, peak_rss = _usage()
+    
+    latencies = [latency for latency, state in results if state == 'completed']
+    failed = sum(1 for _, state in results if state != 'completed')
+    return {
+        'jobs': jobs,
+        'failed': failed,
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'jobs_per_s': round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        'p50_s': round(percentile(latencies, 50), 3),
+        'p99_s': round(percentile(latencies, 99), 3),
+        'cpu_s': round(cpu_after - cpu_before, 3),
+        'peak_rss_mb': round(peak_rss / 1024, 1),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_api(port: int):
+    """
+    Arranca la API en un hilo y espera a que acepte conexiones.
+    
+    Returns:
+        Tupla con el servidor de uvicorn y su hilo.
+    """
+    import uvicorn
+    from api.limits import QuotaTracker, RateLimiter, get_client_limits
+    from api.main import app
+    
+    # Todos los trabajos salen de la misma IP: sin límites por cliente
+    client_limits = get_client_limits()
+    client_limits.downloads = RateLimiter(0, 1)
+    client_limits.quotas = QuotaTracker(0, 0)
+    
+    config = uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning')
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("La API no arrancó a tiempo")
+        time.sleep(0.05)
+    return server, thread
+
+
+def compare_with_baseline(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """
+    Compara con una ejecución anterior.
+    
+    Returns:
+        Lista de regresiones encontradas (vacía si no hay).
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if previous['jobs_per_s'] and current['jobs_per_s'] < previous['jobs_per_s'] * (1 - tolerance):
+            regressions.append(
+                f"{name}: trabajos/s {current['jobs_per_s']} < {previous['jobs_per_s']} (base)"
+            )
+        if previous['p99_s'] and current['p99_s'] > previous['p99_s'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {current['p99_s']}s > {previous['p99_s']}s (base)")
+        if current['failed'] > previous['failed']:
+            regressions.append(f"{name}: {current['failed']} fallos (base: {previous['failed']})")
+    return regressions
+
+
+def print_table(results: Dict[str, dict]):
+    """Muestra los resultados en forma de tabla."""
+    header = f"{'escenario':<12}{'jobs/s':>9}{'p50 s':>9}{'p99 s':>9}{'CPU s':>9}{'RSS MB':>9}{'fallos':>8}"
+    print(header)
+    print('-' * len(header))
+    for name, data in results.items():
+        print(
+            f"{name:<12}{data['jobs_per_s']:>9}{data['p50_s']:>9}{data['p99_s']:>9}"
+            f"{data['cpu_s']:>9}{data['peak_rss_mb']:>9}{data['failed']:>8}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark de la API de descargas con medios sintéticos")
+    parser.add_argument('--scenarios', default='mp3,mp4:360,mp4:720',
+                        help="Lista de formato[:calidad] separada por comas")
+    parser.add_argument('--jobs', type=int, default=10, help="Trabajos por escenario")
+    parser.add_argument('--concurrency', type=int, default=4, help="Clientes simultáneos")
+    parser.add_argument('--duration', type=int, default=10, help="Duración de los medios sintéticos (s)")
+    parser.add_argument('--poll-interval', type=float, default=0.2, help="Intervalo de consulta de estado (s)")
+    parser.add_argument('--media-dir', type=Path, default=default_media_dir(),
+                        help="Carpeta de caché de medios sintéticos")
+    parser.add_argument('--output', type=Path, help="Guardar resultados en JSON")
+    parser.add_argument('--baseline', type=Path, help="JSON de una ejecución anterior para comparar")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="Regresión tolerada frente a la base (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+    
+    scenarios = [parse_scenario(item) for item in args.scenarios.split(',') if item.strip()]
+    heights = sorted({int(q) for f, q in scenarios if f == 'mp4' and q != 'best'} or {720})
+    
+    # Los artefactos de la API se escriben en ./downloads: usar una carpeta temporal
+    media_dir = args.media_dir.resolve()
+    output = args.output.resolve() if args.output else None
+    baseline_path = args.baseline.resolve() if args.baseline else None
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    os.chdir(workdir)
+    
+    # La API solo acepta URLs de YouTube: permitir el servidor local de medios
+    os.environ['DOWNLOADER_EXTRA_HOSTS'] = '127.0.0.1'
+    
+    from api.task_manager import get_task_manager
+    task_manager = get_task_manager()
+    media = generate_media(task_manager.downloader._ffmpeg_path, media_dir, heights, args.duration)
+    
+    port = _free_port()
+    api_server, api_thread = start_api(port)
+    api_url = f"http://127.0.0.1:{port}"
+    
+    results = {}
+    try:
+        with FakeMediaServer(media, args.duration) as server:
+            for format_type, quality in scenarios:
+                name = f"{format_type}:{quality}" if quality else format_type
+                print(f"Ejecutando {name} ({args.jobs} trabajos, concurrencia {args.concurrency})...",
+                      file=sys.stderr)
+                results[name] = run_scenario(
+                    api_url, server, format_type, quality,
+                    args.jobs, args.concurrency, args.poll_interval
+                )
+    finally:
+        # Esperar al apagado de la API (lifespan: drenaje, cuotas e historial)
+        api_server.should_exit = True
+        api_thread.join(timeout=30)
+    
+    print_table(results)
+    print(f"\nSlots de descarga: {task_manager.max_slots} | artefactos en {workdir}")
+    
+    if output:
+        output.write_text(json.dumps(results, indent=2), encoding='utf-8')
+    
+    if baseline_path:
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegresiones detectadas:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("\nSin regresiones frente a la base.")
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,30 @@
 """
 Interfaz de línea de comandos para el descargador de YouTube.
+
+Sin argumentos muestra el menú interactivo. Con subcomandos es apta para scripts:
+    
+    python -m cli.main info URL [URL ...]
+    python -m cli.main get URL --format mp4 --quality 720
+    python -m cli.main get URL --start 1:30 --end 2:00
+    python -m cli.main get URL --format srt --sub-langs es,en
+    python -m cli.main batch -i urls.txt --jobs 4 > resultados.jsonl
+    cat urls.txt | python -m cli.main batch -i - --format mp3
+
+Los resultados se escriben en stdout como JSON lines (uno por URL) y el
+progreso agregado en stderr.
 """
+import argparse
+import json
 import sys
-from pathlib import Path
-
-# Agregar el directorio raíz al path para imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, TextIO
 
-from core import DownloaderService, Config, VideoQuality
+from core import DownloaderService, Config, ExtractionError, VideoQuality
 from core.config import FormatType
+from core.sections import format_section, parse_timestamp
+from core.subtitles import parse_languages
 
 
 def show_menu():
@@ -54,37 +70,352 @@ def show_menu():
     return url, format_type, video_quality
 
 
-def main():
+def interactive():
+    """Ejecuta el menú interactivo para una sola URL."""
+    # Mostrar menú y obtener opciones
+    url, format_type, video_quality = show_menu()
+    
+    if not url:
+        print("URL no proporcionada. Saliendo.")
+        return
+    
+    # Inicializar el servicio de descarga
+    print("\nInicializando descargador...")
+    downloader = DownloaderService()
+    
+    # Ejecutar descarga según el formato
+    print(f"\n--- Iniciando descarga {format_type.value.upper()} para: {url} ---\n")
+    
+    if format_type == FormatType.MP3:
+        result = downloader.download_audio(url)
+    else:
+        result = downloader.download_video(url, quality=video_quality)
+    
+    # Mostrar resultado
+    if result.success:
+        print(f"\n--- {result.message.upper()} ---")
+        if result.output:
+            print(result.output)
+    else:
+        print(f"\n!!! {result.message.upper()} !!!")
+        if result.error:
+            print(f"Detalles del error:\n{result.error}")
+
+
+class BatchProgress:
+    """Línea de progreso agregada para varias descargas en paralelo."""
+    
+    def __init__(self, total: int, stream: TextIO = sys.stderr, enabled: bool = True):
+        self.total = total
+        self.stream = stream
+        self.enabled = enabled
+        self.completed = 0
+        self.failed = 0
+        self._running: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._last_render = 0.0
+        self._interactive = enabled and stream.isatty()
+    
+    def start(self, index: int):
+        """Marca una URL como en curso."""
+        with self._lock:
+            self._running[index] = 0.0
+        self.render()
+    
+    def update(self, index: int, percent: float):
+        """Actualiza el porcentaje de una URL en curso."""
+        with self._lock:
+            self._running[index] = percent
+        self.render(throttle=True)
+    
+    def finish(self, index: int, success: bool):
+        """Marca una URL como terminada."""
+        with self._lock:
+            self._running.pop(index, None)
+            if success:
+                self.completed += 1
+            else:
+                self.failed += 1
+        self.render()
+    
+    def render(self, throttle: bool = False, final: bool = False):
+        """Escribe la línea de progreso en stderr."""
+        if not self.enabled or (final and not self._interactive):
+            return
+        now = time.monotonic()
+        with self._lock:
+            if throttle and now - self._last_render < 0.2:
+                return
+            self._last_render = now
+            done = self.completed + self.failed
+            running = len(self._running)
+            # Progreso global: terminadas + fracción de las que están en curso
+            fraction = (done + sum(self._running.values()) / 100) / self.total if self.total else 1.0
+            line = (
+                f"[{done}/{self.total}] {fraction * 100:5.1f}% | "
+                f"ok: {self.completed} | fallidas: {self.failed} | en curso: {running}"
+            )
+        if self._interactive:
+            self.stream.write('\r' + line + ('\n' if final else ''))
+        elif final or not throttle:
+            self.stream.write(line + '\n')
+        self.stream.flush()
+
+
+def read_urls(urls: Iterable[str], input_path: Optional[str], stdin: TextIO = sys.stdin) -> List[str]:
+    """
+    Reúne las URLs de los argumentos, de un archivo o de stdin.
+    
+    Se ignoran líneas vacías y comentarios (`#`), y se eliminan duplicados
+    manteniendo el orden.
+    
+    Args:
+        urls: URLs pasadas como argumentos.
+        input_path: Archivo con una URL por línea ('-' para stdin).
+        stdin: Flujo de entrada estándar.
+    
+    Returns:
+        Lista de URLs.
+    """
+    collected = list(urls)
+    
+    if input_path == '-' or (not collected and input_path is None and not stdin.isatty()):
+        collected.extend(stdin.read().splitlines())
+    elif input_path:
+        with open(input_path, encoding='utf-8') as f:
+            collected.extend(f.read().splitlines())
+    
+    seen = set()
+    result = []
+    for url in (u.strip() for u in collected):
+        if url and not url.startswith('#') and url not in seen:
+            seen.add(url)
+            result.append(url)
+    return result
+
+
+def _download_one(
+    downloader: DownloaderService,
+    url: str,
+    format_type: FormatType,
+    quality: Optional[VideoQuality],
+    output: Optional[str],
+    progress_callback: Callable[[float], None],
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    normalize: bool = False,
+    embed_metadata: bool = False,
+    subtitles: Optional[List[str]] = None,
+    auto_subtitles: bool = False
+) -> dict:
+    """Descarga una URL (o un fragmento, o sus subtítulos) y devuelve su resultado como diccionario."""
+    started = time.perf_counter()
+    if format_type.is_subtitle:
+        result = downloader.download_subtitles(
+            url, languages=subtitles, sub_format=format_type, auto_subtitles=auto_subtitles,
+            output_path=output, progress_callback=progress_callback
+        )
+    elif format_type == FormatType.MP3:
+        result = downloader.download_audio(
+            url, output_path=output, progress_callback=progress_callback,
+            start=start, end=end, normalize=normalize, embed_metadata=embed_metadata
+        )
+    else:
+        result = downloader.download_video(
+            url, quality=quality or VideoQuality.HD,
+            output_path=output, progress_callback=progress_callback,
+            start=start, end=end, embed_metadata=embed_metadata,
+            subtitles=subtitles, auto_subtitles=auto_subtitles
+        )
+    return {
+        'url': url,
+        'success': result.success,
+        'message': result.message,
+        'file_path': result.file_path,
+        'files': result.files,
+        'error': result.error or None,
+        'elapsed_s': round(time.perf_counter() - started, 3),
+    }
+
+
+def run_downloads(
+    downloader: DownloaderService,
+    urls: List[str],
+    format_type: FormatType,
+    quality: Optional[VideoQuality],
+    output: Optional[str],
+    jobs: int,
+    out: TextIO = sys.stdout,
+    show_progress: bool = True,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    normalize: bool = False,
+    embed_metadata: bool = False,
+    subtitles: Optional[List[str]] = None,
+    auto_subtitles: bool = False
+) -> int:
+    """
+    Descarga varias URLs en paralelo con un servicio compartido.
+    
+    Si se indica `start` o `end`, de cada URL solo se descarga ese fragmento.
+    Con `normalize` el volumen de los MP3 se normaliza (EBU R128) y con
+    `embed_metadata` se incrustan etiquetas y portada. `subtitles` son los
+    idiomas a descargar (formatos srt/vtt) o a incrustar en los MP4.
+    
+    Returns:
+        Número de descargas fallidas.
+    """
+    progress = BatchProgress(len(urls), enabled=show_progress)
+    write_lock = threading.Lock()
+    
+    def task(index: int, url: str) -> dict:
+        progress.start(index)
+        try:
+            item = _download_one(
+                downloader, url, format_type, quality, output,
+                lambda percent: progress.update(index, percent),
+                start=start, end=end, normalize=normalize, embed_metadata=embed_metadata,
+                subtitles=subtitles, auto_subtitles=auto_subtitles
+            )
+        except Exception as e:
+            item = {'url': url, 'success': False, 'message': 'Error inesperado', 'error': str(e)}
+        progress.finish(index, item['success'])
+        with write_lock:
+            out.write(json.dumps(item, ensure_ascii=False) + '\n')
+            out.flush()
+        return item
+    
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        futures = [pool.submit(task, i, url) for i, url in enumerate(urls)]
+        results = [future.result() for future in as_completed(futures)]
+    
+    progress.render(final=True)
+    return sum(1 for item in results if not item['success'])
+
+
+def run_info(downloader: DownloaderService, urls: List[str], jobs: int, out: TextIO = sys.stdout) -> int:
+    """
+    Obtiene la información de varias URLs en paralelo.
+    
+    Cada URL produce una línea JSON; si falla, `error` lleva el motivo de yt-dlp.
+    
+    Returns:
+        Número de URLs cuya información no se pudo obtener.
+    """
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        futures = {pool.submit(downloader.extract_info, url): url for url in urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                item = {'url': url, 'success': True, **future.result().to_dict()}
+            except ExtractionError as e:
+                item = {'url': url, 'success': False, 'error': str(e)}
+                failed += 1
+            out.write(json.dumps(item, ensure_ascii=False) + '\n')
+            out.flush()
+    return failed
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Construye el parser de argumentos del CLI."""
+    config = Config.get_default()
+    qualities = [quality.value for quality in VideoQuality]
+    
+    parser = argparse.ArgumentParser(
+        prog='downloader',
+        description="Descargador de YouTube - MP3 & MP4. Sin argumentos abre el menú interactivo."
+    )
+    subparsers = parser.add_subparsers(dest='command')
+    
+    sources = argparse.ArgumentParser(add_help=False)
+    sources.add_argument('urls', nargs='*', metavar='URL', help="URLs a procesar")
+    sources.add_argument('-i', '--input', metavar='ARCHIVO',
+                         help="Archivo con una URL por línea ('-' para leer de stdin)")
+    
+    download = argparse.ArgumentParser(add_help=False)
+    download.add_argument('-f', '--format', choices=[f.value for f in FormatType], default='mp3',
+                          help="Formato de descarga (por defecto: mp3)")
+    download.add_argument('-q', '--quality', choices=qualities, default=VideoQuality.HD.value,
+                          help="Calidad del video para MP4 (por defecto: 720)")
+    download.add_argument('-o', '--output', metavar='PLANTILLA',
+                          help="Plantilla de salida de yt-dlp (por defecto: "
+                               f"{config.OUTPUT_TEMPLATE.replace('%', '%%')})")
+    download.add_argument('--start', type=parse_timestamp, metavar='INSTANTE',
+                          help="Inicio del fragmento a descargar (segundos o [HH:]MM:SS)")
+    download.add_argument('--end', type=parse_timestamp, metavar='INSTANTE',
+                          help="Fin del fragmento a descargar (segundos o [HH:]MM:SS)")
+    download.add_argument('--normalize', action='store_true',
+                          help="Normalizar el volumen (EBU R128, solo MP3)")
+    download.add_argument('--embed-metadata', action='store_true',
+                          help="Incrustar etiquetas (título, artista...) y, en MP3, la portada")
+    download.add_argument('--sub-langs', type=parse_languages, metavar='IDIOMAS',
+                          help="Idiomas de subtítulos separados por comas: se descargan con "
+                               "--format srt/vtt o se incrustan en el MP4")
+    download.add_argument('--auto-subs', action='store_true',
+                          help="Usar los subtítulos automáticos si no hay manuales")
+    download.add_argument('--no-progress', action='store_true', help="No mostrar la línea de progreso")
+    
+    info = subparsers.add_parser('info', parents=[sources], help="Muestra información de los videos")
+    info.add_argument('-j', '--jobs', type=int, default=4, help="Extracciones en paralelo (por defecto: 4)")
+    
+    get = subparsers.add_parser('get', parents=[sources, download], help="Descarga uno o varios videos")
+    get.add_argument('-j', '--jobs', type=int, default=1, help="Descargas en paralelo (por defecto: 1)")
+    
+    batch = subparsers.add_parser('batch', parents=[sources, download], help="Descarga masiva en paralelo")
+    batch.add_argument('-j', '--jobs', type=int, default=config.MAX_CONCURRENT_DOWNLOADS,
+                       help=f"Descargas en paralelo (por defecto: {config.MAX_CONCURRENT_DOWNLOADS})")
+    
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
     """Función principal del CLI."""
+    argv = sys.argv[1:] if argv is None else argv
+    
     try:
-        # Mostrar menú y obtener opciones
-        url, format_type, video_quality = show_menu()
-        
-        if not url:
-            print("URL no proporcionada. Saliendo.")
+        if not argv:
+            interactive()
             return
         
-        # Inicializar el servicio de descarga
-        print("\nInicializando descargador...")
-        downloader = DownloaderService()
+        parser = build_parser()
+        args = parser.parse_args(argv)
+        if not args.command:
+            parser.print_help()
+            sys.exit(2)
         
-        # Ejecutar descarga según el formato
-        print(f"\n--- Iniciando descarga {format_type.value.upper()} para: {url} ---\n")
+        urls = read_urls(args.urls, args.input)
+        if not urls:
+            parser.error("No se proporcionaron URLs")
+        if getattr(args, 'start', None) is not None or getattr(args, 'end', None) is not None:
+            try:
+                format_section(args.start, args.end)
+            except ValueError as e:
+                parser.error(str(e))
+        if getattr(args, 'normalize', False) and args.format != FormatType.MP3.value:
+            parser.error("--normalize solo está disponible para MP3")
+        if getattr(args, 'sub_langs', None) and args.format == FormatType.MP3.value:
+            parser.error("--sub-langs solo está disponible para MP4, SRT y VTT")
+        if getattr(args, 'format', None) in (FormatType.SRT.value, FormatType.VTT.value) and \
+                (args.start is not None or args.end is not None):
+            parser.error("--start/--end no están disponibles para los subtítulos")
         
-        if format_type == FormatType.MP3:
-            result = downloader.download_audio(url)
-        else:
-            result = downloader.download_video(url, quality=video_quality)
+        downloader = DownloaderService()
         
-        # Mostrar resultado
-        if result.success:
-            print(f"\n--- {result.message.upper()} ---")
-            if result.output:
-                print(result.output)
+        if args.command == 'info':
+            failed = run_info(downloader, urls, args.jobs)
         else:
-            print(f"\n!!! {result.message.upper()} !!!")
-            if result.error:
-                print(f"Detalles del error:\n{result.error}")
+            format_type = FormatType(args.format)
+            quality = VideoQuality(args.quality) if format_type == FormatType.MP4 else None
+            failed = run_downloads(
+                downloader, urls, format_type, quality, args.output,
+                jobs=args.jobs, show_progress=not args.no_progress,
+                start=args.start, end=args.end, normalize=args.normalize,
+                embed_metadata=args.embed_metadata,
+                subtitles=args.sub_langs, auto_subtitles=args.auto_subs
+            )
+        
+        sys.exit(1 if failed else 0)
     
     except KeyboardInterrupt:
         print("\n\nDescarga cancelada por el usuario.")
@@ -2,7 +2,8 @@
 Core module - Lógica de negocio del descargador.
 """
 
-from .downloader import DownloaderService, VideoInfo
+from .downloader import DownloaderService, VideoInfo, ExtractionError
+from .urls import InvalidURLError
 from .config import Config, VideoQuality
 
-__all__ = ['DownloaderService', 'VideoInfo', 'Config', 'VideoQuality']
+__all__ = ['DownloaderService', 'VideoInfo', 'ExtractionError', 'InvalidURLError', 'Config', 'VideoQuality']
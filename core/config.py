@@ -1,9 +1,10 @@
 """
 Configuración y constantes del proyecto.
 """
+import os
 from enum import Enum
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Tuple
 
 
 class VideoQuality(Enum):
@@ -19,6 +20,14 @@ class FormatType(Enum):
     """Tipos de formato de descarga."""
     MP3 = 'mp3'
     MP4 = 'mp4'
+    # Solo subtítulos (sin descargar audio ni video)
+    SRT = 'srt'
+    VTT = 'vtt'
+    
+    @property
+    def is_subtitle(self) -> bool:
+        """True para los formatos de solo subtítulos."""
+        return self in (FormatType.SRT, FormatType.VTT)
 
 
 @dataclass
@@ -31,14 +40,115 @@ class Config:
     # Configuración de audio
     AUDIO_QUALITY: str = '0'  # VBR 0 (máxima calidad)
     
+    # Normalización de volumen EBU R128 (solo MP3): sonoridad integrada (LUFS),
+    # pico verdadero (dBTP) y rango de sonoridad (LU) objetivo
+    LOUDNESS_TARGET_I: float = -16.0
+    LOUDNESS_TARGET_TP: float = -1.5
+    LOUDNESS_TARGET_LRA: float = 11.0
+    
+    # Caché en memoria de la información de videos (entradas y segundos de validez)
+    INFO_CACHE_SIZE: int = 1024
+    INFO_CACHE_TTL: int = 3600
+    
+    # Lado máximo (px) de las portadas que se incrustan en los MP3
+    COVER_SIZE: int = 600
+    
+    # Idiomas de subtítulos por defecto (códigos de yt-dlp)
+    SUBTITLE_LANGUAGES: Tuple[str, ...] = ('es', 'en')
+    
     # Configuración de descarga
     NO_PLAYLIST: bool = True  # Solo descargar videos individuales
     
+    # Fragmentos (inicio/fin): por defecto se copian los streams y el corte cae en el
+    # keyframe anterior; con PRECISE_CUTS se recodifica alrededor de los cortes
+    PRECISE_CUTS: bool = False
+    
     # Formato de nombre de archivo
     OUTPUT_TEMPLATE: str = '%(title)s.%(ext)s'
     
+    # Líneas de salida de yt-dlp que se conservan en memoria por descarga
+    OUTPUT_TAIL_LINES: int = 200
+    
+    # Logs completos por tarea (solo si se piden o si KEEP_TASK_LOGS está activo)
+    KEEP_TASK_LOGS: bool = False
+    LOGS_DIR: str = 'logs'
+    
+    # Almacenamiento de los archivos generados: 'local' (DOWNLOADS_DIR) o 's3'
+    # (bucket compatible con S3). Por defecto se lee de DOWNLOADER_STORAGE y las
+    # credenciales de S3 de DOWNLOADER_S3_ENDPOINT/BUCKET/ACCESS_KEY/SECRET_KEY.
+    DOWNLOADS_DIR: str = 'downloads'
+    STORAGE_BACKEND: str = None
+    S3_ENDPOINT: str = None
+    S3_BUCKET: str = None
+    S3_ACCESS_KEY: str = None
+    S3_SECRET_KEY: str = None
+    S3_REGION: str = 'us-east-1'
+    S3_PREFIX: str = ''
+    S3_PART_SIZE_MB: int = 8
+    PRESIGNED_URL_TTL: int = 3600
+    
+    # Historial de descargas de la API (SQLite)
+    HISTORY_PATH: str = 'history.db'
+    
+    # Carpeta de cachés persistentes (rutas de ffmpeg, etc.)
+    CACHE_DIR: str = os.path.join(os.path.expanduser('~'), '.cache', 'mp3_mp4_downloader')
+    
+    # Rendimiento de descarga para las estimaciones: bytes/s hasta tener medidas
+    # y número de descargas recientes que se promedian
+    THROUGHPUT_DEFAULT: float = 2 * 1024 * 1024
+    THROUGHPUT_WINDOW: int = 20
+    
+    # Admisión de trabajos: duración máxima del video (s, 0 = sin límite) y espacio
+    # libre que debe quedar en disco además de lo reservado por los trabajos en curso
+    MAX_DURATION: int = 4 * 3600
+    DISK_HEADROOM_MB: int = 512
+    
+    # Límites por cliente (API key o IP) en la API: peticiones por minuto a
+    # POST /download y a los endpoints de información (0 = sin límite), ráfaga
+    # admitida, y cuotas diarias de trabajos y MB generados, guardadas en QUOTAS_PATH
+    RATE_LIMIT_DOWNLOADS: float = 10
+    RATE_LIMIT_INFO: float = 60
+    RATE_LIMIT_BURST: int = 10
+    QUOTA_JOBS_PER_DAY: int = 200
+    QUOTA_MB_PER_DAY: int = 20 * 1024
+    QUOTAS_PATH: str = 'quotas.json'
+    QUOTA_PERSIST_INTERVAL: int = 30
+    
+    # API keys reconocidas como clientes; cualquier otra cuenta como la IP de la
+    # conexión. Por defecto se leen de DOWNLOADER_API_KEYS, separadas por comas.
+    API_KEYS: Tuple[str, ...] = None
+    
+    # Descargas simultáneas (slots de trabajo); el resto espera en cola
+    MAX_CONCURRENT_DOWNLOADS: int = 3
+    
+    # Apagado de la API: segundos que se espera a que terminen los trabajos en
+    # curso, segundos de gracia tras interrumpir los que no terminan, y archivo
+    # donde se guardan los trabajos sin terminar para reanudarlos al arrancar
+    DRAIN_TIMEOUT: int = 120
+    DRAIN_GRACE: int = 10
+    CHECKPOINT_PATH: str = 'checkpoint.json'
+    
+    # Readiness de la API (/health/ready): trabajos en cola como máximo, MB libres
+    # mínimos (además de lo reservado y de DISK_HEADROOM_MB), tasa máxima de fallos
+    # en los últimos READY_FAILURE_WINDOW segundos (solo con READY_FAILURE_MIN_JOBS
+    # trabajos o más) y segundos que se reutiliza la comprobación de ffmpeg/yt-dlp
+    READY_MAX_QUEUE: int = 20
+    READY_MIN_DISK_MB: int = 1024
+    READY_MAX_FAILURE_RATE: float = 0.5
+    READY_FAILURE_WINDOW: int = 300
+    READY_FAILURE_MIN_JOBS: int = 5
+    READY_TOOLS_TTL: int = 60
+    
+    # Extracción de metadatos por lotes
+    INFO_BATCH_WORKERS: int = 8
+    INFO_BATCH_MAX_URLS: int = 1000
+    
+    # Hosts aceptados además de YouTube (p. ej. servidores locales de prueba).
+    # Por defecto se leen de DOWNLOADER_EXTRA_HOSTS, separados por comas.
+    EXTRA_ALLOWED_HOSTS: Tuple[str, ...] = None
+    
     def __post_init__(self):
-        """Inicializa las calidades de video si no están definidas."""
+        """Inicializa las calidades de video, los hosts adicionales, las API keys y el almacenamiento si no están definidos."""
         if self.VIDEO_QUALITIES is None:
             self.VIDEO_QUALITIES = {
                 '1': {'resolution': VideoQuality.LOW.value, 'description': '360p (Baja calidad)'},
@@ -47,6 +157,17 @@ class Config:
                 '4': {'resolution': VideoQuality.FULL_HD.value, 'description': '1080p Full HD'},
                 '5': {'resolution': VideoQuality.BEST.value, 'description': 'Mejor calidad disponible'}
             }
+        if self.EXTRA_ALLOWED_HOSTS is None:
+            hosts = os.environ.get('DOWNLOADER_EXTRA_HOSTS', '')
+            self.EXTRA_ALLOWED_HOSTS = tuple(h.strip().lower() for h in hosts.split(',') if h.strip())
+        if self.API_KEYS is None:
+            keys = os.environ.get('DOWNLOADER_API_KEYS', '')
+            self.API_KEYS = tuple(k.strip() for k in keys.split(',') if k.strip())
+        if self.STORAGE_BACKEND is None:
+            self.STORAGE_BACKEND = os.environ.get('DOWNLOADER_STORAGE', 'local')
+        for name in ('ENDPOINT', 'BUCKET', 'ACCESS_KEY', 'SECRET_KEY'):
+            if getattr(self, 'S3_' + name) is None:
+                setattr(self, 'S3_' + name, os.environ.get('DOWNLOADER_S3_' + name))
     
     @staticmethod
     def get_default():
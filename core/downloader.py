@@ -5,20 +5,84 @@ import subprocess
 import sys
 import os
 import json
-from typing import Optional, Tuple, Dict, Any
-from static_ffmpeg import run
+import re
+import shlex
+import shutil
+import signal
+import tempfile
+import threading
+import time
+from typing import Optional, Tuple, Dict, Any, Callable, List
 
 from .config import Config, FormatType, VideoQuality
+from .ffmpeg import get_ffmpeg_paths
+from .formats import Estimate, ThroughputMeter, compact_formats, estimate
+from .loudness import LoudnessCache, build_filter, read_reports, report_env
+from .metadata import InfoCache, ThumbnailCache, mp3_cover_args, tag_args
+from .metrics import BYTES_DOWNLOADED, PHASE_DURATION, RETRIES, quality_label
+from .output import OutputCapture
+from .sections import format_section
+from .subtitles import converted_paths, parse_languages
+from .urls import InvalidURLError, ParsedURL, parse_url
+
+# Motivos de fallo reconocibles en la salida de yt-dlp/ffmpeg, por orden de prioridad
+_FAILURE_REASONS = (
+    ('unavailable', re.compile(r'Video unavailable|Private video|has been removed|not available', re.I)),
+    ('age_restricted', re.compile(r'Sign in to confirm your age|age-restricted', re.I)),
+    ('bot_check', re.compile(r'Sign in to confirm you.re not a bot', re.I)),
+    ('unsupported_url', re.compile(r'Unsupported URL|is not a valid URL|La URL (?:no|está)|URL mal formada|inválido en la URL', re.I)),
+    ('format_unavailable', re.compile(r'Requested format is not available', re.I)),
+    ('ffmpeg', re.compile(r'ffmpeg|ffprobe|Postprocessing', re.I)),
+    ('network', re.compile(r'HTTP Error|timed out|Connection|Unable to download', re.I)),
+)
+
+
+def classify_error(text: str) -> str:
+    """
+    Clasifica un error de descarga en un motivo corto apto para métricas.
+    
+    Args:
+        text: Mensaje de error o stderr de yt-dlp.
+    
+    Returns:
+        Motivo del fallo ('network', 'unavailable', ...) o 'unknown'.
+    """
+    for reason, pattern in _FAILURE_REASONS:
+        if pattern.search(text or ''):
+            return reason
+    return 'unknown'
+
+
+def _join_args(args: List[str]) -> str:
+    """Une argumentos para `--postprocessor-args` (yt-dlp los separa con shlex)."""
+    return ' '.join(shlex.quote(arg) for arg in args)
+
+
+class ExtractionError(Exception):
+    """Error al extraer la información de un video."""
 
 
 class DownloadResult:
     """Resultado de una operación de descarga."""
     
-    def __init__(self, success: bool, message: str = "", output: str = "", error: str = ""):
+    def __init__(
+        self,
+        success: bool,
+        message: str = "",
+        output: str = "",
+        error: str = "",
+        retries: int = 0,
+        file_path: Optional[str] = None,
+        files: Optional[List[str]] = None
+    ):
         self.success = success
         self.message = message
         self.output = output
         self.error = error
+        self.retries = retries
+        self.file_path = file_path
+        # Todos los archivos generados (varios en los trabajos de subtítulos)
+        self.files = files if files is not None else ([file_path] if file_path else [])
     
     def __repr__(self):
         status = "SUCCESS" if self.success else "FAILED"
@@ -26,21 +90,49 @@ class DownloadResult:
 
 
 class VideoInfo:
-    """Información de un video de YouTube."""
+    """
+    Información de un video de YouTube.
+    
+    Solo conserva los campos que se usan (con `__slots__`) y recorta la
+    descripción al crearla, para que la extracción completa no se quede en memoria.
+    """
+    
+    # Longitud máxima de la descripción que se conserva
+    MAX_DESCRIPTION_LENGTH = 200
+    
+    __slots__ = (
+        'title', 'duration', 'thumbnail', 'uploader', 'view_count',
+        'description', 'upload_date', 'webpage_url', 'track', 'artist', 'album',
+        'is_live', 'formats'
+    )
     
     def __init__(self, data: Dict[str, Any]):
-        self.title = data.get('title', 'Desconocido')
-        self.duration = data.get('duration', 0)
-        self.thumbnail = data.get('thumbnail', '')
-        self.uploader = data.get('uploader', 'Desconocido')
-        self.view_count = data.get('view_count', 0)
-        self.description = data.get('description', '')
-        self.upload_date = data.get('upload_date', '')
-        self.webpage_url = data.get('webpage_url', '')
+        self.title = data.get('title') or 'Desconocido'
+        self.duration = int(data.get('duration') or 0)
+        self.thumbnail = data.get('thumbnail') or ''
+        self.uploader = data.get('uploader') or 'Desconocido'
+        self.view_count = data.get('view_count') or 0
+        self.description = self._truncate(data.get('description') or '')
+        self.upload_date = data.get('upload_date') or ''
+        self.webpage_url = data.get('webpage_url') or ''
+        # Metadatos musicales (solo para las etiquetas del archivo)
+        self.track = data.get('track') or ''
+        self.artist = data.get('artist') or data.get('creator') or ''
+        self.album = data.get('album') or ''
+        # Emisión en directo: su duración no se conoce de antemano
+        self.is_live = bool(data.get('is_live')) or data.get('live_status') == 'is_live'
+        # Formatos con tamaño o bitrate, para las estimaciones (ver core.formats)
+        self.formats = compact_formats(data.get('formats'), self.duration)
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convierte a diccionario."""
-        return {
+    def to_dict(self, include_formats: bool = True) -> Dict[str, Any]:
+        """
+        Convierte a diccionario.
+        
+        Args:
+            include_formats: Incluir la lista de formatos con tamaños y bitrates
+                (las extracciones ligeras no traen los formatos DASH).
+        """
+        data = {
             'title': self.title,
             'duration': self.duration,
             'duration_string': self._format_duration(self.duration),
@@ -48,10 +140,20 @@ class VideoInfo:
             'uploader': self.uploader,
             'view_count': self.view_count,
             'view_count_string': self._format_views(self.view_count),
-            'description': self.description[:200] + '...' if len(self.description) > 200 else self.description,
+            'description': self.description,
             'upload_date': self.upload_date,
             'url': self.webpage_url
         }
+        if include_formats:
+            data['formats'] = [media_format.to_dict() for media_format in self.formats]
+        return data
+    
+    @classmethod
+    def _truncate(cls, description: str) -> str:
+        """Recorta la descripción a MAX_DESCRIPTION_LENGTH caracteres."""
+        if len(description) > cls.MAX_DESCRIPTION_LENGTH:
+            return description[:cls.MAX_DESCRIPTION_LENGTH] + '...'
+        return description
     
     @staticmethod
     def _format_duration(seconds: int) -> str:
@@ -88,21 +190,57 @@ class DownloaderService:
             config: Configuración del descargador. Si no se proporciona, usa la configuración por defecto.
         """
         self.config = config or Config.get_default()
-        self._ffmpeg_path, self._ffprobe_path = self._initialize_ffmpeg()
+        self._loudness_cache = LoudnessCache(os.path.join(self.config.CACHE_DIR, 'loudness'))
+        self._info_cache = InfoCache(self.config.INFO_CACHE_SIZE, self.config.INFO_CACHE_TTL)
+        self._thumbnail_cache = ThumbnailCache(
+            os.path.join(self.config.CACHE_DIR, 'thumbnails'), self.config.COVER_SIZE
+        )
+        self.throughput = ThroughputMeter(self.config.THROUGHPUT_WINDOW, self.config.THROUGHPUT_DEFAULT)
+        
+        # Procesos de yt-dlp en curso (para interrumpirlos al apagar)
+        self._processes = set()
+        self._processes_lock = threading.Lock()
+    
+    @property
+    def _ffmpeg_path(self) -> str:
+        """Ruta de ffmpeg (se resuelve la primera vez que se necesita)."""
+        return self._initialize_ffmpeg()[0]
+    
+    @property
+    def _ffprobe_path(self) -> str:
+        """Ruta de ffprobe (se resuelve la primera vez que se necesita)."""
+        return self._initialize_ffmpeg()[1]
     
     def _initialize_ffmpeg(self) -> Tuple[str, str]:
         """
-        Inicializa y obtiene las rutas de ffmpeg y ffprobe.
+        Obtiene las rutas de ffmpeg y ffprobe.
+        
+        La resolución se comparte entre todas las instancias del proceso y se
+        guarda en `Config.CACHE_DIR` para los siguientes arranques.
         
         Returns:
             Tuple con las rutas de ffmpeg y ffprobe.
         """
         try:
-            ffmpeg_path, ffprobe_path = run.get_or_fetch_platform_executables_else_raise()
-            return ffmpeg_path, ffprobe_path
+            return get_ffmpeg_paths(self.config.CACHE_DIR)
         except Exception as e:
             raise RuntimeError(f"Error al inicializar ffmpeg: {e}")
     
+    def parse_url(self, url: str) -> ParsedURL:
+        """
+        Valida y normaliza una URL sin lanzar yt-dlp.
+        
+        Args:
+            url: URL introducida por el usuario.
+        
+        Returns:
+            ParsedURL con la URL canónica y el ID del video o playlist.
+        
+        Raises:
+            InvalidURLError: Si la URL no es de YouTube ni de un host permitido.
+        """
+        return parse_url(url, self.config.NO_PLAYLIST, self.config.EXTRA_ALLOWED_HOSTS)
+    
     def get_video_info(self, url: str) -> Optional[VideoInfo]:
         """
         Obtiene información de un video de YouTube sin descargarlo.
@@ -114,55 +252,173 @@ class DownloaderService:
             VideoInfo con la información del video, o None si hay error.
         """
         try:
-            command = [
-                sys.executable,
-                '-m', 'yt_dlp',
-                '--dump-json',
-                '--no-playlist',
-                '--extractor-args', 'youtube:player_client=android,web',
-                url
-            ]
-            
-            process = subprocess.run(
-                command,
-                check=True,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace'
-            )
-            
-            data = json.loads(process.stdout)
-            return VideoInfo(data)
-        
-        except subprocess.CalledProcessError as e:
-            print(f"Error al obtener información: {e.stderr}")
-            return None
-        except json.JSONDecodeError as e:
-            print(f"Error al decodificar JSON: {e}")
+            return self.extract_info(url)
+        except ExtractionError as e:
+            print(f"Error al obtener información: {e}")
             return None
         except Exception as e:
             print(f"Error inesperado: {e}")
             return None
     
-    def download_audio(self, url: str, output_path: Optional[str] = None) -> DownloadResult:
+    def extract_info(self, url: str, flat: bool = False) -> VideoInfo:
+        """
+        Extrae la información de un video, lanzando una excepción si falla.
+        
+        El resultado se guarda en una caché en memoria (`Config.INFO_CACHE_TTL`),
+        así que pedir otra vez el mismo video no vuelve a lanzar yt-dlp.
+        
+        Args:
+            url: URL del video de YouTube.
+            flat: Extracción ligera para cuando solo se necesitan los campos básicos
+                (no resuelve manifiestos HLS/DASH ni entradas de playlists).
+        
+        Returns:
+            VideoInfo con la información del video.
+        
+        Raises:
+            ExtractionError: Si la URL no es válida, yt-dlp falla o su salida no es válida.
+        """
+        try:
+            parsed = self.parse_url(url)
+        except InvalidURLError as e:
+            raise ExtractionError(str(e))
+        url = parsed.url
+        
+        # Una extracción ligera no sirve para quien pide la completa
+        cached = self._info_cache.get(parsed.key)
+        if cached is not None and (flat or not cached[1]):
+            return cached[0]
+        
+        extractor_args = 'youtube:player_client=android,web'
+        if flat:
+            extractor_args += ';skip=hls,dash,translated_subs'
+        
+        command = [
+            sys.executable,
+            '-m', 'yt_dlp',
+            '--dump-json',
+            '--no-playlist',
+            '--extractor-args', extractor_args,
+        ]
+        if flat:
+            command.append('--flat-playlist')
+        command.append(url)
+        
+        try:
+            with PHASE_DURATION.time(phase='extract', format='none', quality='none'):
+                process = subprocess.run(
+                    command,
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                    encoding='utf-8',
+                    errors='replace'
+                )
+        except subprocess.CalledProcessError as e:
+            errors = [line for line in (e.stderr or '').splitlines() if line.startswith('ERROR:')]
+            raise ExtractionError(errors[-1] if errors else (e.stderr or str(e)).strip())
+        
+        try:
+            info = VideoInfo(json.loads(process.stdout))
+        except json.JSONDecodeError as e:
+            raise ExtractionError(f"Error al decodificar JSON: {e}")
+        
+        self._info_cache.put(parsed.key, (info, flat))
+        return info
+    
+    def estimate_download(
+        self,
+        url: str,
+        format_type: FormatType,
+        start: Optional[float] = None,
+        end: Optional[float] = None
+    ) -> List[Estimate]:
+        """
+        Estima el tamaño y el tiempo de descarga de un video.
+        
+        Usa la información en caché si ya se extrajo y el rendimiento medido
+        en las últimas descargas.
+        
+        Args:
+            url: URL del video de YouTube.
+            format_type: MP3 o MP4.
+            start: Inicio del fragmento en segundos (opcional).
+            end: Fin del fragmento en segundos (opcional).
+        
+        Returns:
+            Una estimación para MP3 o una por calidad para MP4 (de mayor a menor);
+            se omiten las que no se pueden calcular.
+        
+        Raises:
+            ExtractionError: Si no se pudo obtener la información del video.
+        """
+        info = self.extract_info(url, flat=True)
+        fraction = 1.0
+        if info.duration and (start is not None or end is not None):
+            section_end = min(end, info.duration) if end is not None else info.duration
+            fraction = max(section_end - (start or 0), 0) / info.duration
+        
+        if format_type == FormatType.MP4:
+            qualities = list(reversed(VideoQuality))
+        else:
+            qualities = [None]
+        rate = self.throughput.rate
+        estimates = (
+            estimate(info.formats, info.duration, format_type, quality, rate, fraction)
+            for quality in qualities
+        )
+        return [item for item in estimates if item is not None]
+    
+    def download_audio(
+        self,
+        url: str,
+        output_path: Optional[str] = None,
+        log_path: Optional[str] = None,
+        progress_callback: Optional[Callable[[float], None]] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        normalize: bool = False,
+        embed_metadata: bool = False
+    ) -> DownloadResult:
         """
         Descarga solo el audio de un video en formato MP3.
         
         Args:
             url: URL del video de YouTube.
             output_path: Ruta opcional para guardar el archivo.
+            log_path: Archivo donde guardar el log completo de yt-dlp (opcional).
+            progress_callback: Función que recibe el porcentaje de descarga (opcional).
+            start: Inicio del fragmento en segundos (opcional).
+            end: Fin del fragmento en segundos (opcional).
+            normalize: Normalizar el volumen (EBU R128) durante la conversión a MP3.
+            embed_metadata: Incrustar etiquetas ID3 (título, artista...) y portada.
         
         Returns:
             DownloadResult con el resultado de la operación.
         """
-        return self._download(url, FormatType.MP3, output_path=output_path)
+        return self._download(
+            url, FormatType.MP3,
+            output_path=output_path,
+            log_path=log_path,
+            progress_callback=progress_callback,
+            start=start,
+            end=end,
+            normalize=normalize,
+            embed_metadata=embed_metadata
+        )
     
     def download_video(
         self, 
         url: str, 
         quality: VideoQuality = VideoQuality.HD,
-        output_path: Optional[str] = None
+        output_path: Optional[str] = None,
+        log_path: Optional[str] = None,
+        progress_callback: Optional[Callable[[float], None]] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        embed_metadata: bool = False,
+        subtitles: Optional[List[str]] = None,
+        auto_subtitles: bool = False
     ) -> DownloadResult:
         """
         Descarga video con audio en formato MP4.
@@ -171,35 +427,230 @@ class DownloaderService:
             url: URL del video de YouTube.
             quality: Calidad del video (VideoQuality enum).
             output_path: Ruta opcional para guardar el archivo.
+            log_path: Archivo donde guardar el log completo de yt-dlp (opcional).
+            progress_callback: Función que recibe el porcentaje de descarga (opcional).
+            start: Inicio del fragmento en segundos (opcional).
+            end: Fin del fragmento en segundos (opcional).
+            embed_metadata: Incrustar etiquetas (título, artista...) en el MP4.
+            subtitles: Idiomas de subtítulos a incrustar como pistas (opcional).
+            auto_subtitles: Usar los subtítulos automáticos si no hay manuales.
         
         Returns:
             DownloadResult con el resultado de la operación.
         """
-        return self._download(url, FormatType.MP4, quality, output_path)
+        return self._download(
+            url, FormatType.MP4, quality, output_path,
+            log_path=log_path,
+            progress_callback=progress_callback,
+            start=start,
+            end=end,
+            embed_metadata=embed_metadata,
+            subtitles=subtitles,
+            auto_subtitles=auto_subtitles
+        )
+    
+    def download_subtitles(
+        self,
+        url: str,
+        languages: Optional[List[str]] = None,
+        sub_format: FormatType = FormatType.SRT,
+        auto_subtitles: bool = False,
+        output_path: Optional[str] = None,
+        log_path: Optional[str] = None,
+        progress_callback: Optional[Callable[[float], None]] = None
+    ) -> DownloadResult:
+        """
+        Descarga solo los subtítulos de un video, sin el audio ni el video.
+        
+        Args:
+            url: URL del video de YouTube.
+            languages: Idiomas a descargar (por defecto `Config.SUBTITLE_LANGUAGES`).
+            sub_format: Formato de salida (FormatType.SRT o FormatType.VTT).
+            auto_subtitles: Usar los subtítulos automáticos si no hay manuales.
+            output_path: Ruta opcional; yt-dlp añade `.<idioma>.<formato>`.
+            log_path: Archivo donde guardar el log completo de yt-dlp (opcional).
+            progress_callback: Función que recibe el porcentaje de descarga (opcional).
+        
+        Returns:
+            DownloadResult con un archivo por idioma en `files`.
+        """
+        try:
+            url = self.parse_url(url).url
+        except InvalidURLError as e:
+            return DownloadResult(
+                success=False,
+                message="URL no válida",
+                error=str(e)
+            )
+        
+        if not sub_format.is_subtitle:
+            return DownloadResult(
+                success=False,
+                message=f"Formato de subtítulos no soportado: {sub_format.value}",
+                error="Invalid subtitle format"
+            )
+        
+        try:
+            languages = parse_languages(languages or self.config.SUBTITLE_LANGUAGES)
+        except ValueError as e:
+            return DownloadResult(
+                success=False,
+                message="Idiomas de subtítulos no válidos",
+                error=str(e)
+            )
+        
+        command = [
+            sys.executable,
+            '-m', 'yt_dlp',
+            '--newline',
+            '--no-playlist',
+            '--ffmpeg-location', os.path.dirname(self._ffmpeg_path),
+            '--output', output_path or self.config.OUTPUT_TEMPLATE,
+            '--extractor-args', 'youtube:player_client=android,web',
+            '--skip-download',
+            '--write-subs',
+            '--sub-langs', ','.join(languages),
+            '--convert-subs', sub_format.value,
+        ]
+        if auto_subtitles:
+            command.append('--write-auto-subs')
+        command.append(url)
+        
+        labels = {'format': sub_format.value, 'quality': quality_label(sub_format.value, None)}
+        try:
+            returncode, capture = self._run_ytdlp(command, labels, log_path, progress_callback)
+        except FileNotFoundError as e:
+            return DownloadResult(
+                success=False,
+                message="No se pudo ejecutar yt-dlp. Verifica que esté instalado.",
+                error=str(e)
+            )
+        except Exception as e:
+            return DownloadResult(
+                success=False,
+                message=f"Error inesperado: {type(e).__name__}",
+                error=str(e)
+            )
+        
+        if returncode != 0:
+            return DownloadResult(
+                success=False,
+                message=f"Error durante la descarga (código {returncode})",
+                error=capture.error,
+                retries=capture.retries
+            )
+        
+        files = converted_paths(capture.subtitle_files, sub_format.value)
+        if not files and not capture.subtitles_present:
+            return DownloadResult(
+                success=False,
+                message="No hay subtítulos para los idiomas pedidos",
+                error=f"No subtitles for: {','.join(languages)}",
+                output=capture.output
+            )
+        
+        return DownloadResult(
+            success=True,
+            message=f"Subtítulos descargados ({sub_format.value.upper()} | Idiomas: {', '.join(languages)})",
+            output=capture.output,
+            retries=capture.retries,
+            file_path=files[0] if files else None,
+            files=files
+        )
     
     def _download(
         self,
         url: str,
         format_type: FormatType,
         quality: Optional[VideoQuality] = None,
-        output_path: Optional[str] = None
+        output_path: Optional[str] = None,
+        log_path: Optional[str] = None,
+        progress_callback: Optional[Callable[[float], None]] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        normalize: bool = False,
+        embed_metadata: bool = False,
+        subtitles: Optional[List[str]] = None,
+        auto_subtitles: bool = False
     ) -> DownloadResult:
         """
         Ejecuta la descarga según el formato especificado.
         
+        Si se indica `start` o `end`, solo se descarga ese fragmento
+        (`--download-sections`), sin bajar el archivo completo.
+        
+        Con `normalize` (solo MP3) el filtro `loudnorm` se añade a la conversión
+        a MP3 de yt-dlp; la medición de sonoridad se guarda por video y las
+        siguientes descargas del mismo video aplican directamente la ganancia.
+        
+        Con `embed_metadata` las etiquetas (y en MP3 la portada) se escriben en
+        esa misma pasada de ffmpeg (conversión a MP3 o merge a MP4), sin
+        reescribir el archivo después.
+        
+        Con `subtitles` (solo MP4) los subtítulos se añaden como pistas con
+        copia de streams. Los formatos SRT/VTT descargan solo los subtítulos
+        (ver `download_subtitles`).
+        
         Args:
             url: URL del video.
             format_type: Tipo de formato (MP3 o MP4).
             quality: Calidad del video (solo para MP4).
             output_path: Ruta de salida personalizada.
+            log_path: Archivo donde guardar el log completo de yt-dlp (opcional).
+            progress_callback: Función que recibe el porcentaje de descarga (opcional).
+            start: Inicio del fragmento en segundos (opcional).
+            end: Fin del fragmento en segundos (opcional).
+            normalize: Normalizar el volumen (EBU R128, solo MP3).
+            embed_metadata: Incrustar etiquetas y portada.
+            subtitles: Idiomas de subtítulos a incrustar (solo MP4).
+            auto_subtitles: Usar los subtítulos automáticos si no hay manuales.
         
         Returns:
             DownloadResult con el resultado de la operación.
         """
+        if format_type.is_subtitle:
+            return self.download_subtitles(
+                url, subtitles, format_type, auto_subtitles,
+                output_path=output_path,
+                log_path=log_path,
+                progress_callback=progress_callback
+            )
+        
+        # Validar la URL antes de lanzar ningún proceso
+        try:
+            parsed = self.parse_url(url)
+            url = parsed.url
+        except InvalidURLError as e:
+            return DownloadResult(
+                success=False,
+                message="URL no válida",
+                error=str(e)
+            )
+        
+        report_dir = None
+        section = None
+        if start is not None or end is not None:
+            try:
+                section = format_section(start, end)
+            except ValueError as e:
+                return DownloadResult(
+                    success=False,
+                    message="Fragmento no válido",
+                    error=str(e)
+                )
+        
+        if subtitles and format_type != FormatType.MP4:
+            return DownloadResult(
+                success=False,
+                message="Los subtítulos solo se pueden incrustar en MP4",
+                error="Subtitles require MP4"
+            )
+        
         # Construir comando base
         command = [
             sys.executable,
             '-m', 'yt_dlp',
+            '--newline',  # Progreso en líneas separadas para procesarlo en streaming
             '--no-playlist' if self.config.NO_PLAYLIST else '--yes-playlist',
             '--ffmpeg-location', os.path.dirname(self._ffmpeg_path),
             '--output', output_path or self.config.OUTPUT_TEMPLATE,
@@ -215,6 +666,44 @@ class DownloaderService:
                 '--audio-quality', self.config.AUDIO_QUALITY,
             ])
             format_desc = f"MP3 | Calidad: Máxima (VBR {self.config.AUDIO_QUALITY})"
+            
+            # Todo va en la misma pasada que la conversión a MP3 (argumentos de ExtractAudio)
+            audio_args = []
+            if normalize:
+                # La medición depende del fragmento: se guarda por video y rango
+                loudness_key = f"{parsed.key}|{section or '*'}"
+                measured = self._loudness_cache.get(loudness_key)
+                loudnorm = build_filter(
+                    self.config.LOUDNESS_TARGET_I,
+                    self.config.LOUDNESS_TARGET_TP,
+                    self.config.LOUDNESS_TARGET_LRA,
+                    measured
+                )
+                audio_args += ['-af', loudnorm]
+                if measured is None:
+                    report_dir = tempfile.mkdtemp(prefix='loudnorm_')
+                format_desc += f" | Normalizado: {self.config.LOUDNESS_TARGET_I:g} LUFS"
+            
+            if embed_metadata:
+                info = self._info_for_tags(url)
+                if info:
+                    audio_args += tag_args(info, url)
+                    cover = self._thumbnail_cache.get(parsed.key, info.thumbnail, self._ffmpeg_path)
+                    if cover:
+                        # La portada entra como primera entrada del ffmpeg de ExtractAudio
+                        command.extend(['--postprocessor-args', 'ExtractAudio+ffmpeg_i1:' + _join_args(['-i', cover])])
+                        audio_args += mp3_cover_args()
+                    format_desc += " | Con etiquetas"
+            
+            if audio_args:
+                command.extend(['--postprocessor-args', 'ExtractAudio+ffmpeg_o:' + _join_args(audio_args)])
+        
+        elif normalize:
+            return DownloadResult(
+                success=False,
+                message="La normalización de volumen solo está disponible para MP3",
+                error="Normalization requires MP3"
+            )
         
         elif format_type == FormatType.MP4:
             quality = quality or VideoQuality.HD
@@ -232,8 +721,10 @@ class DownloaderService:
             command.extend([
                 '-f', format_string,
                 '--merge-output-format', 'mp4',
-                '--postprocessor-args', 'ffmpeg:-c:v copy -c:a aac',
             ])
+            # Solo el merge pasa el audio a AAC; con una clave genérica 'ffmpeg:' los
+            # demás postprocesadores (subtítulos, fixups) volverían a recodificarlo
+            merge_args = ['-c:v', 'copy', '-c:a', 'aac']
             
             quality_desc = next(
                 (v['description'] for v in self.config.VIDEO_QUALITIES.values() 
@@ -241,6 +732,33 @@ class DownloaderService:
                 quality.value
             )
             format_desc = f"MP4 | Calidad: {quality_desc}"
+            
+            if embed_metadata:
+                info = self._info_for_tags(url)
+                if info:
+                    # Las etiquetas se escriben en el merge
+                    merge_args += tag_args(info, url)
+                    format_desc += " | Con etiquetas"
+            command.extend(['--postprocessor-args', 'Merger+ffmpeg_o:' + _join_args(merge_args)])
+            
+            if subtitles:
+                try:
+                    languages = parse_languages(subtitles)
+                except ValueError as e:
+                    return DownloadResult(
+                        success=False,
+                        message="Idiomas de subtítulos no válidos",
+                        error=str(e)
+                    )
+                # EmbedSubtitle copia los streams y solo convierte el texto a mov_text;
+                # los archivos de subtítulos se borran después de incrustarlos
+                command.extend([
+                    '--embed-subs', '--sub-langs', ','.join(languages),
+                    '--postprocessor-args', 'EmbedSubtitle+ffmpeg_o:-c copy -c:s mov_text',
+                ])
+                if auto_subtitles:
+                    command.extend(['--write-subs', '--write-auto-subs', '--compat-options', 'no-keep-subs'])
+                format_desc += f" | Subtítulos: {', '.join(languages)}"
         
         else:
             return DownloadResult(
@@ -249,29 +767,35 @@ class DownloaderService:
                 error="Invalid format type"
             )
         
+        if section:
+            # Solo se descarga el rango pedido; sin PRECISE_CUTS los streams se copian
+            # y el video empieza en el keyframe anterior al inicio
+            command.extend(['--download-sections', section])
+            if self.config.PRECISE_CUTS:
+                command.append('--force-keyframes-at-cuts')
+            format_desc += f" | Fragmento: {section[1:]}"
+        
+        labels = {
+            'format': format_type.value,
+            'quality': quality_label(format_type.value, quality.value if quality else None)
+        }
+        
         # Ejecutar descarga
         try:
-            process = subprocess.run(
-                command,
-                check=True,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace'
-            )
-            
-            return DownloadResult(
-                success=True,
-                message=f"Descarga completada exitosamente ({format_desc})",
-                output=process.stdout
-            )
-        
-        except subprocess.CalledProcessError as e:
-            return DownloadResult(
-                success=False,
-                message=f"Error durante la descarga (código {e.returncode})",
-                error=e.stderr or str(e)
+            returncode, capture = self._run_ytdlp(
+                command, labels, log_path, progress_callback,
+                env=report_env(report_dir) if report_dir else None
             )
+            # Bytes transferidos (no el tamaño del archivo final, que cambia con la
+            # recodificación, los fragmentos y el merge), también si la descarga falla
+            if capture.downloaded_bytes:
+                BYTES_DOWNLOADED.inc(capture.downloaded_bytes, **labels)
+            if returncode == 0:
+                self.throughput.record(capture.downloaded_bytes, capture.download_seconds)
+            if report_dir and returncode == 0:
+                stats = read_reports(report_dir)
+                if stats:
+                    self._loudness_cache.put(loudness_key, stats)
         
         except FileNotFoundError as e:
             return DownloadResult(
@@ -286,3 +810,123 @@ class DownloaderService:
                 message=f"Error inesperado: {type(e).__name__}",
                 error=str(e)
             )
+        
+        finally:
+            if report_dir:
+                shutil.rmtree(report_dir, ignore_errors=True)
+        
+        if returncode != 0:
+            return DownloadResult(
+                success=False,
+                message=f"Error durante la descarga (código {returncode})",
+                error=capture.error,
+                retries=capture.retries
+            )
+        
+        return DownloadResult(
+            success=True,
+            message=f"Descarga completada exitosamente ({format_desc})",
+            output=capture.output,
+            retries=capture.retries,
+            file_path=capture.file_path
+        )
+    
+    def interrupt(self) -> int:
+        """
+        Interrumpe las ejecuciones de yt-dlp en curso.
+        
+        Envía SIGINT (en Windows, terminate): yt-dlp corta la descarga o el
+        postprocesado, para a ffmpeg y deja los `.part` en disco, así que volver a
+        lanzar el mismo comando continúa donde se quedó.
+        
+        Returns:
+            Número de procesos interrumpidos.
+        """
+        with self._processes_lock:
+            processes = list(self._processes)
+        for process in processes:
+            try:
+                if os.name == 'nt':
+                    process.terminate()
+                else:
+                    process.send_signal(signal.SIGINT)
+            except OSError:
+                pass
+        return len(processes)
+    
+    def _info_for_tags(self, url: str) -> Optional[VideoInfo]:
+        """Información para las etiquetas (de la caché si ya se extrajo)."""
+        try:
+            return self.extract_info(url, flat=True)
+        except ExtractionError as e:
+            print(f"No se pudieron obtener las etiquetas: {e}", file=sys.stderr)
+            return None
+    
+    def _run_ytdlp(
+        self,
+        command: list,
+        labels: Dict[str, str],
+        log_path: Optional[str] = None,
+        progress_callback: Optional[Callable[[float], None]] = None,
+        env: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, OutputCapture]:
+        """
+        Ejecuta yt-dlp procesando su salida en streaming.
+        
+        Solo se conservan en memoria las últimas `Config.OUTPUT_TAIL_LINES` líneas;
+        si se indica `log_path`, la salida completa se vuelca a ese archivo.
+        
+        Args:
+            command: Comando a ejecutar.
+            labels: Etiquetas de formato y calidad para las métricas.
+            log_path: Archivo donde guardar el log completo (opcional).
+            progress_callback: Función que recibe el porcentaje de descarga (opcional).
+            env: Entorno del proceso (opcional; por defecto el del proceso actual).
+        
+        Returns:
+            Tupla con el código de salida y la captura de la salida.
+        """
+        log_file = open(log_path, 'w', encoding='utf-8') if log_path else None
+        start = time.perf_counter()
+        postprocess_start = []
+        capture = OutputCapture(
+            tail_lines=self.config.OUTPUT_TAIL_LINES,
+            log_file=log_file,
+            on_progress=progress_callback,
+            on_postprocess=lambda: postprocess_start.append(time.perf_counter())
+        )
+        
+        try:
+            process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                env=env
+            )
+            with self._processes_lock:
+                self._processes.add(process)
+            try:
+                for line in process.stdout:
+                    capture.feed(line)
+            finally:
+                process.stdout.close()
+                returncode = process.wait()
+                with self._processes_lock:
+                    self._processes.discard(process)
+        finally:
+            if log_file:
+                log_file.close()
+        
+        # Fases: descarga hasta el primer postprocesador, postprocess (merge/transcode) después
+        end = time.perf_counter()
+        download_end = postprocess_start[0] if postprocess_start else end
+        PHASE_DURATION.observe(download_end - start, phase='download', **labels)
+        if postprocess_start:
+            PHASE_DURATION.observe(end - download_end, phase='postprocess', **labels)
+        if capture.retries:
+            RETRIES.inc(capture.retries, **labels)
+        
+        return returncode, capture
@@ -0,0 +1,112 @@
+"""
+Resolución de ffmpeg/ffprobe compartida por todo el proceso.
+
+La búsqueda se hace una sola vez, de forma perezosa, la primera vez que se
+necesita un ejecutable. Orden de preferencia:
+
+1. ffmpeg y ffprobe del sistema (en el PATH).
+2. Binarios de `static-ffmpeg` (se descargan la primera vez).
+
+El resultado se guarda en disco, junto con su origen, para que los siguientes
+arranques de la API o del CLI no tengan que volver a comprobar `static-ffmpeg`.
+Las rutas del sistema guardadas se reutilizan sin buscar; las de `static-ffmpeg`
+solo mientras no haya ffmpeg en el sistema, así que instalarlo después basta
+para que se use.
+"""
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+CACHE_FILE_NAME = 'ffmpeg.json'
+
+_lock = threading.Lock()
+_paths: Optional[Tuple[str, str]] = None
+
+
+def get_ffmpeg_paths(cache_dir: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Obtiene las rutas de ffmpeg y ffprobe, resolviéndolas solo la primera vez.
+    
+    Args:
+        cache_dir: Carpeta de la caché persistente (opcional).
+    
+    Returns:
+        Tupla con las rutas de ffmpeg y ffprobe.
+    """
+    global _paths
+    if _paths is None:
+        with _lock:
+            if _paths is None:
+                _paths = _resolve(Path(cache_dir) if cache_dir else None)
+    return _paths
+
+
+def reset_ffmpeg_paths():
+    """Olvida la resolución en memoria (la caché en disco se mantiene)."""
+    global _paths
+    with _lock:
+        _paths = None
+
+
+def _resolve(cache_dir: Optional[Path]) -> Tuple[str, str]:
+    """Busca ffmpeg/ffprobe según el orden de preferencia y guarda el resultado."""
+    cache_file = cache_dir / CACHE_FILE_NAME if cache_dir else None
+    
+    cached, source = _load_cached(cache_file)
+    if cached and source == 'system':
+        return cached
+    
+    system_ffmpeg, system_ffprobe = shutil.which('ffmpeg'), shutil.which('ffprobe')
+    if system_ffmpeg and system_ffprobe:
+        paths, source = (system_ffmpeg, system_ffprobe), 'system'
+    elif cached:
+        return cached
+    else:
+        # Import diferido: static_ffmpeg solo se carga si no hay ffmpeg en el sistema
+        from static_ffmpeg import run
+        ffmpeg_path, ffprobe_path = run.get_or_fetch_platform_executables_else_raise()
+        paths, source = (str(ffmpeg_path), str(ffprobe_path)), 'static'
+    
+    _save_cached(cache_file, paths, source)
+    return paths
+
+
+def _is_executable(path: Optional[str]) -> bool:
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def _load_cached(cache_file: Optional[Path]) -> Tuple[Optional[Tuple[str, str]], Optional[str]]:
+    """
+    Lee la caché persistente si existe y sus rutas siguen siendo válidas.
+    
+    Returns:
+        Tupla con las rutas (o None) y su origen: 'system', 'static' o None si no
+        se conoce (cachés antiguas, que se tratan como `static-ffmpeg`).
+    """
+    if not cache_file or not cache_file.exists():
+        return None, None
+    try:
+        data = json.loads(cache_file.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None, None
+    ffmpeg_path, ffprobe_path = data.get('ffmpeg'), data.get('ffprobe')
+    if _is_executable(ffmpeg_path) and _is_executable(ffprobe_path):
+        return (ffmpeg_path, ffprobe_path), data.get('source')
+    return None, None
+
+
+def _save_cached(cache_file: Optional[Path], paths: Tuple[str, str], source: str):
+    """Guarda las rutas en la caché persistente (los errores se ignoran)."""
+    if not cache_file:
+        return
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix('.tmp')
+        tmp_file.write_text(json.dumps({'ffmpeg': paths[0], 'ffprobe': paths[1], 'source': source}), encoding='utf-8')
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass
@@ -0,0 +1,242 @@
+"""
+Formatos disponibles de un video y estimaciones de tamaño y tiempo.
+
+Las estimaciones reproducen la selección de formatos de `_download` (mejor
+video con altura <= calidad + mejor audio, prefiriendo MP4/M4A) sobre la lista
+de formatos de la extracción, y convierten el tamaño en tiempo con el
+rendimiento medido en las últimas descargas.
+"""
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import FormatType, VideoQuality
+
+
+# Bitrate medio de un MP3 VBR 0 (bits/s), para estimar el tamaño del archivo final
+MP3_VBR0_BITRATE = 245_000
+
+# Velocidad de la conversión a MP3 respecto al tiempo real (el merge de MP4 copia streams)
+MP3_ENCODE_SPEED = 40.0
+
+
+class MediaFormat:
+    """
+    Formato de descarga con solo los campos necesarios para las estimaciones.
+    
+    `size` es el tamaño en bytes (exacto, aproximado o calculado con el bitrate).
+    """
+    
+    __slots__ = ('format_id', 'ext', 'height', 'has_video', 'has_audio', 'size', 'tbr')
+    
+    def __init__(self, data: Dict[str, Any], duration: int):
+        self.format_id = str(data.get('format_id') or '')
+        self.ext = data.get('ext') or ''
+        self.height = int(data.get('height') or 0)
+        self.has_video = (data.get('vcodec') or 'none') != 'none'
+        self.has_audio = (data.get('acodec') or 'none') != 'none'
+        self.tbr = float(data.get('tbr') or data.get('abr') or data.get('vbr') or 0)
+        size = data.get('filesize') or data.get('filesize_approx')
+        if not size and self.tbr and duration:
+            size = self.tbr * 1000 / 8 * duration
+        self.size = int(size or 0)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte a diccionario."""
+        return {
+            'format_id': self.format_id,
+            'ext': self.ext,
+            'height': self.height or None,
+            'video': self.has_video,
+            'audio': self.has_audio,
+            'size': self.size or None,
+            'tbr': self.tbr or None,
+        }
+
+
+def compact_formats(formats: Optional[Iterable[Dict[str, Any]]], duration: int) -> Tuple[MediaFormat, ...]:
+    """
+    Reduce la lista de formatos de yt-dlp a los que sirven para estimar.
+    
+    Se descartan los que no tienen ni video ni audio (storyboards) y los que no
+    tienen tamaño ni bitrate.
+    """
+    compact = []
+    for data in formats or ():
+        media_format = MediaFormat(data, duration)
+        if (media_format.has_video or media_format.has_audio) and media_format.size:
+            compact.append(media_format)
+    return tuple(compact)
+
+
+def _best(candidates: List[MediaFormat]) -> Optional[MediaFormat]:
+    """Mejor formato: mayor resolución y, a igualdad, mayor bitrate."""
+    return max(candidates, key=lambda f: (f.height, f.tbr), default=None)
+
+
+def select_formats(
+    formats: Iterable[MediaFormat],
+    format_type: FormatType,
+    quality: Optional[VideoQuality] = None
+) -> List[MediaFormat]:
+    """
+    Formatos que elegiría yt-dlp con el selector de `_download`.
+    
+    Returns:
+        Lista con video y audio, un único formato combinado o vacía si no hay ninguno.
+    """
+    formats = list(formats)
+    audios = [f for f in formats if f.has_audio and not f.has_video]
+    audio = _best([f for f in audios if f.ext == 'm4a']) or _best(audios)
+    
+    if format_type == FormatType.MP3:
+        # bestaudio/best
+        best = audio or _best([f for f in formats if f.has_audio])
+        return [best] if best else []
+    
+    limit = None if quality in (None, VideoQuality.BEST) else int(quality.value)
+    fits = [f for f in formats if f.has_video and (limit is None or f.height <= limit)]
+    videos = [f for f in fits if not f.has_audio]
+    video = _best([f for f in videos if f.ext == 'mp4']) or _best(videos)
+    if video and audio:
+        return [video, audio]
+    combined = _best([f for f in fits if f.has_audio])
+    return [combined] if combined else []
+
+
+class Estimate:
+    """Tamaño y tiempo estimados de una descarga."""
+    
+    __slots__ = ('format_type', 'quality', 'format_ids', 'download_bytes', 'output_bytes', 'seconds')
+    
+    def __init__(
+        self,
+        format_type: FormatType,
+        quality: Optional[VideoQuality],
+        format_ids: List[str],
+        download_bytes: int,
+        output_bytes: int,
+        seconds: float
+    ):
+        self.format_type = format_type
+        self.quality = quality
+        self.format_ids = format_ids
+        self.download_bytes = download_bytes
+        self.output_bytes = output_bytes
+        self.seconds = seconds
+    
+    def fits(self, max_bytes: Optional[float] = None, max_seconds: Optional[float] = None) -> bool:
+        """True si el archivo final y el tiempo caben en el presupuesto."""
+        return (max_bytes is None or self.output_bytes <= max_bytes) and \
+            (max_seconds is None or self.seconds <= max_seconds)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte a diccionario."""
+        return {
+            'format': self.format_type.value,
+            'quality': self.quality.value if self.quality else None,
+            'format_ids': self.format_ids,
+            'download_bytes': self.download_bytes,
+            'output_bytes': self.output_bytes,
+            'seconds': round(self.seconds, 1),
+        }
+
+
+def estimate(
+    formats: Iterable[MediaFormat],
+    duration: int,
+    format_type: FormatType,
+    quality: Optional[VideoQuality],
+    throughput: float,
+    fraction: float = 1.0
+) -> Optional[Estimate]:
+    """
+    Estima el tamaño y el tiempo de una descarga.
+    
+    Args:
+        formats: Formatos del video (ver `compact_formats`).
+        duration: Duración del video en segundos.
+        format_type: MP3 o MP4.
+        quality: Calidad pedida (solo MP4).
+        throughput: Rendimiento de descarga en bytes/s.
+        fraction: Parte del video que se descarga (fragmentos).
+    
+    Returns:
+        Estimate, o None si no hay formatos con tamaño conocido.
+    """
+    selected = select_formats(formats, format_type, quality)
+    if not selected:
+        return None
+    
+    download_bytes = int(sum(f.size for f in selected) * fraction)
+    seconds = download_bytes / throughput if throughput > 0 else 0.0
+    if format_type == FormatType.MP3:
+        output_bytes = int(MP3_VBR0_BITRATE / 8 * duration * fraction)
+        seconds += duration * fraction / MP3_ENCODE_SPEED
+    else:
+        # El merge copia los streams: el MP4 ocupa lo mismo que lo descargado
+        output_bytes = download_bytes
+    
+    return Estimate(
+        format_type,
+        quality if format_type == FormatType.MP4 else None,
+        [f.format_id for f in selected],
+        download_bytes,
+        output_bytes,
+        seconds
+    )
+
+
+def pick_estimate(
+    estimates: Iterable[Estimate],
+    max_bytes: Optional[float] = None,
+    max_seconds: Optional[float] = None,
+    quality: Optional[VideoQuality] = None
+) -> Optional[Estimate]:
+    """
+    Elige la primera estimación (la de mayor calidad) que cabe en el presupuesto.
+    
+    Args:
+        estimates: Estimaciones ordenadas de mayor a menor calidad.
+        max_bytes: Tamaño máximo del archivo final (opcional).
+        max_seconds: Tiempo máximo de la descarga (opcional).
+        quality: Calidad máxima aceptada en MP4 (opcional).
+    
+    Returns:
+        La estimación elegida, o None si ninguna cabe.
+    """
+    order = list(VideoQuality)
+    for item in estimates:
+        if quality and item.quality and order.index(item.quality) > order.index(quality):
+            continue
+        if item.fits(max_bytes, max_seconds):
+            return item
+    return None
+
+
+class ThroughputMeter:
+    """
+    Rendimiento de descarga medido en las últimas descargas (bytes/s).
+    
+    Usa el total de bytes entre el total de segundos de las últimas `window`
+    muestras; hasta que hay alguna, devuelve `default`.
+    """
+    
+    def __init__(self, window: int = 20, default: float = 2 * 1024 * 1024):
+        self.default = default
+        self._samples: deque = deque(maxlen=max(window, 1))
+        self._lock = threading.Lock()
+    
+    def record(self, downloaded_bytes: int, seconds: float):
+        """Añade una muestra (se ignoran las descargas sin tiempo medible)."""
+        if downloaded_bytes > 0 and seconds > 0:
+            with self._lock:
+                self._samples.append((downloaded_bytes, seconds))
+    
+    @property
+    def rate(self) -> float:
+        """Bytes por segundo estimados para la próxima descarga."""
+        with self._lock:
+            total_bytes = sum(sample[0] for sample in self._samples)
+            total_seconds = sum(sample[1] for sample in self._samples)
+        return total_bytes / total_seconds if total_seconds else self.default
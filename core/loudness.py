@@ -0,0 +1,140 @@
+"""
+Normalización de volumen EBU R128 (filtro `loudnorm` de ffmpeg).
+
+La normalización se hace dentro de la misma pasada de ffmpeg que convierte el
+audio a MP3, sin decodificar el archivo otra vez:
+
+- Primera vez: `loudnorm` en modo dinámico (una pasada). ffmpeg imprime la
+  medición del audio de entrada, que se recoge con FFREPORT y se guarda en caché.
+- Siguientes veces: con la medición en caché se usa el modo lineal, que aplica
+  una ganancia constante y conserva la dinámica original.
+"""
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional
+
+from .metrics import CACHE_REQUESTS
+
+
+# Campos de la medición de loudnorm que se reutilizan en el modo lineal
+MEASURED_FIELDS = ('input_i', 'input_tp', 'input_lra', 'input_thresh', 'target_offset')
+
+# Bloque JSON que loudnorm imprime al terminar (print_format=json)
+_STATS_PATTERN = re.compile(r'\{[^{}]*"input_i"[^{}]*\}', re.S)
+
+# Frecuencia de salida: loudnorm trabaja a 192 kHz internamente
+OUTPUT_SAMPLE_RATE = 48000
+
+
+def build_filter(
+    integrated: float,
+    true_peak: float,
+    lra: float,
+    measured: Optional[Dict[str, str]] = None
+) -> str:
+    """
+    Construye la cadena de filtros de audio para la normalización.
+    
+    Args:
+        integrated: Sonoridad integrada objetivo (LUFS).
+        true_peak: Pico verdadero máximo (dBTP).
+        lra: Rango de sonoridad objetivo (LU).
+        measured: Medición previa del audio (modo lineal). Sin ella se usa el
+            modo dinámico y se imprime la medición en JSON.
+    
+    Returns:
+        Valor para `-af`.
+    """
+    options = f'loudnorm=I={integrated:g}:TP={true_peak:g}:LRA={lra:g}'
+    if measured:
+        options += (
+            f":measured_I={measured['input_i']}:measured_TP={measured['input_tp']}"
+            f":measured_LRA={measured['input_lra']}:measured_thresh={measured['input_thresh']}"
+            f":offset={measured['target_offset']}:linear=true:print_format=none"
+        )
+    else:
+        options += ':print_format=json'
+    return f'{options},aresample={OUTPUT_SAMPLE_RATE}'
+
+
+def parse_stats(text: str) -> Optional[Dict[str, str]]:
+    """
+    Extrae la medición del último bloque JSON de loudnorm en un log de ffmpeg.
+    
+    Returns:
+        Diccionario con MEASURED_FIELDS, o None si no hay medición válida.
+    """
+    for block in reversed(_STATS_PATTERN.findall(text or '')):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        # Silencio o audio vacío: loudnorm devuelve -inf y la medición no sirve
+        if all(field in data for field in MEASURED_FIELDS) and \
+                not any('inf' in str(data[field]) for field in MEASURED_FIELDS):
+            return {field: str(data[field]) for field in MEASURED_FIELDS}
+    return None
+
+
+def report_env(report_dir: str) -> Dict[str, str]:
+    """
+    Entorno para que ffmpeg vuelque su log (nivel info) en `report_dir`.
+    
+    yt-dlp no muestra la salida de ffmpeg de sus postprocesadores, así que la
+    medición se recoge de los reportes de FFREPORT.
+    """
+    # En FFREPORT ':' separa opciones y '%' es un patrón: hay que escaparlos
+    escaped = report_dir.replace('\\', '\\\\').replace(':', '\\:').replace('%', '%%')
+    env = dict(os.environ)
+    env['FFREPORT'] = f'file={escaped}/%p-%t.log:level=32'
+    return env
+
+
+def read_reports(report_dir: str) -> Optional[Dict[str, str]]:
+    """Busca la medición de loudnorm en los reportes de ffmpeg de una carpeta."""
+    reports = sorted(Path(report_dir).glob('ffmpeg-*.log'), key=lambda path: path.stat().st_mtime)
+    for report in reversed(reports):
+        stats = parse_stats(report.read_text(encoding='utf-8', errors='replace'))
+        if stats:
+            return stats
+    return None
+
+
+class LoudnessCache:
+    """
+    Mediciones de sonoridad en disco, una por video (y fragmento).
+    
+    Cada medición es un JSON pequeño con el nombre derivado de la clave, así
+    que varias descargas pueden escribir a la vez sin bloquearse.
+    """
+    
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+    
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / (hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+    
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        """Devuelve la medición guardada para `key`, o None."""
+        try:
+            data = json.loads(self._path(key).read_text(encoding='utf-8'))
+            stats = {field: str(data[field]) for field in MEASURED_FIELDS}
+        except (OSError, ValueError, KeyError, TypeError):
+            CACHE_REQUESTS.inc(cache='loudness', result='miss')
+            return None
+        CACHE_REQUESTS.inc(cache='loudness', result='hit')
+        return stats
+    
+    def put(self, key: str, stats: Dict[str, str]):
+        """Guarda la medición de `key` (los errores de disco se ignoran)."""
+        path = self._path(key)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps({'key': key, **stats}), encoding='utf-8')
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
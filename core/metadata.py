@@ -0,0 +1,183 @@
+"""
+Metadatos de los archivos descargados: etiquetas, portadas y caché de información.
+
+Las etiquetas (ID3 en MP3, atoms en MP4) y la portada se escriben en la misma
+pasada de ffmpeg que ya hace yt-dlp (conversión a MP3 o merge a MP4), en lugar
+de usar `--embed-metadata`/`--embed-thumbnail`, que reescriben el archivo
+completo otra vez. Las miniaturas se descargan una sola vez por video y se
+guardan ya redimensionadas.
+"""
+import hashlib
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .metrics import CACHE_REQUESTS
+
+
+# Valor por defecto de VideoInfo cuando falta un campo: no se escribe como etiqueta
+_UNKNOWN = 'Desconocido'
+
+
+class InfoCache:
+    """
+    Caché LRU en memoria de la información extraída, con caducidad.
+    
+    Evita volver a lanzar yt-dlp para un video cuya información ya se pidió
+    (p. ej. la vista previa del frontend seguida de la descarga).
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Devuelve el valor guardado para `key` si no ha caducado."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                value = entry[1]
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                value = None
+        CACHE_REQUESTS.inc(cache='info', result='hit' if value is not None else 'miss')
+        return value
+    
+    def put(self, key: str, value: Any):
+        """Guarda `value`, descartando la entrada menos usada si está llena."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def __len__(self):
+        return len(self._entries)
+
+
+class ThumbnailCache:
+    """
+    Portadas en disco, una por video, ya convertidas a JPEG y redimensionadas.
+    """
+    
+    def __init__(self, cache_dir: str, size: int = 600, timeout: float = 15):
+        self.cache_dir = Path(cache_dir)
+        self.size = size
+        self.timeout = timeout
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+    
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / (hashlib.sha1(key.encode('utf-8')).hexdigest() + '.jpg')
+    
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+    
+    def get(self, key: str, url: str, ffmpeg_path: str) -> Optional[str]:
+        """
+        Obtiene la portada de un video, descargándola solo la primera vez.
+        
+        Args:
+            key: Clave del video (ver `ParsedURL.key`).
+            url: URL de la miniatura.
+            ffmpeg_path: Ruta de ffmpeg para convertir y redimensionar.
+        
+        Returns:
+            Ruta del JPEG, o None si no se pudo obtener.
+        """
+        path = self._path(key)
+        if path.exists():
+            CACHE_REQUESTS.inc(cache='thumbnail', result='hit')
+            return str(path)
+        if not url:
+            return None
+        
+        # Un solo fetch por video aunque lleguen varias descargas a la vez
+        with self._lock_for(key):
+            if path.exists():
+                CACHE_REQUESTS.inc(cache='thumbnail', result='hit')
+                return str(path)
+            CACHE_REQUESTS.inc(cache='thumbnail', result='miss')
+            return self._fetch(url, path, ffmpeg_path)
+    
+    def _fetch(self, url: str, path: Path, ffmpeg_path: str) -> Optional[str]:
+        """Descarga la miniatura y la convierte a JPEG de `size` px como máximo."""
+        source = path.with_suffix('.src')
+        tmp_path = path.with_suffix('.tmp.jpg')
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with urllib.request.urlopen(url, timeout=self.timeout) as response, open(source, 'wb') as f:
+                f.write(response.read())
+            subprocess.run(
+                [
+                    ffmpeg_path, '-y', '-loglevel', 'error', '-i', str(source),
+                    '-vf', f'scale={self.size}:{self.size}:force_original_aspect_ratio=decrease',
+                    '-frames:v', '1', '-q:v', '3', str(tmp_path)
+                ],
+                check=True,
+                capture_output=True,
+                timeout=self.timeout
+            )
+            os.replace(tmp_path, path)
+            return str(path)
+        except (OSError, ValueError, subprocess.SubprocessError) as e:
+            print(f"No se pudo obtener la portada: {e}", file=sys.stderr)
+            return None
+        finally:
+            for leftover in (source, tmp_path):
+                try:
+                    leftover.unlink()
+                except OSError:
+                    pass
+
+
+def tag_args(info: Any, url: str) -> List[str]:
+    """
+    Argumentos `-metadata` de ffmpeg para las etiquetas de un video.
+    
+    Args:
+        info: VideoInfo del video.
+        url: URL canónica (se guarda como comentario).
+    
+    Returns:
+        Lista de argumentos para ffmpeg.
+    """
+    tags = {
+        'title': info.track or info.title,
+        'artist': info.artist or info.uploader,
+        'album': info.album,
+        'date': info.upload_date[:4],
+        'comment': url,
+    }
+    args = []
+    for name, value in tags.items():
+        if value and value != _UNKNOWN:
+            args.extend(['-metadata', f'{name}={value}'])
+    return args
+
+
+def mp3_cover_args() -> List[str]:
+    """
+    Argumentos de salida para guardar la portada como APIC en el MP3.
+    
+    La portada es la primera entrada (0) y el audio la segunda (1). ExtractAudio
+    añade `-vn`; `-novn` lo anula para poder mapear la imagen.
+    """
+    return [
+        '-novn', '-map', '1:a:0', '-map', '0:v:0', '-c:v', 'copy',
+        '-id3v2_version', '3', '-write_id3v1', '1',
+        '-metadata:s:v', 'title=Album cover', '-metadata:s:v', 'comment=Cover (front)',
+    ]
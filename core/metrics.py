@@ -0,0 +1,331 @@
+"""
+Métricas del descargador en formato de exposición de Prometheus.
+
+Implementación mínima (contadores, gauges e histogramas con etiquetas) para no
+añadir dependencias. Las métricas se registran en el registro global `metrics`
+y se exponen en texto plano desde la API (`GET /metrics`).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Buckets pensados para trabajos de descarga: de medio segundo a una hora
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _format_value(value: float) -> str:
+    """Formatea un valor numérico como lo espera Prometheus."""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Construye la parte `{a="1",b="2"}` de una muestra."""
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class _Metric:
+    """Base común para todas las métricas con etiquetas."""
+    
+    metric_type = 'untyped'
+    
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Obtiene la tupla de valores de etiqueta en el orden declarado."""
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"Etiquetas incorrectas para {self.name}: {sorted(labels)} "
+                f"(esperadas {list(self.label_names)})"
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+    
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+    
+    def render(self) -> str:
+        """Renderiza la métrica en formato de texto de Prometheus."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.metric_type}',
+        ]
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Contador monótono."""
+    
+    metric_type = 'counter'
+    
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Incrementa el contador."""
+        if amount < 0:
+            raise ValueError("Un contador solo puede incrementarse")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def get(self, **labels: str) -> float:
+        """Valor actual para un conjunto de etiquetas."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Valor que puede subir y bajar, o calcularse al momento del scrape."""
+    
+    metric_type = 'gauge'
+    
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+    
+    def set(self, value: float, **labels: str) -> None:
+        """Fija el valor del gauge."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Incrementa el gauge."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        """Decrementa el gauge."""
+        self.inc(-amount, **labels)
+    
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Calcula el valor (sin etiquetas) llamando a `function` en cada scrape."""
+        if self.label_names:
+            raise ValueError("set_function solo admite gauges sin etiquetas")
+        self._function = function
+    
+    def get(self, **labels: str) -> float:
+        """Valor actual para un conjunto de etiquetas."""
+        if self._function is not None:
+            return self._function()
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+    
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            return [f'{self.name} {_format_value(self._function())}']
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Histograma acumulativo con buckets fijos."""
+    
+    metric_type = 'histogram'
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Por cada combinación de etiquetas: [conteos por bucket..., suma, total]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+    
+    def observe(self, value: float, **labels: str) -> None:
+        """Registra una observación."""
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+    
+    @contextmanager
+    def time(self, **labels: str):
+        """Context manager que observa el tiempo transcurrido en segundos."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def count(self, **labels: str) -> int:
+        """Número de observaciones para un conjunto de etiquetas."""
+        with self._lock:
+            data = self._values.get(self._key(labels))
+            return int(data[-1]) if data else 0
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(data)) for key, data in self._values.items())
+        lines = []
+        bucket_labels = self.label_names + ('le',)
+        for key, data in items:
+            for bound, value in zip(self.buckets, data):
+                lines.append(
+                    f'{self.name}_bucket{_format_labels(bucket_labels, key + (_format_value(bound),))} '
+                    f'{_format_value(value)}'
+                )
+            lines.append(
+                f'{self.name}_bucket{_format_labels(bucket_labels, key + ("+Inf",))} '
+                f'{_format_value(data[-1])}'
+            )
+            labels = _format_labels(self.label_names, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(data[-2])}')
+            lines.append(f'{self.name}_count{labels} {_format_value(data[-1])}')
+        return lines
+
+
+class MetricsRegistry:
+    """Registro de métricas que se exponen juntas."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+    
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica duplicada: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, documentation: str, label_names: Iterable[str] = ()) -> Counter:
+        """Crea y registra un contador."""
+        return self._register(Counter(name, documentation, label_names))
+    
+    def gauge(self, name: str, documentation: str, label_names: Iterable[str] = ()) -> Gauge:
+        """Crea y registra un gauge."""
+        return self._register(Gauge(name, documentation, label_names))
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """Crea y registra un histograma."""
+        return self._register(Histogram(name, documentation, label_names, buckets))
+    
+    def render(self) -> str:
+        """Renderiza todas las métricas registradas."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+# Registro global del proceso
+metrics = MetricsRegistry()
+
+# Duración total de un trabajo, desde que se crea hasta que termina
+JOB_DURATION = metrics.histogram(
+    'downloader_job_duration_seconds',
+    'Duración total de los trabajos de descarga',
+    ['format', 'quality', 'status']
+)
+
+# Duración por fase: extract, download, postprocess (merge/transcode), file_discovery y store
+PHASE_DURATION = metrics.histogram(
+    'downloader_phase_duration_seconds',
+    'Duración de cada fase de un trabajo de descarga',
+    ['phase', 'format', 'quality']
+)
+
+BYTES_DOWNLOADED = metrics.counter(
+    'downloader_bytes_downloaded_total',
+    'Bytes transferidos por yt-dlp (según las líneas finales de cada descarga)',
+    ['format', 'quality']
+)
+
+CACHE_REQUESTS = metrics.counter(
+    'downloader_cache_requests_total',
+    'Consultas a cachés internas por resultado (hit/miss)',
+    ['cache', 'result']
+)
+
+RETRIES = metrics.counter(
+    'downloader_retries_total',
+    'Reintentos de red realizados por yt-dlp',
+    ['format', 'quality']
+)
+
+FAILURES = metrics.counter(
+    'downloader_failures_total',
+    'Trabajos fallidos por motivo',
+    ['format', 'quality', 'reason']
+)
+
+REJECTIONS = metrics.counter(
+    'downloader_admission_rejections_total',
+    'Trabajos rechazados antes de empezar, por motivo',
+    ['reason']
+)
+
+RESERVED_BYTES = metrics.gauge(
+    'downloader_reserved_bytes',
+    'Espacio en disco reservado por los trabajos admitidos'
+)
+
+QUEUE_DEPTH = metrics.gauge(
+    'downloader_queue_depth',
+    'Trabajos esperando un slot de descarga'
+)
+
+ACTIVE_SLOTS = metrics.gauge(
+    'downloader_active_slots',
+    'Slots de descarga ocupados'
+)
+
+TOTAL_SLOTS = metrics.gauge(
+    'downloader_slots',
+    'Slots de descarga configurados'
+)
+
+
+def quality_label(format_type: str, quality: Optional[str]) -> str:
+    """Etiqueta de calidad homogénea: la resolución para MP4, 'audio' para MP3 y 'subtitles' para SRT/VTT."""
+    if format_type == 'mp3':
+        return 'audio'
+    if format_type in ('srt', 'vtt'):
+        return 'subtitles'
+    return quality or 'none'
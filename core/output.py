@@ -0,0 +1,164 @@
+"""
+Captura acotada de la salida de yt-dlp.
+
+La salida se procesa línea a línea mientras el proceso corre: solo se guardan
+en memoria las últimas N líneas y los campos que realmente se usan (archivos
+generados, progreso, errores y reintentos). Opcionalmente, el log completo se
+vuelca a un archivo en disco.
+"""
+import re
+from collections import deque
+from typing import Callable, Deque, List, Optional, TextIO
+
+
+_DESTINATION_PATTERN = re.compile(r'^\[download\] Destination: (?P<path>.+)$')
+_ALREADY_DOWNLOADED_PATTERN = re.compile(r'^\[download\] (?P<path>.+) has already been downloaded$')
+_MERGER_PATTERN = re.compile(r'^\[Merger\] Merging formats into "(?P<path>.+)"$')
+_POSTPROCESS_DESTINATION_PATTERN = re.compile(
+    r'^\[(?:ExtractAudio|VideoConvertor|VideoRemuxer)\] .*Destination: (?P<path>.+)$'
+)
+_NOT_CONVERTING_PATTERN = re.compile(
+    r'^\[ExtractAudio\] Not converting audio (?P<path>.+); file is already in target format$'
+)
+_SUBTITLE_PATTERN = re.compile(r'^\[info\] Writing video subtitles to: (?P<path>.+)$')
+_SUBTITLE_PRESENT_PATTERN = re.compile(r'^\[info\] Video subtitle \S+ is already present$')
+_PROGRESS_PATTERN = re.compile(r'^\[download\]\s+(?P<percent>\d+(?:\.\d+)?)%')
+_POSTPROCESS_PATTERN = re.compile(
+    r'^\[(?:Merger|ExtractAudio|VideoConvertor|VideoRemuxer|Fixup\w*|Metadata|EmbedThumbnail|EmbedSubtitle|SubtitlesConvertor)\]'
+)
+# Línea final de cada descarga: "[download] 100% of   10.00MiB in 00:00:03 at 3.03MiB/s"
+_FINISHED_PATTERN = re.compile(
+    r'^\[download\]\s+100(?:\.0+)?% of\s+~?\s*(?P<size>\d+(?:\.\d+)?)(?P<unit>[KMGT]?i?B) in (?P<elapsed>[\d:]+)'
+)
+_SIZE_UNITS = {'B': 1, 'KiB': 1024, 'MiB': 1024 ** 2, 'GiB': 1024 ** 3, 'TiB': 1024 ** 4,
+               'KB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3, 'TB': 1000 ** 4}
+_RETRY_PATTERN = re.compile(r'Retrying \(\d+/\d+\)|Retrying fragment')
+
+# Errores que se conservan como máximo (además de la cola de líneas)
+MAX_ERROR_LINES = 20
+
+
+class OutputCapture:
+    """
+    Procesa la salida de yt-dlp en streaming con memoria acotada.
+    
+    Attributes:
+        tail: Últimas líneas de salida (buffer circular).
+        errors: Últimas líneas de error (`ERROR:`).
+        downloaded_files: Archivos descargados antes del postprocesado.
+        subtitle_files: Subtítulos escritos (con su extensión original).
+        subtitles_present: Subtítulos que ya existían y no se volvieron a bajar.
+        file_path: Archivo final anunciado por yt-dlp, si se detectó.
+        retries: Reintentos de red detectados.
+        downloaded_bytes: Bytes bajados según las líneas finales de cada descarga.
+        download_seconds: Tiempo que tardaron esas descargas.
+        postprocessing: True desde que yt-dlp empezó a postprocesar (merge/transcode).
+    """
+    
+    def __init__(
+        self,
+        tail_lines: int = 200,
+        log_file: Optional[TextIO] = None,
+        on_progress: Optional[Callable[[float], None]] = None,
+        on_postprocess: Optional[Callable[[], None]] = None
+    ):
+        """
+        Inicializa la captura.
+        
+        Args:
+            tail_lines: Número de líneas recientes a conservar en memoria.
+            log_file: Archivo abierto donde volcar la salida completa (opcional).
+            on_progress: Callback con el porcentaje de descarga (0-100).
+            on_postprocess: Callback llamado una sola vez al empezar el postprocesado.
+        """
+        self.tail: Deque[str] = deque(maxlen=tail_lines)
+        self.errors: Deque[str] = deque(maxlen=MAX_ERROR_LINES)
+        self.downloaded_files: List[str] = []
+        self.subtitle_files: List[str] = []
+        self.subtitles_present = 0
+        self.file_path: Optional[str] = None
+        self.retries = 0
+        self.downloaded_bytes = 0
+        self.download_seconds = 0.0
+        self.postprocessing = False
+        self._log_file = log_file
+        self._on_progress = on_progress
+        self._on_postprocess = on_postprocess
+    
+    def feed(self, line: str) -> None:
+        """Procesa una línea de salida."""
+        line = line.rstrip('\r\n')
+        if self._log_file is not None:
+            self._log_file.write(line + '\n')
+        if not line:
+            return
+        self.tail.append(line)
+        
+        if line.startswith('ERROR:'):
+            self.errors.append(line)
+        self.retries += len(_RETRY_PATTERN.findall(line))
+        
+        if line.startswith('[download]'):
+            self._parse_download_line(line)
+        elif line.startswith('[info]'):
+            self._parse_info_line(line)
+        elif _POSTPROCESS_PATTERN.match(line):
+            self._parse_postprocess_line(line)
+    
+    def _parse_download_line(self, line: str) -> None:
+        match = _PROGRESS_PATTERN.match(line)
+        if match:
+            if self._on_progress:
+                self._on_progress(float(match.group('percent')))
+            self._parse_finished_line(line)
+            return
+        
+        match = _DESTINATION_PATTERN.match(line) or _ALREADY_DOWNLOADED_PATTERN.match(line)
+        if match:
+            path = match.group('path')
+            if path not in self.downloaded_files:
+                self.downloaded_files.append(path)
+            self.file_path = path
+    
+    def _parse_finished_line(self, line: str) -> None:
+        match = _FINISHED_PATTERN.match(line)
+        if not match or match.group('unit') not in _SIZE_UNITS:
+            return
+        seconds = 0
+        for part in match.group('elapsed').split(':'):
+            seconds = seconds * 60 + int(part or 0)
+        self.downloaded_bytes += int(float(match.group('size')) * _SIZE_UNITS[match.group('unit')])
+        self.download_seconds += seconds
+    
+    def _parse_info_line(self, line: str) -> None:
+        match = _SUBTITLE_PATTERN.match(line)
+        if match:
+            self.subtitle_files.append(match.group('path'))
+        elif _SUBTITLE_PRESENT_PATTERN.match(line):
+            self.subtitles_present += 1
+    
+    def _parse_postprocess_line(self, line: str) -> None:
+        if not self.postprocessing:
+            self.postprocessing = True
+            if self._on_postprocess:
+                self._on_postprocess()
+        
+        match = (
+            _MERGER_PATTERN.match(line)
+            or _POSTPROCESS_DESTINATION_PATTERN.match(line)
+            or _NOT_CONVERTING_PATTERN.match(line)
+        )
+        if match:
+            self.file_path = match.group('path')
+    
+    @property
+    def output(self) -> str:
+        """Últimas líneas de salida como texto."""
+        return '\n'.join(self.tail)
+    
+    @property
+    def error(self) -> str:
+        """Resumen del error: las líneas `ERROR:` o, si no hay, el final de la salida."""
+        if self.errors:
+            return '\n'.join(self.errors)
+        return '\n'.join(list(self.tail)[-MAX_ERROR_LINES:])
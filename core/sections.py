@@ -0,0 +1,63 @@
+"""
+Fragmentos de descarga (inicio/fin).
+
+Convierte los instantes que introduce el usuario a segundos y construye el
+argumento de `--download-sections` de yt-dlp.
+"""
+import re
+from typing import Optional
+
+
+# Instantes en segundos o con formato [HH:]MM:SS(.ms)
+_TIMESTAMP_PATTERN = re.compile(r'(?:(?:(\d+):)?(\d{1,2}):)?(\d+(?:\.\d+)?)')
+
+
+def parse_timestamp(value) -> float:
+    """
+    Convierte un instante en segundos.
+    
+    Args:
+        value: Segundos (número o texto) o texto con formato `MM:SS` / `HH:MM:SS`.
+    
+    Returns:
+        Segundos desde el inicio del video.
+    
+    Raises:
+        ValueError: Si el formato no es válido o el valor es negativo.
+    """
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        match = _TIMESTAMP_PATTERN.fullmatch(str(value).strip())
+        if not match:
+            raise ValueError(f"Instante no válido: {value}")
+        hours, minutes, secs = match.groups()
+        seconds = int(hours or 0) * 3600 + int(minutes or 0) * 60 + float(secs)
+    if seconds < 0:
+        raise ValueError(f"El instante no puede ser negativo: {value}")
+    return seconds
+
+
+def format_section(start: Optional[float], end: Optional[float]) -> str:
+    """
+    Construye el argumento de `--download-sections` para un fragmento.
+    
+    Args:
+        start: Inicio en segundos (None = desde el principio).
+        end: Fin en segundos (None = hasta el final).
+    
+    Returns:
+        Texto con el formato `*inicio-fin` que espera yt-dlp.
+    
+    Raises:
+        ValueError: Si el fin no es posterior al inicio.
+    """
+    start = start or 0.0
+    if end is not None and end <= start:
+        raise ValueError(f"El fin del fragmento ({end}) debe ser posterior al inicio ({start})")
+    return f"*{_format_seconds(start)}-{'inf' if end is None else _format_seconds(end)}"
+
+
+def _format_seconds(seconds: float) -> str:
+    """Segundos con hasta milisegundos y sin ceros sobrantes (90.5, 3600)."""
+    return f"{seconds:.3f}".rstrip('0').rstrip('.')
@@ -0,0 +1,432 @@
+"""
+Almacenamiento de los archivos generados (artefactos).
+
+- `LocalStorage`: una carpeta del disco local (comportamiento por defecto).
+- `S3Storage`: un bucket compatible con S3 (AWS, MinIO, Ceph...). Los archivos
+  se suben en partes de tamaño fijo (multipart upload) sin cargarlos enteros en
+  memoria, y se sirven con URLs prefirmadas para que la descarga no pase por la API.
+
+El cliente S3 usa solo la biblioteca estándar (firma AWS Signature Version 4).
+"""
+import datetime
+import hashlib
+import hmac
+import os
+import shutil
+import urllib.error
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ElementTree
+from typing import Dict, List, Optional, Tuple
+
+# Tamaño de los bloques al copiar archivos
+_COPY_CHUNK = 1024 * 1024
+
+# Caracteres que S3 no codifica en rutas y parámetros (RFC 3986 sin reservar)
+_UNRESERVED = '-_.~'
+
+
+class StorageError(Exception):
+    """Error al guardar o leer un artefacto."""
+
+
+class Storage:
+    """
+    Interfaz de almacenamiento de artefactos, identificados por una clave.
+    
+    Las implementaciones deben definir `open_writer`, `local_path` o
+    `presigned_url`, y `delete`.
+    """
+    
+    def open_writer(self, key: str):
+        """
+        Abre un escritor en streaming para `key`.
+        
+        El escritor tiene `write(data)`, `close()` (publica el archivo) y
+        `abort()` (lo descarta); como gestor de contexto llama a `abort()` si
+        hay una excepción.
+        """
+        raise NotImplementedError
+    
+    def store_file(self, key: str, path: str) -> int:
+        """
+        Guarda un archivo local con la clave `key`.
+        
+        El archivo original deja de ser necesario: se mueve o se borra.
+        
+        Returns:
+            Tamaño en bytes.
+        """
+        size = os.path.getsize(path)
+        with open(path, 'rb') as source, self.open_writer(key) as writer:
+            shutil.copyfileobj(source, writer, _COPY_CHUNK)
+        os.remove(path)
+        return size
+    
+    def local_path(self, key: str) -> Optional[str]:
+        """Ruta local del artefacto, si el almacenamiento es un disco accesible."""
+        return None
+    
+    def presigned_url(self, key: str, filename: Optional[str] = None) -> Optional[str]:
+        """URL temporal para descargar el artefacto directamente, si el backend la admite."""
+        return None
+    
+    def delete(self, key: str):
+        """Borra el artefacto (si no existe no hace nada)."""
+        raise NotImplementedError
+
+
+class _Writer:
+    """Base de los escritores: cierre o descarte automático como gestor de contexto."""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class _LocalWriter(_Writer):
+    """Escribe en un archivo temporal y lo renombra al cerrar."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = path + '.part'
+        self._file = open(self.tmp_path, 'wb')
+    
+    def write(self, data: bytes) -> int:
+        return self._file.write(data)
+    
+    def close(self):
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+    
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+class LocalStorage(Storage):
+    """Artefactos en una carpeta del disco local."""
+    
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+    
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.dirname(path) != self.root:
+            raise StorageError(f"Clave no válida: {key}")
+        return path
+    
+    def open_writer(self, key: str) -> _LocalWriter:
+        os.makedirs(self.root, exist_ok=True)
+        return _LocalWriter(self._path(key))
+    
+    def store_file(self, key: str, path: str) -> int:
+        """Mueve el archivo a la carpeta (sin copiarlo si ya está en el mismo disco)."""
+        target = self._path(key)
+        if os.path.abspath(path) != target:
+            os.makedirs(self.root, exist_ok=True)
+            shutil.move(path, target)
+        return os.path.getsize(target)
+    
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+    
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+def _quote(value: str, safe: str = _UNRESERVED) -> str:
+    return urllib.parse.quote(value, safe=safe)
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode('utf-8'), hashlib.sha256).digest()
+
+
+def _canonical_query(params: Dict[str, str]) -> str:
+    return '&'.join(f"{_quote(k)}={_quote(v)}" for k, v in sorted(params.items()))
+
+
+def sign_v4(
+    method: str,
+    path: str,
+    params: Dict[str, str],
+    headers: Dict[str, str],
+    payload_hash: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    now: datetime.datetime
+) -> Tuple[str, str]:
+    """
+    Firma una petición con AWS Signature Version 4 (servicio s3).
+    
+    Args:
+        method: Método HTTP.
+        path: Ruta ya codificada (p. ej. '/bucket/clave').
+        params: Parámetros de la query (sin codificar).
+        headers: Cabeceras firmadas (deben incluir 'host').
+        payload_hash: SHA-256 del cuerpo en hexadecimal, o 'UNSIGNED-PAYLOAD'.
+        access_key: Clave de acceso.
+        secret_key: Clave secreta.
+        region: Región del bucket.
+        now: Instante de la firma (UTC).
+    
+    Returns:
+        Tupla (credencial, firma) para la cabecera Authorization o la URL prefirmada.
+    """
+    date = now.strftime('%Y%m%d')
+    amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+    scope = f"{date}/{region}/s3/aws4_request"
+    
+    names = sorted(name.lower() for name in headers)
+    values = {name.lower(): ' '.join(str(value).split()) for name, value in headers.items()}
+    canonical_request = '\n'.join([
+        method,
+        path,
+        _canonical_query(params),
+        ''.join(f"{name}:{values[name]}\n" for name in names),
+        ';'.join(names),
+        payload_hash,
+    ])
+    string_to_sign = '\n'.join([
+        'AWS4-HMAC-SHA256',
+        amz_date,
+        scope,
+        hashlib.sha256(canonical_request.encode('utf-8')).hexdigest(),
+    ])
+    
+    key = _hmac(('AWS4' + secret_key).encode('utf-8'), date)
+    for part in (region, 's3', 'aws4_request'):
+        key = _hmac(key, part)
+    signature = hmac.new(key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+    return f"{access_key}/{scope}", signature
+
+
+class _S3Writer(_Writer):
+    """
+    Sube un objeto en partes a medida que se escribe.
+    
+    Mientras no se llena la primera parte no se inicia nada; si el objeto
+    es más pequeño que una parte se sube con un único PUT al cerrar.
+    """
+    
+    def __init__(self, storage: 'S3Storage', key: str):
+        self.storage = storage
+        self.key = key
+        self.upload_id: Optional[str] = None
+        self.parts: List[Tuple[int, str]] = []
+        self._buffer = bytearray()
+    
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        part_size = self.storage.part_size
+        while len(self._buffer) >= part_size:
+            self._upload_part(bytes(self._buffer[:part_size]))
+            del self._buffer[:part_size]
+        return len(data)
+    
+    def _upload_part(self, data: bytes):
+        if self.upload_id is None:
+            body = self.storage._request('POST', self.key, {'uploads': ''})[1]
+            self.upload_id = _find_text(body, 'UploadId')
+            if not self.upload_id:
+                raise StorageError("S3 no devolvió un UploadId")
+        number = len(self.parts) + 1
+        headers = self.storage._request(
+            'PUT', self.key, {'partNumber': str(number), 'uploadId': self.upload_id}, data
+        )[0]
+        self.parts.append((number, headers.get('ETag', '')))
+    
+    def close(self):
+        if self.upload_id is None:
+            self.storage._request('PUT', self.key, body=bytes(self._buffer))
+            return
+        if self._buffer:
+            self._upload_part(bytes(self._buffer))
+            self._buffer.clear()
+        parts = ''.join(
+            f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+            for number, etag in self.parts
+        )
+        body = f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>".encode('utf-8')
+        response = self.storage._request('POST', self.key, {'uploadId': self.upload_id}, body)[1]
+        # S3 puede responder 200 con un error en el cuerpo
+        if _find_text(response, 'Code'):
+            raise StorageError(f"Error al completar la subida: {_find_text(response, 'Message')}")
+    
+    def abort(self):
+        self._buffer.clear()
+        if self.upload_id is not None:
+            try:
+                self.storage._request('DELETE', self.key, {'uploadId': self.upload_id})
+            except StorageError:
+                pass
+
+
+def _find_text(xml: bytes, tag: str) -> Optional[str]:
+    """Texto del primer elemento `tag` de una respuesta XML (sin tener en cuenta el namespace)."""
+    try:
+        root = ElementTree.fromstring(xml)
+    except ElementTree.ParseError:
+        return None
+    for element in root.iter():
+        if element.tag == tag or element.tag.endswith('}' + tag):
+            return element.text
+    return None
+
+
+class S3Storage(Storage):
+    """
+    Artefactos en un bucket compatible con S3 (direccionamiento por ruta).
+    
+    Args:
+        endpoint: URL del servicio (p. ej. 'https://s3.eu-west-1.amazonaws.com' o 'http://minio:9000').
+        bucket: Nombre del bucket.
+        access_key: Clave de acceso.
+        secret_key: Clave secreta.
+        region: Región del bucket.
+        prefix: Prefijo de las claves dentro del bucket.
+        part_size: Tamaño de cada parte de la subida (mínimo 5 MB en S3).
+        url_ttl: Validez de las URLs prefirmadas en segundos.
+    """
+    
+    def __init__(
+        self,
+        endpoint: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = 'us-east-1',
+        prefix: str = '',
+        part_size: int = 8 * 1024 * 1024,
+        url_ttl: int = 3600,
+        timeout: float = 60
+    ):
+        parsed = urllib.parse.urlsplit(endpoint)
+        self.scheme = parsed.scheme or 'https'
+        self.host = parsed.netloc
+        self.base_path = parsed.path.rstrip('/')
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.prefix = prefix
+        self.part_size = part_size
+        self.url_ttl = url_ttl
+        self.timeout = timeout
+    
+    def _path(self, key: str) -> str:
+        return _quote(f"{self.base_path}/{self.bucket}/{self.prefix}{key}", safe='/' + _UNRESERVED)
+    
+    def _request(
+        self,
+        method: str,
+        key: str,
+        params: Optional[Dict[str, str]] = None,
+        body: bytes = b''
+    ) -> Tuple[Dict[str, str], bytes]:
+        """Ejecuta una petición firmada y devuelve cabeceras y cuerpo de la respuesta."""
+        params = params or {}
+        path = self._path(key)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        payload_hash = hashlib.sha256(body).hexdigest()
+        headers = {
+            'host': self.host,
+            'x-amz-content-sha256': payload_hash,
+            'x-amz-date': now.strftime('%Y%m%dT%H%M%SZ'),
+        }
+        credential, signature = sign_v4(
+            method, path, params, headers, payload_hash,
+            self.access_key, self.secret_key, self.region, now
+        )
+        headers['Authorization'] = (
+            f"AWS4-HMAC-SHA256 Credential={credential}, "
+            f"SignedHeaders={';'.join(sorted(headers))}, Signature={signature}"
+        )
+        
+        url = f"{self.scheme}://{self.host}{path}"
+        if params:
+            url += '?' + _canonical_query(params)
+        request = urllib.request.Request(
+            url,
+            data=body if method in ('PUT', 'POST') else None,
+            headers=headers,
+            method=method
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return dict(response.headers.items()), response.read()
+        except urllib.error.HTTPError as e:
+            if method == 'DELETE' and e.code == 404:
+                return {}, b''
+            detail = _find_text(e.read(), 'Message') or e.reason
+            raise StorageError(f"S3 {method} {key}: HTTP {e.code} {detail}")
+        except (OSError, ValueError) as e:
+            raise StorageError(f"S3 {method} {key}: {e}")
+    
+    def open_writer(self, key: str) -> _S3Writer:
+        return _S3Writer(self, key)
+    
+    def presigned_url(self, key: str, filename: Optional[str] = None) -> Optional[str]:
+        """URL GET prefirmada; con `filename` el navegador guarda el archivo con ese nombre."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        params = {
+            'X-Amz-Algorithm': 'AWS4-HMAC-SHA256',
+            'X-Amz-Date': now.strftime('%Y%m%dT%H%M%SZ'),
+            'X-Amz-Expires': str(self.url_ttl),
+            'X-Amz-SignedHeaders': 'host',
+        }
+        if filename:
+            params['response-content-disposition'] = (
+                f"attachment; filename*=UTF-8''{_quote(filename)}"
+            )
+        path = self._path(key)
+        params['X-Amz-Credential'] = f"{self.access_key}/{now.strftime('%Y%m%d')}/{self.region}/s3/aws4_request"
+        _, signature = sign_v4(
+            'GET', path, params, {'host': self.host}, 'UNSIGNED-PAYLOAD',
+            self.access_key, self.secret_key, self.region, now
+        )
+        return f"{self.scheme}://{self.host}{path}?{_canonical_query(params)}&X-Amz-Signature={signature}"
+    
+    def delete(self, key: str):
+        self._request('DELETE', key)
+
+
+def create_storage(config) -> Storage:
+    """
+    Crea el almacenamiento configurado (`Config.STORAGE_BACKEND`).
+    
+    Raises:
+        StorageError: Si el backend no existe o le falta configuración.
+    """
+    if config.STORAGE_BACKEND == 'local':
+        return LocalStorage(config.DOWNLOADS_DIR)
+    if config.STORAGE_BACKEND == 's3':
+        missing = [name for name in ('S3_ENDPOINT', 'S3_BUCKET', 'S3_ACCESS_KEY', 'S3_SECRET_KEY')
+                   if not getattr(config, name)]
+        if missing:
+            raise StorageError(f"Falta configuración de S3: {', '.join(missing)}")
+        return S3Storage(
+            config.S3_ENDPOINT,
+            config.S3_BUCKET,
+            config.S3_ACCESS_KEY,
+            config.S3_SECRET_KEY,
+            region=config.S3_REGION,
+            prefix=config.S3_PREFIX,
+            part_size=config.S3_PART_SIZE_MB * 1024 * 1024,
+            url_ttl=config.PRESIGNED_URL_TTL
+        )
+    raise StorageError(f"Backend de almacenamiento desconocido: {config.STORAGE_BACKEND}")
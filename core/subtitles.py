@@ -0,0 +1,83 @@
+"""
+Subtítulos: validación de idiomas y archivos generados por yt-dlp.
+
+Los trabajos de solo subtítulos usan `--skip-download`, así que no bajan el
+audio ni el video: solo unos pocos KB de texto por idioma.
+"""
+import os
+import re
+import zipfile
+from typing import Iterable, List, Union
+
+
+# Códigos de idioma de yt-dlp: 'es', 'en', 'pt-BR', 'zh-Hans'...
+_LANGUAGE_PATTERN = re.compile(r'^[A-Za-z]{2,3}(?:-[A-Za-z0-9]{2,8})*$')
+
+# Idiomas como máximo por trabajo
+MAX_LANGUAGES = 10
+
+
+def parse_languages(value: Union[str, Iterable[str]]) -> List[str]:
+    """
+    Valida una lista de idiomas de subtítulos.
+    
+    Args:
+        value: Idiomas como lista o como texto separado por comas ('es,en').
+    
+    Returns:
+        Lista de códigos sin duplicados, en el orden recibido.
+    
+    Raises:
+        ValueError: Si no hay idiomas, hay demasiados o alguno no es válido.
+    """
+    items = value.split(',') if isinstance(value, str) else list(value)
+    languages = []
+    for item in (str(item).strip() for item in items):
+        if not item:
+            continue
+        if not _LANGUAGE_PATTERN.match(item):
+            raise ValueError(f"Idioma de subtítulos no válido: '{item}'")
+        if item not in languages:
+            languages.append(item)
+    if not languages:
+        raise ValueError("Indica al menos un idioma de subtítulos")
+    if len(languages) > MAX_LANGUAGES:
+        raise ValueError(f"Demasiados idiomas de subtítulos: máximo {MAX_LANGUAGES}")
+    return languages
+
+
+def converted_paths(written: Iterable[str], sub_format: str) -> List[str]:
+    """
+    Rutas finales de los subtítulos tras `--convert-subs`.
+    
+    yt-dlp anuncia los archivos con su extensión original (p. ej. `.vtt`) y la
+    conversión solo cambia la extensión.
+    """
+    return [os.path.splitext(path)[0] + '.' + sub_format for path in written]
+
+
+def base_name(path: str) -> str:
+    """Nombre sin el sufijo `.<idioma>.<formato>` de un archivo de subtítulos."""
+    return os.path.basename(path).rsplit('.', 2)[0]
+
+
+def bundle(paths: List[str], zip_path: str) -> str:
+    """
+    Empaqueta varios archivos de subtítulos en un ZIP y borra los originales.
+    
+    Args:
+        paths: Archivos de subtítulos.
+        zip_path: Ruta del ZIP a crear.
+    
+    Returns:
+        Ruta del ZIP.
+    """
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for path in paths:
+            archive.write(path, os.path.basename(path))
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return zip_path
@@ -0,0 +1,156 @@
+"""
+Normalización de URLs de YouTube sin lanzar yt-dlp.
+
+Convierte las distintas formas de URL (youtube.com/watch, youtu.be, shorts,
+music, embed, live...) en una URL canónica y un ID estable de video o playlist,
+descartando parámetros de seguimiento. Sirve para validar la entrada antes de
+lanzar ningún proceso y como clave de caché.
+"""
+import re
+from typing import Iterable, Optional
+from urllib.parse import urlsplit, parse_qsl
+
+
+class InvalidURLError(ValueError):
+    """La URL no es una URL de YouTube válida."""
+
+
+_VIDEO_ID = re.compile(r'[A-Za-z0-9_-]{11}')
+_PLAYLIST_ID = re.compile(r'[A-Za-z0-9_-]{2,64}')
+
+# Rutas /<prefijo>/<id> que identifican un video
+_PATH_VIDEO = re.compile(r'/(?:shorts|embed|live|v|e)/(?P<id>[A-Za-z0-9_-]{11})(?:[/?#]|$)')
+
+_YOUTUBE_HOSTS = frozenset({
+    'youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com',
+    'youtube-nocookie.com', 'www.youtube-nocookie.com',
+})
+_SHORT_HOSTS = frozenset({'youtu.be', 'www.youtu.be'})
+
+# Esquema opcional: se acepta "youtu.be/ID" o "www.youtube.com/watch?v=ID"
+_HAS_SCHEME = re.compile(r'^[A-Za-z][A-Za-z0-9+.-]*://')
+
+
+class ParsedURL:
+    """
+    URL normalizada.
+    
+    Attributes:
+        kind: 'video', 'playlist' o 'generic' (host adicional permitido).
+        video_id: ID del video (si lo hay).
+        playlist_id: ID de la playlist (si lo hay y se conserva).
+        url: URL canónica, sin parámetros de seguimiento.
+    """
+    
+    __slots__ = ('kind', 'video_id', 'playlist_id', 'url')
+    
+    def __init__(self, kind: str, url: str, video_id: Optional[str] = None, playlist_id: Optional[str] = None):
+        self.kind = kind
+        self.url = url
+        self.video_id = video_id
+        self.playlist_id = playlist_id
+    
+    @property
+    def key(self) -> str:
+        """Clave estable para cachés y deduplicación."""
+        if self.kind == 'video':
+            return f'youtube:video:{self.video_id}'
+        if self.kind == 'playlist':
+            return f'youtube:playlist:{self.playlist_id}'
+        return f'generic:{self.url}'
+    
+    def __repr__(self):
+        return f"ParsedURL({self.kind}, url='{self.url}')"
+
+
+def parse_url(url: str, no_playlist: bool = True, extra_hosts: Iterable[str] = ()) -> ParsedURL:
+    """
+    Valida y normaliza una URL de YouTube.
+    
+    Args:
+        url: URL tal como la escribió el usuario.
+        no_playlist: Si la URL de un video incluye `list=`, descartar la playlist.
+        extra_hosts: Hosts adicionales que se aceptan tal cual (p. ej. servidores locales de prueba).
+    
+    Returns:
+        ParsedURL con la URL canónica.
+    
+    Raises:
+        InvalidURLError: Si la URL no es de YouTube o no contiene un ID válido.
+    """
+    if not isinstance(url, str) or not url.strip():
+        raise InvalidURLError("La URL está vacía")
+    
+    text = url.strip()
+    if not _HAS_SCHEME.match(text):
+        text = 'https://' + text
+    
+    try:
+        parts = urlsplit(text)
+        host = (parts.hostname or '').lower()
+    except ValueError:
+        raise InvalidURLError(f"URL mal formada: {url}")
+    
+    if parts.scheme not in ('http', 'https') or not host:
+        raise InvalidURLError(f"URL no soportada: {url}")
+    
+    if host in extra_hosts:
+        return ParsedURL('generic', parts._replace(fragment='').geturl())
+    
+    if host in _SHORT_HOSTS:
+        video_id = parts.path.strip('/').split('/', 1)[0]
+        query = dict(parse_qsl(parts.query))
+        return _build(video_id, query.get('list'), url, no_playlist)
+    
+    if host not in _YOUTUBE_HOSTS:
+        raise InvalidURLError(f"La URL no es de YouTube: {url}")
+    
+    query = dict(parse_qsl(parts.query))
+    match = _PATH_VIDEO.match(parts.path)
+    if match:
+        return _build(match.group('id'), query.get('list'), url, no_playlist)
+    
+    if parts.path in ('/watch', '/watch/'):
+        return _build(query.get('v', ''), query.get('list'), url, no_playlist)
+    
+    if parts.path in ('/playlist', '/playlist/') and 'list' in query:
+        return _build(None, query['list'], url, no_playlist=False)
+    
+    raise InvalidURLError(f"No se encontró un video o playlist en la URL: {url}")
+
+
+def _build(video_id: Optional[str], playlist_id: Optional[str], original: str, no_playlist: bool) -> ParsedURL:
+    """Construye la URL canónica validando los IDs."""
+    if playlist_id is not None and not _PLAYLIST_ID.fullmatch(playlist_id):
+        if video_id is None:
+            raise InvalidURLError(f"ID de playlist inválido en la URL: {original}")
+        playlist_id = None
+    
+    if video_id is None:
+        return ParsedURL(
+            'playlist',
+            f'https://www.youtube.com/playlist?list={playlist_id}',
+            playlist_id=playlist_id
+        )
+    
+    if not _VIDEO_ID.fullmatch(video_id):
+        raise InvalidURLError(f"ID de video inválido en la URL: {original}")
+    
+    if playlist_id and not no_playlist:
+        return ParsedURL(
+            'video',
+            f'https://www.youtube.com/watch?v={video_id}&list={playlist_id}',
+            video_id=video_id,
+            playlist_id=playlist_id
+        )
+    return ParsedURL('video', f'https://www.youtube.com/watch?v={video_id}', video_id=video_id)
+
+
+def normalize_url(url: str, no_playlist: bool = True, extra_hosts: Iterable[str] = ()) -> str:
+    """
+    Devuelve la URL canónica (atajo de `parse_url(...).url`).
+    
+    Raises:
+        InvalidURLError: Si la URL no es válida.
+    """
+    return parse_url(url, no_playlist, extra_hosts).url
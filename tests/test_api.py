@@ -0,0 +1,728 @@
+"""
+Tests para la API (rutas y gestor de tareas).
+"""
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from datetime import datetime
+
+from pydantic import ValidationError
+
+from api.history import HistoryStore
+from api.limits import LimitExceeded, QuotaTracker, RateLimiter, client_id
+from api.models import DownloadRequest, FormatType, TaskStatus
+from api.routes import downloads
+from api.task_manager import AdmissionError, Task, get_task_manager
+from core import ExtractionError, VideoInfo
+
+task_manager = get_task_manager()
+
+
+class TestInfoBatch(unittest.TestCase):
+    """Tests para la extracción de metadatos por lotes."""
+    
+    def test_partial_results_as_ndjson(self):
+        """Verifica que los fallos se reporten por línea sin cortar el lote."""
+        def fake_extract(url, flat):
+            if 'badbadbadxx' in url:
+                raise ExtractionError("ERROR: Video unavailable")
+            return VideoInfo({'title': url, 'duration': 60})
+        
+        urls = ["https://youtu.be/ok1ok1ok1xx", "https://youtu.be/badbadbadxx", "https://youtu.be/ok2ok2ok2xx"]
+        with patch.object(task_manager.downloader, 'extract_info', side_effect=fake_extract) as mock_extract:
+            lines = [json.loads(line) for line in downloads._stream_info_batch(task_manager.downloader, urls, flat=True)]
+        
+        self.assertEqual(sorted(item['index'] for item in lines), [0, 1, 2])
+        by_url = {item['url']: item for item in lines}
+        self.assertTrue(by_url["https://youtu.be/ok1ok1ok1xx"]['ok'])
+        self.assertEqual(by_url["https://youtu.be/ok2ok2ok2xx"]['info']['duration_string'], "1:00")
+        self.assertFalse(by_url["https://youtu.be/badbadbadxx"]['ok'])
+        self.assertIn("Video unavailable", by_url["https://youtu.be/badbadbadxx"]['error'])
+        mock_extract.assert_any_call("https://www.youtube.com/watch?v=ok1ok1ok1xx", True)
+    
+    def test_invalid_and_duplicate_urls(self):
+        """Verifica que las URLs no válidas no se extraigan y las repetidas se extraigan una vez."""
+        urls = [
+            "https://youtu.be/dQw4w9WgXcQ",
+            "https://example.com/video",
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&si=abc",
+        ]
+        with patch.object(task_manager.downloader, 'extract_info',
+                          return_value=VideoInfo({'title': 'Video'})) as mock_extract:
+            lines = [json.loads(line) for line in downloads._stream_info_batch(task_manager.downloader, urls, flat=True)]
+        
+        by_index = {item['index']: item for item in lines}
+        self.assertEqual(sorted(by_index), [0, 1, 2])
+        self.assertFalse(by_index[1]['ok'])
+        self.assertTrue(by_index[0]['ok'] and by_index[2]['ok'])
+        mock_extract.assert_called_once_with("https://www.youtube.com/watch?v=dQw4w9WgXcQ", True)
+    
+    def test_download_request_normalizes_url(self):
+        """Verifica que DownloadRequest valide y normalice la URL."""
+        request = DownloadRequest(url="https://youtu.be/dQw4w9WgXcQ?si=abc")
+        self.assertEqual(request.url, "https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+        
+        with self.assertRaises(ValidationError):
+            DownloadRequest(url="https://example.com/video")
+    
+    def test_download_request_section(self):
+        """Verifica que inicio y fin acepten segundos o [HH:]MM:SS."""
+        request = DownloadRequest(url="https://youtu.be/dQw4w9WgXcQ", start="1:30", end=120)
+        self.assertEqual((request.start, request.end), (90.0, 120.0))
+        
+        with self.assertRaises(ValidationError):
+            DownloadRequest(url="https://youtu.be/dQw4w9WgXcQ", start="2:00", end="1:00")
+    
+    def test_download_request_subtitles(self):
+        """Verifica los idiomas de subtítulos y los formatos que los admiten."""
+        request = DownloadRequest(url="https://youtu.be/dQw4w9WgXcQ", format="srt", subtitles="es, en,es")
+        self.assertEqual(request.subtitles, ['es', 'en'])
+        
+        with self.assertRaises(ValidationError):
+            DownloadRequest(url="https://youtu.be/dQw4w9WgXcQ", format="mp3", subtitles=["es"])
+        with self.assertRaises(ValidationError):
+            DownloadRequest(url="https://youtu.be/dQw4w9WgXcQ", format="vtt", subtitles=["es; rm"])
+    
+    
+    def test_budget_picks_quality(self):
+        """Verifica que el presupuesto elija la mejor calidad que cabe o rechace la descarga."""
+        from fastapi import HTTPException
+        from core import VideoQuality
+        from core.config import FormatType as CoreFormatType
+        from core.formats import Estimate
+        
+        estimates = [
+            Estimate(CoreFormatType.MP4, quality, [], size, size, size / 1e6)
+            for quality, size in ((VideoQuality.FULL_HD, 90e6), (VideoQuality.HD, 40e6), (VideoQuality.LOW, 10e6))
+        ]
+        request = DownloadRequest(url="https://youtu.be/dQw4w9WgXcQ", format="mp4", max_size_mb=50)
+        with patch.object(task_manager.downloader, 'estimate_download', return_value=estimates):
+            self.assertEqual(downloads._apply_budget(task_manager.downloader, request, "720"), "720")
+            request.max_size_mb = 5
+            with self.assertRaises(HTTPException):
+                downloads._apply_budget(task_manager.downloader, request, "720")
+        
+        with patch.object(task_manager.downloader, 'estimate_download', return_value=[]):
+            self.assertEqual(downloads._apply_budget(task_manager.downloader, request, "720"), "720")
+
+
+class TestClientLimits(unittest.TestCase):
+    """Tests para los límites de frecuencia y las cuotas por cliente."""
+    
+    @staticmethod
+    def _http_request(api_key=None, host='203.0.113.7'):
+        from starlette.requests import Request
+        
+        headers = [(b'x-api-key', api_key.encode())] if api_key else []
+        return Request({'type': 'http', 'headers': headers, 'client': (host, 50000)})
+    
+    def test_token_bucket(self):
+        """Verifica la ráfaga, el tiempo de espera y el relleno del bucket."""
+        limiter = RateLimiter(per_minute=60, burst=3)
+        with patch('api.limits.time.monotonic', return_value=100.0) as clock:
+            for _ in range(3):
+                limiter.check('ip:a')
+            with self.assertRaises(LimitExceeded) as error:
+                limiter.check('ip:a')
+            self.assertEqual(error.exception.retry_after, 1)
+            # Otro cliente tiene su propio bucket
+            limiter.check('ip:b')
+            
+            clock.return_value = 102.0
+            limiter.check('ip:a', cost=2)
+            with self.assertRaises(LimitExceeded):
+                limiter.check('ip:a')
+        
+        RateLimiter(per_minute=0, burst=1).check('ip:a', cost=100)
+    
+    def test_batch_larger_than_burst(self):
+        """Verifica que un lote mayor que la ráfaga se cobre entero y frene al cliente."""
+        import asyncio
+        from fastapi import HTTPException
+        from api.limits import get_client_limits
+        from api.models import InfoBatchRequest
+        
+        client_limits = get_client_limits()
+        limiter = RateLimiter(per_minute=60, burst=10)
+        batch = InfoBatchRequest(urls=[f"https://youtu.be/video{i:05d}" for i in range(50)])
+        
+        with patch('api.limits.time.monotonic', return_value=100.0) as clock, \
+                patch.object(client_limits, 'info', limiter):
+            asyncio.run(downloads.get_video_info_batch(batch, self._http_request(), task_manager, client_limits))
+            
+            # 50 tokens con capacidad 10: quedan -40 y hacen falta 41 s para la siguiente
+            with self.assertRaises(HTTPException) as error:
+                asyncio.run(downloads.get_video_info_batch(batch, self._http_request(), task_manager, client_limits))
+            self.assertEqual(error.exception.status_code, 429)
+            with self.assertRaises(LimitExceeded) as limit:
+                limiter.check('ip:203.0.113.7')
+            self.assertEqual(limit.exception.retry_after, 41)
+            
+            clock.return_value = 141.0
+            limiter.check('ip:203.0.113.7')
+            
+            # Un lote por encima del máximo se rechaza antes de mirar (o gastar) los tokens
+            with patch.object(task_manager.downloader.config, 'INFO_BATCH_MAX_URLS', 20):
+                with self.assertRaises(HTTPException) as error:
+                    asyncio.run(downloads.get_video_info_batch(batch, self._http_request(), task_manager, client_limits))
+            self.assertEqual(error.exception.status_code, 400)
+    
+    def test_client_id(self):
+        """Verifica que una API key conocida tenga prioridad sobre la IP y no se guarde en claro."""
+        from api.limits import get_client_limits
+        
+        self.assertEqual(client_id(None, '203.0.113.7'), 'ip:203.0.113.7')
+        key_id = client_id('secreto', '203.0.113.7', {'secreto'})
+        self.assertTrue(key_id.startswith('key:'))
+        self.assertNotIn('secreto', key_id)
+        # Una key que no está configurada cuenta como la IP
+        self.assertEqual(client_id('otra', '203.0.113.7', {'secreto'}), 'ip:203.0.113.7')
+        
+        client_limits = get_client_limits()
+        with patch.object(client_limits, 'api_keys', frozenset({'secreto'})):
+            self.assertEqual(downloads._client(self._http_request('secreto'), client_limits), key_id)
+            self.assertEqual(downloads._client(self._http_request('otra'), client_limits), 'ip:203.0.113.7')
+    
+    def test_rotating_keys(self):
+        """Verifica que cambiar de API key en cada petición no salte el límite de la IP."""
+        import asyncio
+        import uuid
+        from fastapi import HTTPException
+        from api.limits import get_client_limits
+        
+        client_limits = get_client_limits()
+        limiter = RateLimiter(per_minute=60, burst=3)
+        
+        def estimate():
+            request = self._http_request(uuid.uuid4().hex)
+            return asyncio.run(downloads.estimate_download(
+                request, "https://youtu.be/dQw4w9WgXcQ", FormatType.MP4, task_manager, client_limits
+            ))
+        
+        with patch('api.limits.time.monotonic', return_value=100.0), \
+                patch.object(client_limits, 'info', limiter), \
+                patch.object(task_manager.downloader, 'estimate_download', return_value=[]):
+            for _ in range(3):
+                estimate()
+            with self.assertRaises(HTTPException) as error:
+                estimate()
+        self.assertEqual(error.exception.status_code, 429)
+    
+    def test_quotas_persisted(self):
+        """Verifica las cuotas de trabajos y bytes y que sobrevivan a un reinicio."""
+        import os
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'quotas.json')
+            quotas = QuotaTracker(max_jobs=2, max_bytes=1000, path=path, persist_interval=0)
+            quotas.start_job('ip:a')
+            quotas.start_job('ip:a')
+            with self.assertRaises(LimitExceeded) as error:
+                quotas.start_job('ip:a')
+            self.assertGreater(error.exception.retry_after, 0)
+            
+            quotas.cancel_job('ip:a')
+            quotas.add_bytes('ip:a', 1500)
+            self.assertEqual(quotas.usage('ip:a'), (1, 1500))
+            
+            restarted = QuotaTracker(max_jobs=2, max_bytes=1000, path=path)
+            self.assertEqual(restarted.usage('ip:a'), (1, 1500))
+            with self.assertRaises(LimitExceeded):
+                restarted.start_job('ip:a')
+            
+            # Al cambiar de día se empieza de cero
+            with patch.object(QuotaTracker, '_today', return_value='2099-01-01'):
+                restarted.start_job('ip:a')
+                self.assertEqual(restarted.usage('ip:a'), (1, 0))
+    
+    def test_download_rate_limited(self):
+        """Verifica el 429 con Retry-After y que los rechazos no gasten cuota."""
+        import asyncio
+        from fastapi import HTTPException
+        from api.limits import get_client_limits
+        
+        client_limits = get_client_limits()
+        
+        request = DownloadRequest(url="https://www.youtube.com/watch?v=dQw4w9WgXcQ", format="mp3")
+        limiter = RateLimiter(per_minute=1, burst=1)
+        quotas = QuotaTracker(max_jobs=5, max_bytes=0)
+        admission = AdmissionError("Video demasiado largo", 'duration')
+        
+        with patch.object(client_limits, 'downloads', limiter), \
+                patch.object(client_limits, 'quotas', quotas), \
+                patch.object(task_manager, 'create_task', side_effect=admission):
+            with self.assertRaises(HTTPException) as error:
+                asyncio.run(downloads.create_download(request, self._http_request(), task_manager, client_limits))
+            self.assertEqual(error.exception.status_code, 400)
+            self.assertEqual(quotas.usage('ip:203.0.113.7'), (0, 0))
+            
+            with self.assertRaises(HTTPException) as error:
+                asyncio.run(downloads.create_download(request, self._http_request(), task_manager, client_limits))
+            self.assertEqual(error.exception.status_code, 429)
+            self.assertEqual(error.exception.headers['Retry-After'], '60')
+
+
+class TestHistory(unittest.TestCase):
+    """Tests para el historial de descargas."""
+    
+    def setUp(self):
+        self.store = HistoryStore(':memory:')
+        self.addCleanup(self.store.close)
+    
+    def _fill(self, count: int):
+        """Inserta `count` tareas, una por minuto desde el 1/1/2026."""
+        base = datetime(2026, 1, 1).timestamp()
+        rows = [
+            (f"t{i}", f"ip:10.0.0.{i % 7}", "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+             ('mp3', 'mp4')[i % 2], None, ('completed', 'failed', 'completed')[i % 3], base + 60 * i)
+            for i in range(count)
+        ]
+        with self.store._lock:
+            self.store._connection().executemany(
+                'INSERT INTO jobs (task_id, client, url, format, quality, status, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+    
+    def test_cursor_pagination_and_filters(self):
+        """Verifica que las páginas no se solapen y que los filtros se combinen."""
+        self._fill(100)
+        
+        seen = []
+        cursor = None
+        while True:
+            page = self.store.query(limit=30, cursor=cursor, format='mp4', status='completed')
+            seen += [item['task_id'] for item in page['items']]
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        expected = [f"t{i}" for i in range(99, -1, -1) if i % 2 == 1 and i % 3 != 1]
+        self.assertEqual(seen, expected)
+        
+        page = self.store.query(since=datetime(2026, 1, 1, 0, 10), until=datetime(2026, 1, 1, 0, 20))
+        self.assertEqual([item['task_id'] for item in page['items']], [f"t{i}" for i in range(19, 9, -1)])
+        self.assertEqual(self.store.query(since=datetime(2027, 1, 1))['items'], [])
+        self.assertEqual(len(self.store.query(client='ip:10.0.0.3', limit=500)['items']), 14)
+        
+        with self.assertRaises(ValueError):
+            self.store.query(cursor='abc')
+    
+    def test_queries_use_indexes(self):
+        """Verifica que ninguna consulta recorra la tabla completa."""
+        self._fill(1000)
+        filters = [
+            {}, {'status': 'failed'}, {'format': 'mp3'}, {'client': 'ip:10.0.0.1'},
+            {'since': datetime(2026, 1, 1, 5), 'until': datetime(2026, 1, 1, 6)},
+            {'status': 'completed', 'client': 'ip:10.0.0.2', 'since': datetime(2026, 1, 1, 1)},
+        ]
+        with self.store._lock:
+            conn = self.store._connection()
+            conn.execute('ANALYZE')
+            for item in filters:
+                with self.subTest(filters=item):
+                    sql, params = HistoryStore._build_query(51, (datetime(2026, 1, 1, 8).timestamp(), 480), **item)
+                    plan = ' '.join(row[-1] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+                    self.assertNotRegex(plan, r'SCAN jobs(?! USING)')
+                    self.assertNotIn('TEMP B-TREE', plan)
+    
+    def test_out_of_order_inserts(self):
+        """Verifica fechas y páginas cuando los ids no siguen a created_at (admisiones lentas)."""
+        base = datetime(2026, 1, 1).timestamp()
+        # t0 se creó primero pero su admisión terminó la última: tiene el mayor id
+        order = [1, 2, 3, 4, 0]
+        with self.store._lock:
+            self.store._connection().executemany(
+                'INSERT INTO jobs (task_id, url, format, status, created_at) VALUES (?, ?, ?, ?, ?)',
+                [(f"t{i}", "https://youtu.be/dQw4w9WgXcQ", 'mp3', 'completed', base + 60 * i) for i in order]
+            )
+        
+        def ids(**filters):
+            return [item['task_id'] for item in self.store.query(**filters)['items']]
+        
+        self.assertEqual(ids(), ["t4", "t3", "t2", "t1", "t0"])
+        self.assertEqual(ids(since=datetime(2026, 1, 1, 0, 1)), ["t4", "t3", "t2", "t1"])
+        self.assertEqual(ids(until=datetime(2026, 1, 1, 0, 2)), ["t1", "t0"])
+        self.assertEqual(ids(since=datetime(2026, 1, 1, 0, 1), until=datetime(2026, 1, 1, 0, 3)), ["t2", "t1"])
+        
+        seen = []
+        cursor = None
+        while True:
+            page = self.store.query(limit=2, cursor=cursor)
+            seen += [item['task_id'] for item in page['items']]
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, ["t4", "t3", "t2", "t1", "t0"])
+    
+    def test_task_lifecycle(self):
+        """Verifica que la tarea se guarde al crearse y se actualice al terminar."""
+        task = Task("i", "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "mp4", "720")
+        self.store.add(task, 'ip:203.0.113.7')
+        task.status = TaskStatus.FAILED
+        task.error = "x" * 2000
+        task.completed_at = datetime.now()
+        self.store.update(task)
+        
+        item = self.store.query()['items'][0]
+        self.assertEqual((item['task_id'], item['status'], item['quality']), ("i", "failed", "720"))
+        self.assertEqual(len(item['error']), 500)
+        self.assertIsNotNone(item['completed_at'])
+
+
+class TestTask(unittest.TestCase):
+    """Tests para la representación compacta de las tareas."""
+    
+    def setUp(self):
+        patcher = patch.object(task_manager, 'history', HistoryStore(':memory:'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_enum_fields_are_shared(self):
+        """Verifica que formato y calidad sean miembros de enum compartidos."""
+        first = Task("a", "https://youtu.be/a", "mp4", "720")
+        second = Task("b", "https://youtu.be/b", "mp4", "720")
+        
+        self.assertIs(first.format_type, second.format_type)
+        self.assertIs(first.quality, second.quality)
+        self.assertEqual(first.metric_labels(), {'format': 'mp4', 'quality': '720'})
+        self.assertFalse(hasattr(first, '__dict__'))
+    
+    def test_subtitle_task_skips_slots(self):
+        """Verifica que las tareas de subtítulos no esperen un slot de descarga."""
+        task = Task("c", "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "srt", subtitles=["es"])
+        self.assertEqual(task.metric_labels(), {'format': 'srt', 'quality': 'subtitles'})
+        
+        with patch.dict(task_manager.tasks, {"c": task}), \
+                patch.object(task_manager, '_slots', MagicMock()) as mock_slots, \
+                patch.object(task_manager, '_run_task') as mock_run:
+            task_manager._execute_download("c")
+        
+        mock_run.assert_called_once_with(task)
+        mock_slots.acquire.assert_not_called()
+        self.assertEqual(task_manager.queued, 0)
+    
+    def test_admission_checks(self):
+        """Verifica la duración máxima y el espacio en disco, contando lo ya reservado."""
+        from collections import namedtuple
+        from core.config import FormatType as CoreFormatType
+        from core.formats import Estimate
+        
+        usage = namedtuple('usage', 'total used free')
+        gib = 1024 ** 3
+        estimates = [Estimate(CoreFormatType.MP3, None, ['140'], gib, gib, 60)]
+        downloader = task_manager.downloader
+        long_video = VideoInfo({'title': 'Directo', 'duration': 10 * 3600})
+        
+        with patch.object(downloader, 'extract_info', return_value=VideoInfo({'duration': 600})), \
+                patch.object(downloader, 'estimate_download', return_value=estimates), \
+                patch('api.task_manager.shutil.disk_usage', return_value=usage(0, 0, 4 * gib)), \
+                patch.dict(task_manager._reservations, clear=True):
+            first = Task("d", "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "mp3")
+            task_manager._admit(first)
+            self.assertEqual(task_manager.reserved_bytes, 2 * gib)
+            
+            # 4 GiB libres - 2 GiB reservados - margen: la segunda ya no cabe
+            with self.assertRaises(AdmissionError) as error:
+                task_manager._admit(Task("e", "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "mp3"))
+            self.assertEqual(error.exception.reason, 'disk_space')
+            
+            with patch.object(downloader, 'extract_info', return_value=long_video):
+                with self.assertRaises(AdmissionError) as error:
+                    task_manager._admit(Task("f", "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "mp3"))
+                self.assertEqual(error.exception.reason, 'duration')
+                
+                # Un fragmento corto del mismo video sí se admite
+                task_manager._reservations.clear()
+                task_manager._admit(Task("g", "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "mp3", start=0, end=60))
+    
+    def test_artifact_stored_before_completion(self):
+        """Verifica que el archivo pase al almacenamiento y se sirva con una URL prefirmada."""
+        import asyncio
+        from core.downloader import DownloadResult
+        
+        task = Task("h", "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "mp3")
+        storage = MagicMock()
+        storage.store_file.return_value = 1234
+        storage.local_path.return_value = None
+        storage.presigned_url.return_value = "https://s3.example.com/bucket/h_Video.mp3?X-Amz-Signature=abc"
+        result = DownloadResult(True, "Descarga completada", file_path="downloads/h_Video.mp3")
+        
+        with patch.dict(task_manager.tasks, {"h": task}), \
+                patch.object(task_manager, 'storage', storage), \
+                patch.object(task_manager.downloader, 'download_audio', return_value=result), \
+                patch('api.task_manager.os.path.exists', return_value=True):
+            task_manager._run_task(task)
+            response = asyncio.run(downloads.download_file("h", task_manager))
+        
+        storage.store_file.assert_called_once_with("h_Video.mp3", "downloads/h_Video.mp3")
+        self.assertEqual(task.status, "completed")
+        self.assertEqual((task.storage_key, task.file_size, task.file_path), ("h_Video.mp3", 1234, None))
+        self.assertEqual(task.file_name, "h_Video.mp3")
+        self.assertEqual(response.status_code, 307)
+        self.assertEqual(response.headers['location'], storage.presigned_url.return_value)
+        storage.presigned_url.assert_called_once_with("h_Video.mp3", "Video.mp3")
+        
+        # Si la subida falla la tarea no se da por completada
+        from core.storage import StorageError
+        
+        storage.store_file.side_effect = StorageError("S3 PUT: HTTP 503")
+        with patch.object(task_manager, 'storage', storage), \
+                patch.object(task_manager.downloader, 'download_audio', return_value=result), \
+                patch('api.task_manager.os.path.exists', return_value=True), \
+                patch('api.task_manager.os.remove'):
+            task_manager._run_task(task)
+        self.assertEqual(task.status, "failed")
+        self.assertIn("503", task.error)
+    
+    def test_memory_per_task(self):
+        """Mide la memoria por tarea (sin contar el id y la URL, que vienen de fuera)."""
+        import tracemalloc
+        import uuid
+        
+        count = 10000
+        ids = [str(uuid.uuid4()) for _ in range(count)]
+        urls = [f"https://www.youtube.com/watch?v={task_id[:11]}" for task_id in ids]
+        
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            tasks = [Task(task_id, url, "mp4", "720") for task_id, url in zip(ids, urls)]
+            per_task = (tracemalloc.get_traced_memory()[0] - before) / len(tasks)
+        finally:
+            tracemalloc.stop()
+        
+        # ~120 bytes del objeto con slots + datetime de creación
+        self.assertLess(per_task, 256)
+
+
+class TestDrain(unittest.TestCase):
+    """Tests para el apagado ordenado del gestor de tareas."""
+    
+    def setUp(self):
+        import tempfile
+        
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.checkpoint = str(Path(tmp.name) / 'checkpoint.json')
+        for patcher in (
+            patch.object(task_manager, 'history', HistoryStore(':memory:')),
+            patch.object(task_manager.downloader.config, 'CHECKPOINT_PATH', self.checkpoint),
+            patch.multiple(
+                task_manager, draining=False, _stopping=False, checkpointed=None,
+                _drain_deadline=None, _inflight=0
+            ),
+            patch.dict(task_manager.tasks, clear=True),
+            patch.dict(task_manager._clients, clear=True),
+            patch.object(task_manager, '_admit')
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def test_drain_waits_for_running_tasks(self):
+        """Verifica que el drenaje cierre la admisión y espere a las tareas en curso."""
+        import time
+        
+        def run(task):
+            time.sleep(0.2)
+            task.status = TaskStatus.COMPLETED
+        
+        with patch.object(task_manager, '_run_task', side_effect=run):
+            task_id = task_manager.create_task("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "mp3")
+            self.assertEqual(task_manager.drain(timeout=5), 0)
+        
+        self.assertEqual(task_manager.get_task(task_id).status, TaskStatus.COMPLETED)
+        self.assertFalse(Path(self.checkpoint).exists())
+        self.assertEqual(task_manager.drain_status()['in_flight'], 0)
+        
+        with self.assertRaises(AdmissionError) as error:
+            task_manager.create_task("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "mp3")
+        self.assertEqual(error.exception.reason, 'draining')
+    
+    def test_checkpoint_and_resume(self):
+        """Verifica que las tareas interrumpidas se guarden y se reanuden con el mismo id."""
+        import asyncio
+        import threading
+        import time
+        from core.downloader import DownloadResult
+        from api.main import health_check
+        
+        interrupted = threading.Event()
+        
+        def download(*args, **kwargs):
+            interrupted.wait(5)
+            return DownloadResult(False, "Error en la descarga", error="Interrupted by user")
+        
+        downloader = task_manager.downloader
+        with patch.object(downloader, 'download_audio', side_effect=download), \
+                patch.object(downloader, 'interrupt', side_effect=interrupted.set):
+            task_id = task_manager.create_task(
+                "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "mp3", normalize=True, client_id="ip:10.0.0.1"
+            )
+            # /health informa del drenaje mientras se espera a la tarea
+            drain = threading.Thread(target=task_manager.drain, kwargs={'timeout': 0.3, 'grace': 5})
+            drain.start()
+            while not task_manager.draining:
+                time.sleep(0.01)
+            response = asyncio.run(health_check(task_manager))
+            drain.join()
+        
+        self.assertEqual(task_manager.checkpointed, 1)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(json.loads(response.body)['drain']['in_flight'], 1)
+        task = task_manager.get_task(task_id)
+        self.assertEqual(task.status, TaskStatus.PENDING)
+        self.assertIn("reinicio", task.message)
+        
+        with open(self.checkpoint, encoding='utf-8') as f:
+            entry = json.load(f)['tasks'][0]
+        self.assertEqual((entry['task_id'], entry['client'], entry['normalize']), (task_id, "ip:10.0.0.1", True))
+        
+        # Al arrancar otra vez la tarea vuelve a lanzarse con su id (y su plantilla de salida)
+        task_manager.draining = False
+        with patch.object(task_manager, '_launch') as mock_launch:
+            self.assertEqual(task_manager.resume(), 1)
+        resumed, client = mock_launch.call_args[0]
+        self.assertEqual((resumed.task_id, resumed.format_type.value, resumed.normalize), (task_id, "mp3", True))
+        self.assertEqual(client, "ip:10.0.0.1")
+        self.assertFalse(Path(self.checkpoint).exists())
+
+
+
+class TestReadiness(unittest.TestCase):
+    """Tests para las comprobaciones de /health/ready."""
+    
+    def setUp(self):
+        from collections import namedtuple
+        from api.health import RecentFailures
+        
+        usage = namedtuple('usage', 'total used free')
+        gib = 1024 ** 3
+        self.disk = patch('api.health.shutil.disk_usage', return_value=usage(0, 0, 100 * gib))
+        self.ffmpeg = patch('api.health.get_ffmpeg_paths', return_value=(sys.executable, sys.executable))
+        for patcher in (
+            self.disk, self.ffmpeg,
+            patch.object(task_manager, 'history', HistoryStore(':memory:')),
+            patch.object(task_manager, 'recent_failures', RecentFailures(300)),
+            patch.multiple(task_manager, draining=False, queued=0, active=0),
+            patch.dict(task_manager._reservations, clear=True)
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def _check(self):
+        from api.health import ReadinessChecker
+        return ReadinessChecker(task_manager).check()
+    
+    def test_ready(self):
+        """Verifica que una réplica sin carga, con disco y herramientas esté lista."""
+        import asyncio
+        from api.main import readiness
+        
+        ready, checks = self._check()
+        self.assertTrue(ready)
+        self.assertEqual(checks['slots']['free'], task_manager.max_slots)
+        self.assertEqual(checks['ffmpeg']['path'], sys.executable)
+        self.assertTrue(checks['yt_dlp']['ok'])
+        
+        response = asyncio.run(readiness(task_manager))
+        self.assertEqual(response['status'], 'ready')
+    
+    def test_thresholds(self):
+        """Verifica cada umbral: cola, disco, herramientas y apagado."""
+        import asyncio
+        from collections import namedtuple
+        from api.main import readiness
+        
+        with patch.object(task_manager, 'queued', task_manager.downloader.config.READY_MAX_QUEUE):
+            ready, checks = self._check()
+        self.assertFalse(ready)
+        self.assertFalse(checks['slots']['ok'])
+        
+        # El espacio reservado por las tareas en curso no cuenta como libre
+        with patch.dict(task_manager._reservations, {'x': 99 * 1024 ** 3}):
+            self.assertFalse(self._check()[1]['disk']['ok'])
+        
+        self.ffmpeg.stop()
+        with patch('api.health.get_ffmpeg_paths', side_effect=RuntimeError("sin ffmpeg")), \
+                patch('api.health.importlib.util.find_spec', return_value=None):
+            checks = self._check()[1]
+        self.ffmpeg.start()
+        self.assertFalse(checks['ffmpeg']['ok'])
+        self.assertFalse(checks['yt_dlp']['ok'])
+        
+        with patch.object(task_manager, 'draining', True):
+            response = asyncio.run(readiness(task_manager))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(json.loads(response.body)['failing'], ['draining'])
+    
+    def test_failure_rate(self):
+        """Verifica la tasa de fallos reciente (sin contar los fallos propios del video)."""
+        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        
+        def finish(status, error=None):
+            task = Task("r", url, "mp3")
+            task.status = status
+            task.error = error
+            task_manager._record_job_metrics(task, 1.0)
+        
+        for _ in range(5):
+            finish(TaskStatus.FAILED, "ERROR: [youtube] dQw4w9WgXcQ: Video unavailable")
+        self.assertEqual(self._check()[1]['failures']['jobs'], 0)
+        
+        finish(TaskStatus.COMPLETED)
+        for _ in range(4):
+            finish(TaskStatus.FAILED, "ERROR: HTTP Error 403: Forbidden")
+        ready, checks = self._check()
+        self.assertFalse(ready)
+        self.assertEqual((checks['failures']['jobs'], checks['failures']['failed']), (5, 4))
+        
+        # Con menos trabajos que el mínimo la tasa no se tiene en cuenta
+        from api.health import RecentFailures
+        
+        with patch.object(task_manager, 'recent_failures', RecentFailures(300)):
+            finish(TaskStatus.FAILED, "ERROR: HTTP Error 403: Forbidden")
+            self.assertTrue(self._check()[1]['failures']['ok'])
+
+
+class TestImportTime(unittest.TestCase):
+    """Tests para lo que se carga al importar la API y el CLI (arranque en frío)."""
+    
+    # Módulos caros que solo se cargan cuando se usan (descargas, ffmpeg, historial)
+    DEFERRED = ('yt_dlp', 'static_ffmpeg', 'sqlite3')
+    
+    @staticmethod
+    def _import(module: str):
+        """Importa el módulo en un intérprete nuevo y devuelve los módulos cargados."""
+        import subprocess
+        
+        code = (
+            f"import json, sys, {module}\n"
+            "tm = sys.modules.get('api.task_manager')\n"
+            "print(json.dumps({'modules': sorted(sys.modules), "
+            "'constructed': tm is not None and tm._task_manager is not None}))"
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code],
+            capture_output=True, text=True, cwd=str(Path(__file__).parent.parent), check=True
+        )
+        return json.loads(result.stdout.splitlines()[-1])
+    
+    def test_import_is_light(self):
+        """Verifica que importar no cargue los módulos caros ni construya servicios."""
+        for module in ('api.main', 'cli.main'):
+            with self.subTest(module=module):
+                loaded = self._import(module)
+                self.assertFalse(loaded['constructed'])
+                for name in self.DEFERRED:
+                    self.assertNotIn(name, loaded['modules'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+Tests para el benchmark de la API.
+"""
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks import run
+
+
+class TestBenchmarkEntryPoint(unittest.TestCase):
+    """Smoke test del punto de entrada del benchmark (sin ffmpeg ni descargas reales)."""
+    
+    def test_main_runs(self):
+        """Verifica que `python -m benchmarks.run` arranque la API, ejecute un escenario y pare."""
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        media_dir = tempfile.mkdtemp()
+        media = Path(media_dir, 'video_720p_10s.mp4')
+        media.write_bytes(b'\0' * 1024)
+        result = {
+            'jobs': 1, 'failed': 0, 'concurrency': 1, 'elapsed_s': 0.5, 'jobs_per_s': 2.0,
+            'p50_s': 0.5, 'p99_s': 0.5, 'cpu_s': 0.1, 'peak_rss_mb': 50.0
+        }
+        
+        output = io.StringIO()
+        with patch.dict(os.environ), \
+                patch('core.downloader.get_ffmpeg_paths', return_value=('/path/to/ffmpeg', '/path/to/ffprobe')), \
+                patch.object(run, 'generate_media', return_value={720: media}) as mock_generate, \
+                patch.object(run, 'run_scenario', return_value=result) as mock_scenario, \
+                patch('api.task_manager.TaskManager.drain', return_value=0), \
+                redirect_stdout(output):
+            code = run.main(['--scenarios', 'mp3', '--jobs', '1', '--concurrency', '1', '--media-dir', media_dir])
+        
+        self.assertEqual(code, 0)
+        self.assertEqual(mock_generate.call_args[0][0], '/path/to/ffmpeg')
+        api_url = mock_scenario.call_args[0][0]
+        self.assertTrue(api_url.startswith('http://127.0.0.1:'))
+        self.assertIn('Slots de descarga', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
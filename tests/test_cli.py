@@ -0,0 +1,92 @@
+"""
+Tests para el modo no interactivo del CLI.
+"""
+import io
+import json
+import unittest
+from unittest.mock import MagicMock
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cli.main import build_parser, read_urls, run_downloads, run_info
+from core import ExtractionError, VideoQuality
+from core.config import FormatType
+from core.downloader import DownloadResult
+
+
+class TestReadUrls(unittest.TestCase):
+    """Tests para la lectura de URLs."""
+    
+    def test_args_file_and_stdin(self):
+        """Verifica que se combinen argumentos y stdin sin duplicados ni comentarios."""
+        stdin = io.StringIO("# comentario\nhttps://youtu.be/a\n\nhttps://youtu.be/b\n")
+        
+        urls = read_urls(["https://youtu.be/a"], '-', stdin=stdin)
+        
+        self.assertEqual(urls, ["https://youtu.be/a", "https://youtu.be/b"])
+    
+    def test_parser_subcommands(self):
+        """Verifica las opciones de los subcomandos."""
+        args = build_parser().parse_args(['batch', '-i', 'urls.txt', '--jobs', '8', '-f', 'mp4', '-q', '1080'])
+        
+        self.assertEqual(args.command, 'batch')
+        self.assertEqual(args.jobs, 8)
+        self.assertEqual(args.format, 'mp4')
+        self.assertEqual(args.quality, '1080')
+        
+        args = build_parser().parse_args(['get', 'URL', '--start', '1:30', '--end', '95.5'])
+        self.assertEqual((args.start, args.end), (90.0, 95.5))
+        
+        args = build_parser().parse_args(['get', 'URL', '-f', 'srt', '--sub-langs', 'es,en'])
+        self.assertEqual((args.format, args.sub_langs), ('srt', ['es', 'en']))
+
+
+class TestRunDownloads(unittest.TestCase):
+    """Tests para la descarga masiva en paralelo."""
+    
+    def test_json_lines_and_failures(self):
+        """Verifica que cada URL produzca una línea JSON y se cuenten los fallos."""
+        downloader = MagicMock()
+        downloader.download_video.side_effect = lambda url, **kwargs: DownloadResult(
+            success=url.endswith('ok'),
+            message="hecho",
+            file_path=f"{url}.mp4" if url.endswith('ok') else None,
+            error="" if url.endswith('ok') else "ERROR: Video unavailable"
+        )
+        out = io.StringIO()
+        
+        failed = run_downloads(
+            downloader, ["u1-ok", "u2-ko", "u3-ok"], FormatType.MP4, VideoQuality.HD,
+            output=None, jobs=3, out=out, show_progress=False
+        )
+        
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(failed, 1)
+        self.assertEqual(sorted(item['url'] for item in lines), ["u1-ok", "u2-ko", "u3-ok"])
+        self.assertEqual(downloader.download_video.call_count, 3)
+    
+    def test_info_errors_in_json(self):
+        """Verifica que los errores de extracción vayan en la línea JSON y no se mezclen en stdout."""
+        def extract_info(url):
+            if not url.endswith('ok'):
+                raise ExtractionError("ERROR: Unsupported URL: " + url)
+            return MagicMock(to_dict=lambda: {'title': 'Video'})
+        
+        downloader = MagicMock()
+        downloader.extract_info.side_effect = extract_info
+        out = io.StringIO()
+        
+        failed = run_info(downloader, ["u1-ok", "u2-ko"], jobs=2, out=out)
+        
+        lines = {item['url']: item for item in map(json.loads, out.getvalue().splitlines())}
+        self.assertEqual(failed, 1)
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines['u1-ok']['title'], 'Video')
+        self.assertEqual(lines['u2-ko']['error'], "ERROR: Unsupported URL: u2-ko")
+
+
+if __name__ == '__main__':
+    unittest.main()